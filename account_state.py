@@ -0,0 +1,255 @@
+import asyncio
+import json
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+import websockets
+
+import clock
+from async_io import run_blocking
+
+logger = logging.getLogger(__name__)
+
+EMPTY_BALANCE = {'free': 0, 'locked': 0, 'total': 0}
+
+# Binance expire la listenKey après 60 min sans keepalive
+LISTEN_KEY_KEEPALIVE = 30 * 60
+
+
+class AccountState:
+    """
+    Soldes du compte tenus en mémoire. Alimenté par le stream user-data
+    quand il est connecté ; sinon, un ``get_account`` REST est refait au
+    plus toutes les ``ttl`` secondes.
+    """
+
+    def __init__(self, client=None, ttl: float = 30.0):
+        self.client = client
+        self.ttl = ttl
+        self.stream_live = False
+        self._balances: Dict[str, Dict[str, float]] = {}
+        self._event_times: Dict[str, int] = {}
+        self._updated: Optional[float] = None
+        self._lock = threading.Lock()
+        self.recorder = None
+
+    def is_fresh(self) -> bool:
+        """Vrai si le stream est connecté ou le dernier instantané REST récent"""
+        if self.stream_live:
+            return True
+        return self._updated is not None and clock.monotonic() - self._updated < self.ttl
+
+    def invalidate(self):
+        """Force un rechargement REST à la prochaine lecture (hors stream)"""
+        self._updated = None
+
+    def load_snapshot(self, account_info: Dict):
+        """Remplace les soldes par la réponse de ``get_account``"""
+        balances = {}
+        for balance in account_info['balances']:
+            free, locked = float(balance['free']), float(balance['locked'])
+            balances[balance['asset']] = {'free': free, 'locked': locked, 'total': free + locked}
+        event_time = int(account_info.get('updateTime', 0))
+        with self._lock:
+            self._balances = balances
+            self._event_times = {asset: event_time for asset in balances}
+            self._updated = clock.monotonic()
+
+    def refresh(self):
+        """Recharge les soldes par REST"""
+        account_info = self.client.get_account()
+        if 'balances' not in account_info:
+            raise ValueError(f"Réponse get_account inattendue: {account_info}")
+        self.load_snapshot(account_info)
+
+    def apply_event(self, event: Dict):
+        """Applique un événement du stream user-data"""
+        if self.recorder is not None:
+            self.recorder.record_account_event(event)
+        kind = event.get('e')
+        if kind == 'outboundAccountPosition':
+            # Soldes absolus des actifs modifiés
+            event_time = int(event.get('u', event.get('E', 0)))
+            with self._lock:
+                for balance in event['B']:
+                    asset = balance['a']
+                    if event_time < self._event_times.get(asset, 0):
+                        continue
+                    free, locked = float(balance['f']), float(balance['l'])
+                    self._balances[asset] = {'free': free, 'locked': locked, 'total': free + locked}
+                    self._event_times[asset] = event_time
+                self._updated = clock.monotonic()
+        elif kind == 'balanceUpdate':
+            # Dépôt / retrait: variation du solde libre
+            with self._lock:
+                asset = event['a']
+                current = dict(self._balances.get(asset, EMPTY_BALANCE))
+                current['free'] += float(event['d'])
+                current['total'] = current['free'] + current['locked']
+                self._balances[asset] = current
+                self._updated = clock.monotonic()
+
+    def get_balance(self, asset: str = 'USDT') -> Dict:
+        """Solde d'un actif (lecture mémoire, REST seulement si le cache est périmé)"""
+        if not self.is_fresh() and self.client is not None:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Erreur récupération solde: {e}")
+        with self._lock:
+            return dict(self._balances.get(asset, EMPTY_BALANCE))
+
+
+class UserDataStream:
+    """
+    Stream user-data Binance (listenKey) alimentant un ``AccountState``.
+
+    À chaque (re)connexion, un instantané REST comble les événements
+    manqués ; la listenKey est prolongée toutes les 30 minutes.
+    """
+
+    def __init__(self, account: AccountState, client, base_url: str,
+                 max_reconnect_delay: float = 30.0, keepalive_interval: float = LISTEN_KEY_KEEPALIVE):
+        self.account = account
+        self.client = client
+        self.base_url = base_url.rstrip("/")
+        self.max_reconnect_delay = max_reconnect_delay
+        self.keepalive_interval = keepalive_interval
+        self.is_running = False
+        self.connected = asyncio.Event()
+        self.listen_key: Optional[str] = None
+        self._ws = None
+
+    @property
+    def url(self) -> str:
+        return f"{self.base_url}/ws/{self.listen_key}"
+
+    async def _keepalive(self):
+        while True:
+            await asyncio.sleep(self.keepalive_interval)
+            try:
+                await run_blocking(self.client.stream_keepalive, self.listen_key)
+            except Exception as e:
+                logger.warning(f"Keepalive listenKey échoué: {e}")
+
+    async def handle_message(self, message: str):
+        event = json.loads(message)
+        if event.get('e') == 'listenKeyExpired':
+            logger.warning("listenKey expirée, reconnexion du stream user-data")
+            self.listen_key = None
+            if self._ws is not None:
+                await self._ws.close()
+            return
+        self.account.apply_event(event)
+
+    async def run(self):
+        """Boucle de connexion avec reconnexion exponentielle"""
+        self.is_running = True
+        delay = 1.0
+
+        while self.is_running:
+            keepalive = None
+            try:
+                if self.client is not None:
+                    if self.listen_key is None:
+                        self.listen_key = await run_blocking(self.client.stream_get_listen_key)
+                    keepalive = asyncio.create_task(self._keepalive())
+                elif self.listen_key is None:
+                    self.listen_key = "local"
+                async with websockets.connect(self.url, ping_interval=20) as ws:
+                    self._ws = ws
+                    # Rattraper ce qui a pu changer pendant la déconnexion
+                    if self.account.client is not None:
+                        await run_blocking(self.account.refresh)
+                    self.account.stream_live = True
+                    self.connected.set()
+                    delay = 1.0
+                    logger.info("Stream user-data connecté")
+                    async for message in ws:
+                        await self.handle_message(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Stream user-data interrompu: {e}")
+            finally:
+                self.account.stream_live = False
+                self.account.invalidate()
+                self._ws = None
+                self.connected.clear()
+                if keepalive is not None:
+                    keepalive.cancel()
+
+            if self.is_running:
+                logger.info(f"Reconnexion du stream user-data dans {delay:.0f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def stop(self):
+        """Arrête le stream et libère la listenKey"""
+        self.is_running = False
+        if self._ws is not None:
+            await self._ws.close()
+        if self.client is not None and self.listen_key is not None:
+            try:
+                await run_blocking(self.client.stream_close, self.listen_key)
+            except Exception as e:
+                logger.debug(f"Fermeture listenKey: {e}")
+            self.listen_key = None
+
+
+class LocalUserDataServer:
+    """
+    Serveur websocket local imitant le stream user-data de Binance, pour
+    tester le cache de soldes hors ligne.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.clients: Set = set()
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def _handler(self, websocket, path: str = ""):
+        self.clients.add(websocket)
+        try:
+            await websocket.wait_closed()
+        finally:
+            self.clients.discard(websocket)
+
+    async def start(self) -> 'LocalUserDataServer':
+        self._server = await websockets.serve(self._handler, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def _broadcast(self, event: Dict):
+        message = json.dumps(event)
+        for websocket in list(self.clients):
+            await websocket.send(message)
+
+    async def push_account_position(self, balances: List[Dict]):
+        """Diffuse des soldes absolus: ``[{'asset', 'free', 'locked'}]``"""
+        now = int(time.time() * 1000)
+        await self._broadcast({
+            'e': 'outboundAccountPosition', 'E': now, 'u': now,
+            'B': [{'a': b['asset'], 'f': str(b['free']), 'l': str(b['locked'])} for b in balances]
+        })
+
+    async def push_balance_update(self, asset: str, delta: float):
+        """Diffuse un dépôt (delta > 0) ou un retrait (delta < 0)"""
+        now = int(time.time() * 1000)
+        await self._broadcast({'e': 'balanceUpdate', 'E': now, 'a': asset, 'd': str(delta), 'T': now})
+
+    async def disconnect_all(self):
+        for websocket in list(self.clients):
+            await websocket.close()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
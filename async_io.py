@@ -0,0 +1,72 @@
+import asyncio
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from config import config
+
+logger = logging.getLogger(__name__)
+
+_executor: Optional[ThreadPoolExecutor] = None
+_order_executor: Optional[ThreadPoolExecutor] = None
+_inline = False
+
+
+def set_inline(enabled: bool):
+    """
+    Exécute les appels bloquants directement dans la boucle (rejeu
+    déterministe, tests) au lieu du pool de threads.
+    """
+    global _inline
+    _inline = enabled
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Pool de threads borné dédié aux E/S bloquantes (Binance, SQLite)"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=config.io_workers, thread_name_prefix="io")
+    return _executor
+
+
+def get_order_executor() -> ThreadPoolExecutor:
+    """Pool réservé aux ordres, pour ne pas attendre derrière des lectures en file"""
+    global _order_executor
+    if _order_executor is None:
+        _order_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="orders")
+    return _order_executor
+
+
+async def run_blocking(func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+    """
+    Exécute un appel bloquant dans le pool d'E/S sans bloquer la boucle
+    asyncio partagée avec Telegram. Lève ``asyncio.TimeoutError`` si l'appel
+    dépasse ``timeout`` (``config.io_timeout`` par défaut) ; le thread termine
+    alors son appel en arrière-plan.
+    """
+    if _inline:
+        return func(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+    return await asyncio.wait_for(future, timeout if timeout is not None else config.io_timeout)
+
+
+async def run_order(func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+    """Comme ``run_blocking``, dans le pool réservé aux ordres"""
+    if _inline:
+        return func(*args, **kwargs)
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(get_order_executor(), functools.partial(func, *args, **kwargs))
+    return await asyncio.wait_for(future, timeout if timeout is not None else config.order_timeout)
+
+
+def shutdown_executor(wait: bool = True):
+    """Arrête les pools d'E/S"""
+    global _executor, _order_executor
+    if _executor is not None:
+        _executor.shutdown(wait=wait)
+        _executor = None
+    if _order_executor is not None:
+        _order_executor.shutdown(wait=wait)
+        _order_executor = None
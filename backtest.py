@@ -0,0 +1,249 @@
+import argparse
+import logging
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from config import TradingConfig, config
+from indicators import TechnicalIndicators
+from kline_cache import KlineCache, interval_to_ms, now_ms
+import strategy
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BacktestResult:
+    """Résultat d'un backtest: liste des trades et courbe d'equity"""
+    trades: List[Dict]
+    equity: np.ndarray
+    open_times: np.ndarray
+    initial_balance: float
+    stats: Dict = field(default_factory=dict)
+
+    def equity_curve(self) -> pd.Series:
+        """Courbe d'equity indexée par date d'ouverture des bougies"""
+        return pd.Series(self.equity, index=pd.to_datetime(self.open_times, unit='ms'), name='equity')
+
+
+def compute_stats(pnls: np.ndarray, equity: np.ndarray, initial_balance: float) -> Dict:
+    """Statistiques agrégées d'un backtest"""
+    total_trades = len(pnls)
+    winning = int((pnls > 0).sum())
+    losing = int((pnls < 0).sum())
+    gross_profit = float(pnls[pnls > 0].sum())
+    gross_loss = float(-pnls[pnls < 0].sum())
+
+    if len(equity):
+        peak = np.maximum.accumulate(equity)
+        max_drawdown = float(((peak - equity) / peak).max() * 100)
+        final_equity = float(equity[-1])
+    else:
+        max_drawdown = 0.0
+        final_equity = initial_balance
+
+    return {
+        'total_trades': total_trades,
+        'total_pnl': float(pnls.sum()),
+        'avg_pnl': float(pnls.mean()) if total_trades else 0.0,
+        'winning_trades': winning,
+        'losing_trades': losing,
+        'win_rate': winning / total_trades * 100 if total_trades else 0.0,
+        'profit_factor': gross_profit / gross_loss if gross_loss else float('inf') if gross_profit else 0.0,
+        'max_drawdown': max_drawdown,
+        'final_equity': final_equity,
+        'return_pct': (final_equity / initial_balance - 1) * 100,
+    }
+
+
+def simulate(open_times: np.ndarray, close: np.ndarray, rsi_vwap: np.ndarray, bull: np.ndarray,
+             entry_threshold: float, exit_threshold: float, risk_per_trade: float,
+             stop_loss_pct: float, initial_balance: float = 1000.0,
+             fee_rate: float = 0.0, with_trades: bool = True,
+             low: Optional[np.ndarray] = None) -> BacktestResult:
+    """
+    Simule la stratégie à partir d'indicateurs déjà calculés. Les signaux et
+    la courbe d'equity sont calculés par opérations sur tableaux entiers ;
+    seuls le dimensionnement (qui dépend du solde) et la recherche de la
+    sortie bouclent, trade par trade.
+
+    Avec ``low``, le stop-loss est exécuté comme en live : sortie au prix du
+    stop sur la première bougie dont le plus bas l'atteint, si elle précède
+    (ou coïncide avec) le signal de sortie RSI. Sans ``low``, seules les
+    sorties RSI sont simulées. ``with_trades=False`` évite de construire la
+    liste détaillée des trades.
+    """
+    if entry_threshold >= exit_threshold:
+        raise ValueError("Le seuil d'entrée doit être inférieur au seuil de sortie")
+
+    with np.errstate(invalid='ignore'):
+        entries = np.flatnonzero(strategy.entry_signal(rsi_vwap, bull, entry_threshold))
+        exits = np.flatnonzero(strategy.exit_signal(rsi_vwap, exit_threshold))
+
+    n = len(close)
+    entry_list: List[int] = []
+    exit_list: List[int] = []
+    exit_price_list: List[float] = []
+    quantity_list: List[float] = []
+    pnl_list: List[float] = []
+    balance = initial_balance
+    position = 0
+
+    while True:
+        # Prochaine entrée à plat (une sortie stop peut être suivie d'une entrée sur la même bougie)
+        k = int(np.searchsorted(entries, position))
+        if k == len(entries):
+            break
+        i = int(entries[k])
+        entry_price = close[i]
+        if balance < strategy.MIN_BALANCE:
+            break
+        quantity = strategy.position_size(entry_price, balance, risk_per_trade, stop_loss_pct)
+        # Spot: pas de levier, la quantité est plafonnée au solde disponible
+        quantity = min(quantity, balance / (entry_price * (1 + fee_rate)))
+        if quantity <= 0:
+            break
+        entry_list.append(i)
+        quantity_list.append(quantity)
+
+        e = int(np.searchsorted(exits, i, side='right'))
+        j = int(exits[e]) if e < len(exits) else None
+        exit_price = close[j] if j is not None else None
+        if low is not None and stop_loss_pct > 0:
+            stop = strategy.stop_loss_price(entry_price, stop_loss_pct)
+            horizon = j + 1 if j is not None else n
+            hits = np.flatnonzero(low[i + 1:horizon] <= stop)
+            if len(hits):
+                j = i + 1 + int(hits[0])
+                exit_price = stop
+        if j is None:
+            break  # position encore ouverte en fin d'historique
+        pnl = (exit_price - entry_price) * quantity - fee_rate * (entry_price + exit_price) * quantity
+        exit_list.append(j)
+        exit_price_list.append(exit_price)
+        pnl_list.append(pnl)
+        balance += pnl
+        position = j
+
+    entry_idx = np.array(entry_list, dtype=np.int64)
+    exit_idx = np.array(exit_list, dtype=np.int64)
+    exit_prices = np.array(exit_price_list)
+    quantities = np.array(quantity_list)
+    pnls = np.array(pnl_list)
+    executed = len(entry_idx)
+
+    # En position de la bougie d'entrée (incluse) à la bougie de sortie (exclue)
+    marks = np.zeros(n + 1, dtype=np.int64)
+    marks[entry_idx] += 1
+    marks[exit_idx] -= 1
+    in_position = np.cumsum(marks[:n]) > 0
+
+    closed = len(exit_idx)
+
+    # Courbe d'equity: réalisé cumulé + latent de la position ouverte
+    realized = np.zeros(len(close))
+    realized[exit_idx] = pnls[:closed]
+    realized = initial_balance + np.cumsum(realized)
+    entry_flags = np.zeros(len(close), dtype=np.int64)
+    entry_flags[entry_idx] = 1
+    trade_of_candle = np.clip(np.cumsum(entry_flags) - 1, 0, None)
+    unrealized = np.zeros(len(close))
+    if executed:
+        entry_prices = close[entry_idx]
+        unrealized = np.where(
+            in_position,
+            (close - entry_prices[trade_of_candle]) * quantities[trade_of_candle]
+            - fee_rate * entry_prices[trade_of_candle] * quantities[trade_of_candle],
+            0.0
+        )
+    equity = realized + unrealized
+
+    trades = []
+    for k in range(executed if with_trades else 0):
+        i, j = entry_idx[k], exit_idx[k] if k < closed else None
+        trades.append({
+            'symbol': None,
+            'side': 'BUY',
+            'quantity': float(quantities[k]),
+            'entry_price': float(close[i]),
+            'exit_price': float(exit_prices[k]) if j is not None else None,
+            'pnl': float(pnls[k]) if j is not None else None,
+            'status': 'CLOSED' if j is not None else 'OPEN',
+            'entry_time': datetime.utcfromtimestamp(open_times[i] / 1000),
+            'exit_time': datetime.utcfromtimestamp(open_times[j] / 1000) if j is not None else None,
+            'rsi_entry': float(rsi_vwap[i]),
+            'rsi_exit': float(rsi_vwap[j]) if j is not None else None,
+        })
+
+    result = BacktestResult(trades, equity, open_times, initial_balance)
+    result.stats = compute_stats(pnls[:closed], equity, initial_balance)
+    return result
+
+
+def run_backtest(candles: pd.DataFrame, cfg: TradingConfig = config, initial_balance: float = 1000.0,
+                 fee_rate: float = 0.0, ma_period: int = 200) -> BacktestResult:
+    """
+    Rejoue les bougies avec les règles du bot (filtre MA200, seuils RSI-VWAP,
+    dimensionnement). ``candles`` doit contenir high/low/close/volume et un
+    index de dates (ou une colonne ``timestamp`` en ms).
+    """
+    high = candles['high'].to_numpy(dtype=np.float64)
+    low = candles['low'].to_numpy(dtype=np.float64)
+    close = candles['close'].to_numpy(dtype=np.float64)
+    volume = candles['volume'].to_numpy(dtype=np.float64)
+    if 'timestamp' in candles.columns:
+        open_times = candles['timestamp'].to_numpy(dtype=np.int64)
+    else:
+        open_times = candles.index.asi8 // 1_000_000
+
+    rsi_vwap = TechnicalIndicators.calculate_rsi_vwap_array(high, low, close, volume, cfg.rsi_length)
+    bull = TechnicalIndicators.bull_market_array(close, ma_period)
+
+    result = simulate(open_times, close, rsi_vwap, bull, cfg.rsi_entry_threshold, cfg.rsi_exit_threshold,
+                      cfg.risk_per_trade, cfg.stop_loss_pct, initial_balance, fee_rate, low=low)
+    for trade in result.trades:
+        trade['symbol'] = cfg.symbol
+    return result
+
+
+def load_candles(client, symbol: str, interval: str, days: int, cache_path: Optional[str] = None) -> pd.DataFrame:
+    """
+    Charge l'historique via un cache local de bougies propre au backtest :
+    celui du bot ne garde que sa fenêtre et effacerait l'historique téléchargé.
+    """
+    period = days * 86_400_000
+    cache = KlineCache(cache_path or config.backtest_cache_path,
+                       max_candles=period // interval_to_ms(interval) + 1)
+    start_ms = now_ms() - period
+    return cache.get_klines(client, symbol, interval, start_ms).to_dataframe(time_index=False)
+
+
+def main():
+    from binance.client import Client
+
+    parser = argparse.ArgumentParser(description="Backtest de la stratégie RSI-VWAP")
+    parser.add_argument('--symbol', default=config.symbol)
+    parser.add_argument('--interval', default=config.timeframe)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--balance', type=float, default=1000.0)
+    parser.add_argument('--fee', type=float, default=0.0, help="frais par côté (ex: 0.001)")
+    args = parser.parse_args()
+
+    client = Client(config.binance_api_key, config.binance_secret_key)
+    candles = load_candles(client, args.symbol, args.interval, args.days)
+
+    started = time.perf_counter()
+    result = run_backtest(candles, config, args.balance, args.fee)
+    elapsed = time.perf_counter() - started
+
+    print(f"{len(candles)} bougies {args.symbol} {args.interval} backtestées en {elapsed * 1000:.1f} ms")
+    for key, value in result.stats.items():
+        print(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}")
+
+
+if __name__ == '__main__':
+    main()
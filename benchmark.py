@@ -0,0 +1,370 @@
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import math
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+import clock
+from async_io import set_inline
+from config import config
+from indicators import TechnicalIndicators
+from candle_buffer import CandleView
+from kline_cache import KlineCache, interval_to_ms
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BASELINE = "benchmark_baseline.json"
+INTERVAL = "15m"
+
+# Taille réaliste (fenêtre du bot) et x100
+SIZES = {'realistic': 1, 'x100': 100}
+
+
+def synthetic_klines(count: int, start_ms: int = 1_600_000_000_000, interval: str = INTERVAL,
+                     price: float = 30000.0, seed: int = 0) -> List[list]:
+    """Bougies au format REST Binance, marche aléatoire log-normale reproductible"""
+    rng = np.random.default_rng(seed)
+    step = interval_to_ms(interval)
+    closes = price * np.exp(np.cumsum(rng.normal(0.0, 0.004, count)))
+    opens = np.concatenate(([price], closes[:-1]))
+    spread = np.abs(rng.normal(0.0, 0.002, count))
+    highs = np.maximum(opens, closes) * (1 + spread)
+    lows = np.minimum(opens, closes) * (1 - spread)
+    volumes = rng.uniform(1.0, 100.0, count)
+    klines = []
+    for i in range(count):
+        open_time = start_ms + i * step
+        klines.append([open_time, f"{opens[i]:.2f}", f"{highs[i]:.2f}", f"{lows[i]:.2f}", f"{closes[i]:.2f}",
+                       f"{volumes[i]:.5f}", open_time + step - 1, f"{volumes[i] * closes[i]:.2f}",
+                       int(volumes[i] * 10), f"{volumes[i] / 2:.5f}", f"{volumes[i] * closes[i] / 2:.2f}", "0"])
+    return klines
+
+
+class BenchClock:
+    """Horloge figée avancée à la main (bougies synthétiques, aucune attente réelle)"""
+
+    def __init__(self, start: float):
+        self._now = start
+
+    def time(self) -> float:
+        return self._now
+
+    def monotonic(self) -> float:
+        return self._now
+
+    async def sleep(self, delay: float):
+        self._now += delay
+        await asyncio.sleep(0)
+
+    def advance(self, seconds: float):
+        self._now += seconds
+
+
+class SyntheticMarket:
+    """Client Binance simulé servant des bougies synthétiques jusqu'à l'heure de ``clock``"""
+
+    def __init__(self, symbols: List[str], count: int, start_ms: int, interval: str = INTERVAL):
+        self.interval = interval
+        self._klines = {symbol: synthetic_klines(count, start_ms, interval, seed=i)
+                        for i, symbol in enumerate(symbols)}
+        self._open_times = {symbol: np.array([k[0] for k in klines], dtype=np.int64)
+                            for symbol, klines in self._klines.items()}
+
+    def get_historical_klines(self, symbol: str, interval: str, start_str=None, end_str=None,
+                              limit: int = 1000, **kwargs) -> List[list]:
+        open_times = self._open_times[symbol]
+        now = int(clock.now() * 1000)
+        begin = int(np.searchsorted(open_times, int(start_str or 0)))
+        end = int(np.searchsorted(open_times, now, side='right'))
+        return [list(k) for k in self._klines[symbol][begin:end]]
+
+    def get_klines(self, symbol: str, interval: str, limit: int = 500, **kwargs) -> List[list]:
+        return self.get_historical_klines(symbol, interval)[-limit:]
+
+    def ping(self) -> Dict:
+        return {}
+
+    def get_server_time(self) -> Dict:
+        return {'serverTime': int(clock.now() * 1000)}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def measure(op: Callable[[], None], repeat: int, warmup: int = 2) -> Dict[str, float]:
+    """Durées (ms) par appel et allocations (tracemalloc, sur un appel séparé)"""
+    for _ in range(warmup):
+        op()
+    gc.collect()
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        op()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    op()
+    _, peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename') if stat.size_diff > 0)
+
+    return {
+        'runs': repeat,
+        'min_ms': timings[0],
+        'mean_ms': sum(timings) / len(timings),
+        'p50_ms': percentile(timings, 50),
+        'p90_ms': percentile(timings, 90),
+        'p99_ms': percentile(timings, 99),
+        'max_ms': timings[-1],
+        'peak_kb': peak / 1024,
+        'retained_kb': allocated / 1024,
+    }
+
+
+# --- Cas mesurés: chaque fabrique reçoit le facteur de taille et un dossier temporaire,
+# et renvoie l'opération à chronométrer (ou un couple (opération, nettoyage)) ---
+
+def synthetic_view(count: int, workdir: str) -> CandleView:
+    """Fenêtre de ``count`` bougies synthétiques chargée dans un ``KlineCache``"""
+    cache = KlineCache(os.path.join(workdir, "k.db"), max_candles=count)
+    cache.upsert("BTCUSDT", INTERVAL, synthetic_klines(count), persist=False)
+    return cache._load(("BTCUSDT", INTERVAL)).view()
+
+
+def case_rsi_vwap_dataframe(scale: int, workdir: str):
+    """Indicateur RSI-VWAP sur DataFrame (chemin pandas)"""
+    frame = synthetic_view(200 * scale, workdir).to_dataframe()
+    return lambda: TechnicalIndicators.calculate_rsi_vwap(frame, config.rsi_length)
+
+
+def case_rsi_vwap_array(scale: int, workdir: str):
+    """Indicateur RSI-VWAP sur colonnes NumPy (chemin du bot)"""
+    view = synthetic_view(200 * scale, workdir)
+    return lambda: TechnicalIndicators.calculate_rsi_vwap_array(view.high, view.low, view.close, view.volume,
+                                                                config.rsi_length)
+
+
+def case_kline_ingest(scale: int, workdir: str):
+    """Parsing + persistance SQLite d'une réponse REST de bougies"""
+    klines = synthetic_klines(200 * scale)
+    cache = KlineCache(os.path.join(workdir, "k.db"), max_candles=200 * scale)
+    counter = iter(range(10 ** 9))
+    return lambda: cache.upsert(f"SYM{next(counter)}USDT", INTERVAL, klines)
+
+
+def case_historical_data(scale: int, workdir: str):
+    """``get_historical_data`` servi par le cache: vue de fenêtre + DataFrame"""
+    count = 200 * scale
+    klines = synthetic_klines(count)
+    start_ms = klines[0][0]
+    cache = KlineCache(os.path.join(workdir, "k.db"), ttl=1e9, max_candles=count)
+    market = SyntheticMarket(["BTCUSDT"], count, start_ms)
+    cache.sync(market, "BTCUSDT", INTERVAL, start_ms)
+    return lambda: cache.get_klines(market, "BTCUSDT", INTERVAL, start_ms).to_dataframe()
+
+
+def case_resample(scale: int, workdir: str):
+    """Rééchantillonnage incrémental 1m -> 5m/15m/1h/4h d'une nouvelle bougie de base"""
+    from resampler import Resampler
+    count = 1000 * scale
+    klines = synthetic_klines(count + 1000, interval="1m")
+    cache = KlineCache(os.path.join(workdir, "k.db"), max_candles=count + 1000)
+    cache.upsert("BTCUSDT", "1m", klines[:count], closed=True, persist=False)
+    buffer = cache._load(("BTCUSDT", "1m"))
+    resampler = Resampler("1m")
+    resampler.update("BTCUSDT", buffer.view())
+    pending = iter(klines[count:])
+
+    def op():
+        cache.upsert("BTCUSDT", "1m", [next(pending)], closed=True, persist=False)
+        resampler.update("BTCUSDT", buffer.view())
+    return op
+
+
+def case_scan_watchlist(scale: int, workdir: str):
+    """Scan RSI-VWAP + MA200 de ``200 x scale`` paires (matrices symboles x bougies)"""
+    from scanner import MarketScanner
+    cache = KlineCache(os.path.join(workdir, "k.db"), max_candles=200)
+    views = {}
+    for i in range(200 * scale):
+        # Historiques inégaux: une paire sur trois n'a que 120 bougies
+        symbol = f"S{i:05d}USDT"
+        cache.upsert(symbol, INTERVAL, synthetic_klines(200 if i % 3 else 120, seed=i), persist=False)
+        views[symbol] = cache._load((symbol, INTERVAL)).view()
+    scanner = MarketScanner(config.rsi_length, entry_threshold=config.rsi_entry_threshold)
+    return lambda: scanner.scan(views)
+
+
+def case_db_trades(scale: int, workdir: str):
+    """Écriture différée de trades (ouverture + clôture) jusqu'à durabilité"""
+    from database import Database
+    database = Database(os.path.join(workdir, "bench.db"))
+    count = 10 * scale
+
+    def op():
+        for _ in range(count):
+            trade_id, _ = database.queue_add_trade({
+                'symbol': 'BTCUSDT', 'side': 'BUY', 'quantity': 0.01, 'entry_price': 30000.0,
+                'status': 'OPEN', 'entry_time': clock.datetime_now(), 'rsi_entry': 9.5
+            })
+            database.queue_update_trade(trade_id, {
+                'exit_price': 30100.0, 'pnl': 1.0, 'status': 'CLOSED',
+                'exit_time': clock.datetime_now(), 'rsi_exit': 96.0
+            })
+        database.flush()
+    return op, database.close
+
+
+def case_loop_iteration(scale: int, workdir: str):
+    """Itération de la boucle de trading (``evaluate_symbol``) sur ``scale`` symboles"""
+    import trading_bot as bot_module
+    from database import Database
+    from scheduler import WAKE_CLOSE
+    from sim_exchange import SimulatedExchange
+
+    symbols = [f"S{i:03d}USDT" for i in range(scale)]
+    step_ms = interval_to_ms(INTERVAL)
+    history = 800
+    start_ms = 1_600_000_000_000
+    bench_clock = BenchClock((start_ms + history * step_ms) / 1000 + 2)
+    market = SyntheticMarket(symbols, history * 4, start_ms)
+
+    previous_db = bot_module.db
+    bot_module.db = Database(os.path.join(workdir, "bot.db"))
+    bot = bot_module.TradingBot()
+    bot.symbols = symbols
+    bot.kline_cache = KlineCache(os.path.join(workdir, "klines.db"), ttl=config.kline_cache_ttl)
+    bot.client = SimulatedExchange(market, {'USDT': 1e9})
+    bot.account.client = bot.client
+    bot.execution.client = bot.client
+    loop = asyncio.new_event_loop()
+
+    async def evaluate_all():
+        await asyncio.gather(*(bot.evaluate_symbol(symbol, WAKE_CLOSE) for symbol in symbols))
+
+    def op():
+        bench_clock.advance(step_ms / 1000)
+        loop.run_until_complete(evaluate_all())
+
+    def cleanup():
+        loop.close()
+        bot_module.db.close()
+        bot_module.db = previous_db
+
+    clock.set_clock(bench_clock)
+    return op, cleanup
+
+
+CASES: Dict[str, Tuple[Callable, int]] = {
+    # nom: (fabrique, répétitions)
+    'rsi_vwap_dataframe': (case_rsi_vwap_dataframe, 50),
+    'rsi_vwap_array': (case_rsi_vwap_array, 200),
+    'kline_ingest': (case_kline_ingest, 30),
+    'historical_data': (case_historical_data, 100),
+    'resample': (case_resample, 200),
+    'scan_watchlist': (case_scan_watchlist, 20),
+    'db_trades': (case_db_trades, 20),
+    'loop_iteration': (case_loop_iteration, 50),
+}
+
+
+def run(selected: Optional[List[str]] = None, quick: bool = False) -> Dict[str, Dict]:
+    """Exécute les cas (tailles réaliste et x100) et renvoie les mesures par ``cas@taille``"""
+    results = {}
+    previous_clock = clock.get_clock()
+    logging.disable(logging.WARNING)
+    set_inline(True)
+    try:
+        for name, (factory, repeat) in CASES.items():
+            if selected and name not in selected:
+                continue
+            for size, scale in SIZES.items():
+                workdir = tempfile.mkdtemp(prefix="bench-")
+                cleanup = None
+                try:
+                    op = factory(scale, workdir)
+                    if isinstance(op, tuple):
+                        op, cleanup = op
+                    runs = repeat if scale == 1 else max(5, repeat // 5)
+                    results[f"{name}@{size}"] = measure(op, max(3, runs // 5 if quick else runs))
+                except ImportError as e:
+                    logger.warning(f"{name}: ignoré ({e})")
+                finally:
+                    if cleanup is not None:
+                        cleanup()
+                    clock.set_clock(previous_clock)
+                    shutil.rmtree(workdir, ignore_errors=True)
+    finally:
+        set_inline(False)
+        logging.disable(logging.NOTSET)
+    return results
+
+
+def compare(results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float,
+            min_delta_ms: float = 0.5) -> List[str]:
+    """
+    Régressions: p50 au-delà de ``threshold`` fois la référence et d'au
+    moins ``min_delta_ms`` (le bruit des cas sous la milliseconde est ignoré)
+    """
+    regressions = []
+    for key, result in results.items():
+        reference = baseline.get(key)
+        if (reference and result['p50_ms'] > reference['p50_ms'] * threshold
+                and result['p50_ms'] - reference['p50_ms'] >= min_delta_ms):
+            regressions.append(f"{key}: p50 {result['p50_ms']:.3f} ms vs {reference['p50_ms']:.3f} ms "
+                               f"(x{result['p50_ms'] / reference['p50_ms']:.2f})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks hors ligne des chemins critiques du bot")
+    parser.add_argument('cases', nargs='*', help=f"cas à exécuter (défaut: tous) parmi {', '.join(CASES)}")
+    parser.add_argument('--quick', action='store_true', help="moins de répétitions")
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help="fichier de référence JSON")
+    parser.add_argument('--save', action='store_true', help="enregistrer les résultats comme référence")
+    parser.add_argument('--threshold', type=float, default=1.5, help="ralentissement toléré du p50 (x)")
+    parser.add_argument('--min-delta', type=float, default=0.5, help="écart minimal signalé (ms)")
+    args = parser.parse_args()
+
+    results = run(args.cases or None, args.quick)
+
+    print(f"{'cas':32} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10} {'pic Ko':>10} {'retenu Ko':>10}")
+    for key, r in results.items():
+        print(f"{key:32} {r['p50_ms']:10.3f} {r['p90_ms']:10.3f} {r['p99_ms']:10.3f} "
+              f"{r['peak_kb']:10.1f} {r['retained_kb']:10.1f}")
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump({'machine': platform.platform(), 'python': platform.python_version(),
+                       'results': results}, f, indent=2)
+        print(f"Référence enregistrée dans {args.baseline}")
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold, args.min_delta)
+        if regressions:
+            print("Régressions:\n" + "\n".join(regressions))
+            sys.exit(1)
+        print(f"Aucune régression au-delà de x{args.threshold} par rapport à {args.baseline}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,180 @@
+from typing import Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+# Colonnes d'une bougie normalisée (ordre des tuples du KlineCache)
+CANDLE_FIELDS = (
+    'open_time', 'open', 'high', 'low', 'close', 'volume', 'close_time',
+    'quote_asset_volume', 'number_of_trades', 'taker_buy_base_asset_volume',
+    'taker_buy_quote_asset_volume', 'closed'
+)
+INT_FIELDS = ('open_time', 'close_time', 'number_of_trades', 'closed')
+FLOAT_FIELDS = tuple(name for name in CANDLE_FIELDS if name not in INT_FIELDS)
+
+_INT_INDEX = {name: i for i, name in enumerate(INT_FIELDS)}
+_FLOAT_INDEX = {name: i for i, name in enumerate(FLOAT_FIELDS)}
+# Position de chaque champ du tuple dans le bloc entier ou flottant
+_LAYOUT = [(name in _INT_INDEX, _INT_INDEX.get(name, _FLOAT_INDEX.get(name))) for name in CANDLE_FIELDS]
+
+
+class CandleView:
+    """
+    Fenêtre de bougies sous forme de colonnes NumPy contiguës (vues sans
+    copie sur le tampon). La dernière bougie peut être révisée en place par
+    le tampon ; copier les colonnes pour figer un instantané.
+
+    ``key`` (symbol, interval) et ``revision`` identifient le contenu du
+    tampon au moment de la création de la vue.
+    """
+
+    __slots__ = ('_ints', '_floats', 'key', 'revision')
+
+    def __init__(self, ints: np.ndarray, floats: np.ndarray,
+                 key: Optional[Tuple[str, str]] = None, revision: int = 0):
+        self._ints = ints
+        self._floats = floats
+        self.key = key
+        self.revision = revision
+
+    def __len__(self) -> int:
+        return self._ints.shape[1]
+
+    def column(self, name: str) -> np.ndarray:
+        if name in _INT_INDEX:
+            return self._ints[_INT_INDEX[name]]
+        return self._floats[_FLOAT_INDEX[name]]
+
+    open_time = property(lambda self: self._ints[_INT_INDEX['open_time']])
+    close_time = property(lambda self: self._ints[_INT_INDEX['close_time']])
+    closed = property(lambda self: self._ints[_INT_INDEX['closed']])
+    open = property(lambda self: self._floats[_FLOAT_INDEX['open']])
+    high = property(lambda self: self._floats[_FLOAT_INDEX['high']])
+    low = property(lambda self: self._floats[_FLOAT_INDEX['low']])
+    close = property(lambda self: self._floats[_FLOAT_INDEX['close']])
+    volume = property(lambda self: self._floats[_FLOAT_INDEX['volume']])
+
+    def row(self, index: int) -> tuple:
+        """Bougie ``index`` au format tuple du KlineCache"""
+        return tuple(int(self._ints[i, index]) if is_int else float(self._floats[i, index])
+                     for is_int, i in _LAYOUT)
+
+    def last_closed_open_time(self) -> Optional[int]:
+        """Heure d'ouverture (ms) de la dernière bougie clôturée"""
+        closed = np.flatnonzero(self.closed)
+        return int(self.open_time[closed[-1]]) if len(closed) else None
+
+    def to_dataframe(self, time_index: bool = True) -> pd.DataFrame:
+        """
+        Construit un DataFrame (copie) aux colonnes de l'API klines ; avec
+        ``time_index``, indexé par l'heure d'ouverture en datetime.
+        """
+        df = pd.DataFrame({
+            ('timestamp' if name == 'open_time' else name): self.column(name).copy()
+            for name in CANDLE_FIELDS
+        })
+        if time_index:
+            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+            df.set_index('timestamp', inplace=True)
+        return df
+
+
+class CandleBuffer:
+    """
+    Tampon circulaire de bougies à capacité fixe pour un (symbol, interval).
+
+    Chaque colonne est stockée deux fois (tableau de 2 x ``capacity``) pour
+    que toute fenêtre reste une tranche contiguë : ajout et remplacement de
+    la dernière bougie en O(1), vues NumPy sans copie, mémoire bornée à
+    ``nbytes`` quel que soit l'historique.
+    """
+
+    def __init__(self, capacity: int = 5000, key: Optional[Tuple[str, str]] = None):
+        if capacity <= 0:
+            raise ValueError("capacity doit être > 0")
+        self.capacity = capacity
+        self.key = key
+        self.revision = 0
+        self._ints = np.zeros((len(INT_FIELDS), 2 * capacity), dtype=np.int64)
+        self._floats = np.zeros((len(FLOAT_FIELDS), 2 * capacity), dtype=np.float64)
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        return self._ints.nbytes + self._floats.nbytes
+
+    def _write(self, slot: int, row: Sequence):
+        self.revision += 1
+        ints, floats = self._ints, self._floats
+        mirror = slot + self.capacity
+        for value, (is_int, i) in zip(row, _LAYOUT):
+            if is_int:
+                ints[i, slot] = ints[i, mirror] = value
+            else:
+                floats[i, slot] = floats[i, mirror] = value
+
+    def append(self, row: Sequence):
+        """Ajoute une bougie (la plus ancienne est écrasée si le tampon est plein)"""
+        if self._size < self.capacity:
+            self._write((self._start + self._size) % self.capacity, row)
+            self._size += 1
+        else:
+            self._write(self._start, row)
+            self._start = (self._start + 1) % self.capacity
+
+    def replace_last(self, row: Sequence):
+        """Remplace la dernière bougie (bougie en cours révisée)"""
+        if not self._size:
+            raise IndexError("Tampon vide")
+        self._write((self._start + self._size - 1) % self.capacity, row)
+
+    def upsert(self, row: Sequence):
+        """Ajoute ou remplace selon l'heure d'ouverture (ordre chronologique attendu)"""
+        if self._size:
+            last_open = self._ints[0, self._start + self._size - 1]
+            if row[0] == last_open:
+                self.replace_last(row)
+                return
+            if row[0] < last_open:
+                self._insert_older(row)
+                return
+        self.append(row)
+
+    def _insert_older(self, row: Sequence):
+        """Bougie antérieure à la dernière : rare, on reconstruit le tampon (O(n))"""
+        rows = self.rows()
+        index = int(np.searchsorted(self.view().open_time, row[0]))
+        if index < len(rows) and rows[index][0] == row[0]:
+            rows[index] = tuple(row)
+        else:
+            rows.insert(index, tuple(row))
+        self.clear()
+        self.extend(rows[-self.capacity:])
+
+    def extend(self, rows: Iterable[Sequence]):
+        for row in rows:
+            self.upsert(row)
+
+    def clear(self):
+        self.revision += 1
+        self._start = 0
+        self._size = 0
+
+    def last(self) -> Optional[tuple]:
+        """Dernière bougie au format tuple, ou None"""
+        return self.view().row(-1) if self._size else None
+
+    def rows(self) -> list:
+        view = self.view()
+        return [view.row(i) for i in range(len(view))]
+
+    def view(self, start_ms: Optional[int] = None) -> CandleView:
+        """Bougies dont l'ouverture est >= ``start_ms`` (toutes par défaut), sans copie"""
+        begin, end = self._start, self._start + self._size
+        if start_ms is not None and self._size:
+            begin += int(np.searchsorted(self._ints[0, begin:end], start_ms))
+        return CandleView(self._ints[:, begin:end], self._floats[:, begin:end], self.key, self.revision)
@@ -0,0 +1,93 @@
+import asyncio
+import heapq
+import itertools
+import time
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+
+class SystemClock:
+    """Horloge réelle (par défaut)"""
+
+    def time(self) -> float:
+        return time.time()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    async def sleep(self, delay: float):
+        await asyncio.sleep(delay)
+
+
+class VirtualClock:
+    """
+    Horloge virtuelle pour le rejeu : ``sleep`` ne consomme pas de temps réel
+    (ou ``delay / speed`` si ``speed`` est donné). Les dormeurs sont réveillés
+    dans l'ordre de leurs échéances, une fois que les autres tâches ont
+    atteint leur prochaine attente.
+    """
+
+    def __init__(self, start: float, speed: Optional[float] = None):
+        self._now = start
+        self.speed = speed
+        self._sleepers: List[Tuple[float, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._advancer: Optional[asyncio.Task] = None
+
+    def time(self) -> float:
+        return self._now
+
+    def monotonic(self) -> float:
+        return self._now
+
+    async def sleep(self, delay: float):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        heapq.heappush(self._sleepers, (self._now + max(0.0, delay), next(self._seq), future))
+        if self._advancer is None or self._advancer.done():
+            self._advancer = loop.create_task(self._advance())
+        await future
+
+    async def _advance(self):
+        while self._sleepers:
+            # Laisser les tâches prêtes atteindre leur prochaine attente
+            for _ in range(20):
+                await asyncio.sleep(0)
+            deadline, _, future = heapq.heappop(self._sleepers)
+            if future.done():
+                continue
+            if self.speed:
+                await asyncio.sleep(max(0.0, deadline - self._now) / self.speed)
+            self._now = max(self._now, deadline)
+            future.set_result(None)
+
+
+_clock = SystemClock()
+
+
+def get_clock():
+    return _clock
+
+
+def set_clock(clock):
+    """Remplace l'horloge du bot (rejeu, tests)"""
+    global _clock
+    _clock = clock
+
+
+def now() -> float:
+    """Heure courante (secondes epoch)"""
+    return _clock.time()
+
+
+def monotonic() -> float:
+    return _clock.monotonic()
+
+
+def datetime_now() -> datetime:
+    """Équivalent de ``datetime.now()`` sur l'horloge courante"""
+    return datetime.fromtimestamp(_clock.time())
+
+
+async def sleep(delay: float):
+    await _clock.sleep(delay)
@@ -1,12 +1,16 @@
 import os
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import List, Optional
 
 @dataclass
 class TradingConfig:
     # Paramètres de trading
     symbol: str = "BTCUSDT"
+    symbols: List[str] = field(default_factory=list)  # multi-symbole (vide = symbol seul)
+    scan_symbols: List[str] = field(default_factory=list)  # liste du scanner /scan (vide = symboles tradés)
     timeframe: str = "15m"
+    trend_timeframe: Optional[str] = None  # filtre MA200 sur une autre unité (ex: "1h"), None = timeframe
+    resample_base: Optional[str] = None  # ex: "1m": toutes les unités dérivées de ce seul flux
     rsi_length: int = 50
     rsi_entry_threshold: float = 10.0
     rsi_exit_threshold: float = 95.0
@@ -15,9 +19,59 @@ class TradingConfig:
     risk_per_trade: float = 2.0  # % du capital par trade
     max_positions: int = 1
     stop_loss_pct: float = 5.0  # % de stop loss
+    stop_loss_monitor: bool = True  # stop surveillé en temps réel (stream bookTicker)
+    
+    # Données de marché
+    kline_cache_path: str = "klines.db"
+    backtest_cache_path: str = "backtest_klines.db"  # historique long du backtest / de l'optimiseur
+    kline_cache_ttl: float = 30.0  # secondes avant de resynchroniser une fenêtre
+    market_data_mode: str = "rest"  # "rest" (polling) ou "websocket"
+    ws_base_url: str = "wss://stream.binance.com:9443"
+    testnet_ws_url: str = "wss://testnet.binance.vision"
+    
+    # Exécution des E/S (Binance, SQLite) hors de la boucle asyncio
+    io_workers: int = 4
+    io_timeout: float = 10.0  # secondes par appel
+    order_timeout: float = 30.0
+    order_retry_attempts: int = 3  # envois d'un même ordre (même newClientOrderId)
+    time_sync_interval: float = 3600.0  # secondes entre deux recalages de l'horodatage signé
+    rest_weight_limit: int = 5000  # poids REST par minute, tous symboles confondus
+    order_limit_10s: int = 50
+    order_limit_1d: int = 160000
+    
+    # Historique du capital: agrégation 15m/1h/1d et rétention
+    capital_compaction_interval: float = 3600.0  # secondes
+    
+    # Mémoïsation des indicateurs (entrées LRU)
+    indicator_cache_size: int = 256
+    
+    # Soldes du compte: stream user-data, REST en secours
+    account_stream: bool = True
+    account_state_ttl: float = 30.0  # secondes
+    
+    # Endpoint Prometheus local (None = désactivé)
+    metrics_host: str = "127.0.0.1"
+    metrics_port: Optional[int] = 9108
+    
+    # Budget de durée d'import de main.py (python main.py --check-startup)
+    startup_import_budget_ms: float = 500.0
+    
+    # Journal binaire des données reçues de l'exchange (None = désactivé)
+    record_path: Optional[str] = None
+    
+    # Planification alignée sur les clôtures de bougies (mode REST)
+    candle_settle_delay: float = 2.0  # secondes après la clôture
+    candle_retry_attempts: int = 3
+    intra_candle_check_interval: Optional[float] = None  # secondes, None = désactivé
+    clock_sync_interval: float = 3600.0
     
     # Trading settings
     is_demo: bool = False
+    demo_exchange: str = "simulated"  # "simulated" (en mémoire) ou "testnet"
+    sim_initial_balance: float = 10000.0  # USDT
+    sim_fee_rate: float = 0.001
+    sim_slippage: float = 0.0005
+    sim_latency: float = 0.0  # secondes par ordre
     is_active: bool = False
     
     # API Keys (à remplir)
@@ -33,6 +87,19 @@ class TradingConfig:
         self.binance_api_key = os.getenv("BINANCE_API_KEY", self.binance_api_key)
         self.binance_secret_key = os.getenv("BINANCE_SECRET_KEY", self.binance_secret_key)
         self.telegram_bot_token = os.getenv("TELEGRAM_BOT_TOKEN",   self.telegram_bot_token)
+        self.record_path = os.getenv("RECORD_PATH", self.record_path)
+        self.kline_cache_path = os.getenv("KLINE_CACHE_PATH", self.kline_cache_path)
+        self.demo_exchange = os.getenv("DEMO_EXCHANGE", self.demo_exchange)
+        if os.getenv("METRICS_PORT") is not None:
+            self.metrics_port = int(os.getenv("METRICS_PORT")) or None
+        if os.getenv("SYMBOLS"):
+            self.symbols = [s.strip().upper() for s in os.getenv("SYMBOLS").split(",") if s.strip()]
+        if os.getenv("SCAN_SYMBOLS"):
+            self.scan_symbols = [s.strip().upper() for s in os.getenv("SCAN_SYMBOLS").split(",") if s.strip()]
+    
+    def trading_symbols(self) -> List[str]:
+        """Symboles tradés par le moteur"""
+        return list(self.symbols) if self.symbols else [self.symbol]
 
 # Configuration globale
 config = TradingConfig()
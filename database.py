@@ -1,16 +1,96 @@
+import atexit
+import calendar
 import sqlite3
 import json
-from datetime import datetime
-from typing import Dict, List, Optional
+import threading
+from concurrent.futures import Future
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import clock
+from persistence import WriteBehindQueue
+from trade_stats import TradeStats, hold_seconds
+
+# Historique du capital: résolution complète récente, puis agrégats OHLC
+RAW_SNAPSHOT_SECONDS = 60
+RAW_RETENTION = timedelta(days=2)
+# (résolution, durée du bucket en secondes, rétention ou None pour illimité)
+CAPITAL_TIERS = [
+    ('15m', 15 * 60, timedelta(days=30)),
+    ('1h', 60 * 60, timedelta(days=365)),
+    ('1d', 24 * 60 * 60, None),
+]
+
+
+def _epoch(dt: datetime) -> int:
+    """Secondes epoch d'un datetime naïf, comme strftime('%s') de SQLite"""
+    return calendar.timegm(dt.timetuple())
+
+
+def _from_epoch(seconds: int) -> datetime:
+    return datetime(1970, 1, 1) + timedelta(seconds=seconds)
 
 class Database:
     def __init__(self, db_path: str = "trading_bot.db"):
         self.db_path = db_path
-        self.init_database()
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._trade_id_lock = threading.Lock()
+        self._next_trade_id: Optional[int] = None
+        self._writer: Optional[WriteBehindQueue] = None
+        # Schéma créé à la première requête: l'import du module reste instantané
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._schema_owner: Optional[int] = None
+    
+    def _ensure_schema(self):
+        """Initialise la base une seule fois, au premier accès (tous threads confondus)"""
+        if self._schema_ready or self._schema_owner == threading.get_ident():
+            return
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            self._schema_owner = threading.get_ident()
+            try:
+                self.init_database()
+            finally:
+                self._schema_owner = None
+            self._schema_ready = True
+    
+    def _connection(self) -> sqlite3.Connection:
+        """
+        Connexion persistante propre au thread appelant. En mode WAL, les
+        lecteurs (handlers Telegram) ne bloquent jamais l'écrivain (boucle de trading).
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, cached_statements=128, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA cache_size=-8000")
+            conn.execute("PRAGMA busy_timeout=5000")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        self._ensure_schema()
+        return conn
+    
+    def close(self):
+        """Vide la file d'écriture puis ferme toutes les connexions ouvertes"""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
     
     def init_database(self):
         """Initialise la base de données"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connection()
         cursor = conn.cursor()
         
         # Table des trades
@@ -50,19 +130,59 @@ class Database:
             )
         """)
         
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_capital_history_timestamp
+            ON capital_history (timestamp)
+        """)
+        
+        # Historique du capital agrégé (OHLC de l'equity) par résolution
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS capital_rollup (
+                resolution TEXT NOT NULL,
+                bucket_start INTEGER NOT NULL,
+                open REAL NOT NULL,
+                high REAL NOT NULL,
+                low REAL NOT NULL,
+                close REAL NOT NULL,
+                balance REAL NOT NULL,
+                samples INTEGER NOT NULL,
+                PRIMARY KEY (resolution, bucket_start)
+            ) WITHOUT ROWID
+        """)
+        
+        # Agrégats de trading tenus à jour à chaque clôture
+        columns = ", ".join(f"{name} REAL NOT NULL DEFAULT 0" for name in TradeStats.columns())
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS trade_stats (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                {columns}
+            )
+        """)
+        
         conn.commit()
-        conn.close()
-    
-    def add_trade(self, trade_data: Dict):
-        """Ajoute un trade à la base"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
         
+        cursor.execute("SELECT COUNT(*) FROM trade_stats")
+        if cursor.fetchone()[0] == 0:
+            self.rebuild_trading_stats()
+    
+    def allocate_trade_id(self) -> int:
+        """Réserve l'identifiant du prochain trade (connu avant l'écriture en base)"""
+        with self._trade_id_lock:
+            if self._next_trade_id is None:
+                cursor = self._connection().cursor()
+                cursor.execute("SELECT COALESCE(MAX(id), 0) FROM trades")
+                self._next_trade_id = cursor.fetchone()[0] + 1
+            trade_id = self._next_trade_id
+            self._next_trade_id += 1
+            return trade_id
+    
+    def _insert_trade(self, cursor: sqlite3.Cursor, trade_id: int, trade_data: Dict) -> int:
         cursor.execute("""
-            INSERT INTO trades (symbol, side, quantity, entry_price, exit_price, 
+            INSERT INTO trades (id, symbol, side, quantity, entry_price, exit_price, 
                               pnl, status, entry_time, exit_time, rsi_entry, rsi_exit)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         """, (
+            trade_id,
             trade_data.get('symbol'),
             trade_data.get('side'),
             trade_data.get('quantity'),
@@ -75,27 +195,105 @@ class Database:
             trade_data.get('rsi_entry'),
             trade_data.get('rsi_exit')
         ))
-        
-        conn.commit()
-        trade_id = cursor.lastrowid
-        conn.close()
         return trade_id
     
-    def update_trade(self, trade_id: int, update_data: Dict):
-        """Met à jour un trade"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def _update_trade(self, cursor: sqlite3.Cursor, trade_id: int, update_data: Dict) -> int:
+        closing = update_data.get('status') == 'CLOSED'
+        if closing:
+            cursor.execute("SELECT status FROM trades WHERE id = ?", (trade_id,))
+            row = cursor.fetchone()
+            closing = row is not None and row[0] != 'CLOSED'
         
         set_clause = ", ".join([f"{k} = ?" for k in update_data.keys()])
         values = list(update_data.values()) + [trade_id]
         
         cursor.execute(f"UPDATE trades SET {set_clause} WHERE id = ?", values)
+        
+        if closing:
+            # Mise à jour des agrégats dans la même transaction que la clôture
+            cursor.execute("SELECT pnl, entry_time, exit_time FROM trades WHERE id = ?", (trade_id,))
+            pnl, entry_time, exit_time = cursor.fetchone()
+            stats = self._load_stats(cursor)
+            stats.record(pnl, hold_seconds(entry_time, exit_time))
+            self._save_stats(cursor, stats)
+        return trade_id
+    
+    def _load_stats(self, cursor: sqlite3.Cursor) -> TradeStats:
+        columns = TradeStats.columns()
+        cursor.execute(f"SELECT {', '.join(columns)} FROM trade_stats WHERE id = 1")
+        row = cursor.fetchone()
+        if row is None:
+            return TradeStats()
+        stats = TradeStats(*row)
+        for name in ('total_trades', 'winning_trades', 'losing_trades'):
+            setattr(stats, name, int(getattr(stats, name)))
+        return stats
+    
+    def _save_stats(self, cursor: sqlite3.Cursor, stats: TradeStats):
+        columns = TradeStats.columns()
+        cursor.execute(f"""
+            INSERT OR REPLACE INTO trade_stats (id, {', '.join(columns)})
+            VALUES (1, {', '.join('?' for _ in columns)})
+        """, [getattr(stats, name) for name in columns])
+    
+    def _insert_capital_snapshot(self, cursor: sqlite3.Cursor, timestamp: datetime, balance: float,
+                                 equity: float, unrealized_pnl: float):
+        cursor.execute("""
+            INSERT INTO capital_history (timestamp, balance, equity, unrealized_pnl)
+            VALUES (?, ?, ?, ?)
+        """, (timestamp, balance, equity, unrealized_pnl))
+    
+    def add_trade(self, trade_data: Dict):
+        """Ajoute un trade à la base"""
+        conn = self._connection()
+        trade_id = self._insert_trade(conn.cursor(), self.allocate_trade_id(), trade_data)
         conn.commit()
-        conn.close()
+        return trade_id
+    
+    def update_trade(self, trade_id: int, update_data: Dict):
+        """Met à jour un trade"""
+        conn = self._connection()
+        self._update_trade(conn.cursor(), trade_id, update_data)
+        conn.commit()
+    
+    @property
+    def writer(self) -> WriteBehindQueue:
+        """File d'écriture différée (démarrée au premier usage)"""
+        with self._trade_id_lock:
+            if self._writer is None:
+                self._writer = WriteBehindQueue(self._connection)
+                atexit.register(self._writer.close)
+            return self._writer
+    
+    def queue_add_trade(self, trade_data: Dict) -> Tuple[int, Future]:
+        """
+        Enregistre un trade sans attendre le disque. Renvoie l'identifiant
+        (réservé immédiatement) et l'accusé de durabilité.
+        """
+        trade_id = self.allocate_trade_id()
+        future = self.writer.submit(lambda cursor: self._insert_trade(cursor, trade_id, trade_data), durable=True)
+        return trade_id, future
+    
+    def queue_update_trade(self, trade_id: int, update_data: Dict) -> Future:
+        """Met à jour un trade sans attendre le disque; renvoie l'accusé de durabilité"""
+        return self.writer.submit(lambda cursor: self._update_trade(cursor, trade_id, update_data), durable=True)
+    
+    def queue_capital_snapshot(self, balance: float, equity: float, unrealized_pnl: float):
+        """Snapshot du capital en écriture différée (sans accusé)"""
+        timestamp = clock.datetime_now()
+        self.writer.submit(
+            lambda cursor: self._insert_capital_snapshot(cursor, timestamp, balance, equity, unrealized_pnl)
+        )
+    
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Attend l'écriture de tout ce qui est en file"""
+        if self._writer is None:
+            return True
+        return self._writer.flush(timeout)
     
     def get_open_trades(self) -> List[Dict]:
         """Récupère les trades ouverts"""
-        conn = sqlite3.connect(self.db_path)
+        conn = self._connection()
         cursor = conn.cursor()
         
         cursor.execute("SELECT * FROM trades WHERE status = 'OPEN'")
@@ -108,51 +306,175 @@ class Database:
                 'exit_time': row[9], 'rsi_entry': row[10], 'rsi_exit': row[11]
             })
         
-        conn.close()
         return trades
     
     def get_trading_stats(self) -> Dict:
-        """Calcule les statistiques de trading"""
-        conn = sqlite3.connect(self.db_path)
+        """Statistiques de trading (lecture des agrégats, en O(1))"""
+        cursor = self._connection().cursor()
+        return self._load_stats(cursor).summary()
+    
+    def rebuild_trading_stats(self) -> Dict:
+        """
+        Recalcule les agrégats à partir de tous les trades fermés, les
+        compare à ceux tenus à jour et les remplace. Renvoie les écarts.
+        """
+        conn = self._connection()
         cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            rebuilt = TradeStats()
+            cursor.execute("""
+                SELECT pnl, entry_time, exit_time FROM trades
+                WHERE status = 'CLOSED' ORDER BY exit_time, id
+            """)
+            for pnl, entry_time, exit_time in cursor.fetchall():
+                rebuilt.record(pnl, hold_seconds(entry_time, exit_time))
+            
+            mismatches = self._load_stats(cursor).diff(rebuilt)
+            self._save_stats(cursor, rebuilt)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return mismatches
+    
+    def save_capital_snapshot(self, balance: float, equity: float, unrealized_pnl: float):
+        """Sauvegarde un snapshot du capital"""
+        conn = self._connection()
+        self._insert_capital_snapshot(conn.cursor(), datetime.now(), balance, equity, unrealized_pnl)
+        conn.commit()
+    
+    def _rollup(self, cursor: sqlite3.Cursor, resolution: str, bucket_seconds: int, source: Optional[str],
+                now_epoch: int) -> int:
+        """Agrège les buckets complets d'une résolution depuis la résolution inférieure"""
+        cursor.execute("SELECT MAX(bucket_start) FROM capital_rollup WHERE resolution = ?", (resolution,))
+        watermark = cursor.fetchone()[0] or 0
         
-        # Trades fermés
-        cursor.execute("SELECT COUNT(*), SUM(pnl), AVG(pnl) FROM trades WHERE status = 'CLOSED'")
-        total_trades, total_pnl, avg_pnl = cursor.fetchone()
-        
-        # Trades gagnants
-        cursor.execute("SELECT COUNT(*) FROM trades WHERE status = 'CLOSED' AND pnl > 0")
-        winning_trades = cursor.fetchone()[0]
-        
-        # Trades perdants
-        cursor.execute("SELECT COUNT(*) FROM trades WHERE status = 'CLOSED' AND pnl < 0")
-        losing_trades = cursor.fetchone()[0]
-        
-        conn.close()
+        if source is None:
+            cursor.execute("""
+                SELECT timestamp, equity, balance FROM capital_history
+                WHERE timestamp >= ? ORDER BY timestamp
+            """, (_from_epoch(watermark),))
+            rows = [(_epoch(datetime.fromisoformat(ts)), equity, equity, equity, equity, balance, 1)
+                    for ts, equity, balance in cursor.fetchall()]
+        else:
+            cursor.execute("""
+                SELECT bucket_start, open, high, low, close, balance, samples FROM capital_rollup
+                WHERE resolution = ? AND bucket_start >= ? ORDER BY bucket_start
+            """, (source, watermark))
+            rows = cursor.fetchall()
         
-        win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
+        buckets = {}
+        for ts, open_, high, low, close, balance, samples in rows:
+            start = ts - ts % bucket_seconds
+            if start + bucket_seconds > now_epoch:
+                break  # bucket en cours: agrégé à la prochaine compaction
+            bucket = buckets.get(start)
+            if bucket is None:
+                buckets[start] = [open_, high, low, close, balance, samples]
+            else:
+                bucket[1] = max(bucket[1], high)
+                bucket[2] = min(bucket[2], low)
+                bucket[3] = close
+                bucket[4] = balance
+                bucket[5] += samples
         
-        return {
-            'total_trades': total_trades or 0,
-            'total_pnl': total_pnl or 0,
-            'avg_pnl': avg_pnl or 0,
-            'winning_trades': winning_trades or 0,
-            'losing_trades': losing_trades or 0,
-            'win_rate': win_rate
-        }
+        cursor.executemany("""
+            INSERT OR REPLACE INTO capital_rollup
+                (resolution, bucket_start, open, high, low, close, balance, samples)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(resolution, start) + tuple(values) for start, values in buckets.items()])
+        return len(buckets)
     
-    def save_capital_snapshot(self, balance: float, equity: float, unrealized_pnl: float):
-        """Sauvegarde un snapshot du capital"""
-        conn = sqlite3.connect(self.db_path)
+    def compact_capital_history(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """
+        Agrège l'historique du capital en buckets 15m/1h/1d puis applique la
+        rétention de chaque niveau. Idempotent; à lancer périodiquement.
+        """
+        now = now or datetime.now()
+        now_epoch = _epoch(now)
+        conn = self._connection()
         cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            report = {}
+            source = None
+            for resolution, bucket_seconds, retention in CAPITAL_TIERS:
+                report[resolution] = self._rollup(cursor, resolution, bucket_seconds, source, now_epoch)
+                source = resolution
+            
+            cursor.execute("DELETE FROM capital_history WHERE timestamp < ?", (now - RAW_RETENTION,))
+            report['raw_deleted'] = cursor.rowcount
+            for resolution, bucket_seconds, retention in CAPITAL_TIERS:
+                if retention is not None:
+                    cursor.execute("""
+                        DELETE FROM capital_rollup WHERE resolution = ? AND bucket_start < ?
+                    """, (resolution, now_epoch - int(retention.total_seconds())))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        return report
+    
+    def get_equity_curve(self, start: datetime, end: Optional[datetime] = None,
+                         max_points: int = 500) -> List[Dict]:
+        """
+        Courbe d'equity sur une période, lue à la résolution la plus fine
+        qui couvre la période en au plus ``max_points`` points (requêtes indexées).
+        Au-delà de ``max_points``, ce sont les points les plus récents qui sont
+        renvoyés, dans l'ordre chronologique.
+        """
+        end = end or datetime.now()
+        span = max((end - start).total_seconds(), 1)
+        cursor = self._connection().cursor()
+        
+        if start >= datetime.now() - RAW_RETENTION and span / RAW_SNAPSHOT_SECONDS <= max_points:
+            cursor.execute("""
+                SELECT timestamp, equity, balance FROM capital_history
+                WHERE timestamp >= ? AND timestamp <= ? ORDER BY timestamp DESC LIMIT ?
+            """, (start, end, max_points))
+            return [{'timestamp': datetime.fromisoformat(ts), 'equity': equity, 'balance': balance}
+                    for ts, equity, balance in reversed(cursor.fetchall())]
+        
+        resolution, bucket_seconds = CAPITAL_TIERS[-1][:2]
+        for tier, tier_seconds, retention in CAPITAL_TIERS:
+            covered = retention is None or start >= datetime.now() - retention
+            if covered and span / tier_seconds <= max_points:
+                resolution, bucket_seconds = tier, tier_seconds
+                break
         
+        first_bucket = _epoch(start) - _epoch(start) % bucket_seconds
         cursor.execute("""
-            INSERT INTO capital_history (timestamp, balance, equity, unrealized_pnl)
-            VALUES (?, ?, ?, ?)
-        """, (datetime.now(), balance, equity, unrealized_pnl))
+            SELECT bucket_start, open, high, low, close, balance FROM capital_rollup
+            WHERE resolution = ? AND bucket_start >= ? AND bucket_start <= ?
+            ORDER BY bucket_start DESC LIMIT ?
+        """, (resolution, first_bucket, _epoch(end), max_points))
+        points = [{'timestamp': _from_epoch(bucket_start), 'open': open_, 'high': high, 'low': low,
+                   'equity': close, 'balance': balance}
+                  for bucket_start, open_, high, low, close, balance in reversed(cursor.fetchall())]
         
-        conn.commit()
-        conn.close()
+        # Snapshots bruts pas encore compactés (jusqu'à capital_compaction_interval de retard),
+        # regroupés à la même résolution; le dernier bucket est en cours
+        since = _epoch(points[-1]['timestamp']) + bucket_seconds if points else first_bucket
+        cursor.execute("""
+            SELECT timestamp, equity, balance FROM capital_history
+            WHERE timestamp >= ? AND timestamp <= ? ORDER BY timestamp
+        """, (_from_epoch(since), end))
+        recent: Dict[int, Dict] = {}
+        for ts, equity, balance in cursor.fetchall():
+            epoch = _epoch(datetime.fromisoformat(ts))
+            bucket_start = epoch - epoch % bucket_seconds
+            point = recent.get(bucket_start)
+            if point is None:
+                recent[bucket_start] = {'timestamp': _from_epoch(bucket_start), 'open': equity, 'high': equity,
+                                        'low': equity, 'equity': equity, 'balance': balance}
+            else:
+                point['high'] = max(point['high'], equity)
+                point['low'] = min(point['low'], equity)
+                point['equity'] = equity
+                point['balance'] = balance
+        points.extend(recent.values())
+        return points[-max_points:]
 
 # Instance globale
 db = Database()
@@ -0,0 +1,260 @@
+import asyncio
+import itertools
+import logging
+import time
+from dataclasses import dataclass, field
+from decimal import Decimal, ROUND_DOWN
+from typing import Dict, Iterable, Optional, Tuple
+
+import clock
+from async_io import run_blocking, run_order
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Codes Binance pour lesquels l'ordre a pu être exécuté malgré l'erreur
+# (déconnexion, réponse inattendue, délai côté serveur): vérifier avant de renvoyer
+UNKNOWN_STATUS_CODES = {-1001, -1006, -1007}
+# Horodatage hors recvWindow: l'ordre est refusé, resynchroniser puis renvoyer
+TIMESTAMP_CODE = -1021
+ORDER_NOT_FOUND_CODE = -2013
+
+DEFAULT_STEP = Decimal("0.000001")
+
+
+class OrderRejected(Exception):
+    """Ordre refusé avant ou par l'exchange (pas de nouvelle tentative)"""
+
+    def __init__(self, code: Optional[int], message: str):
+        super().__init__(f"Ordre refusé (code={code}): {message}")
+        self.code = code
+        self.message = message
+
+
+@dataclass
+class SymbolFilters:
+    """Filtres d'un symbole utiles aux ordres au marché (LOT_SIZE, MIN_NOTIONAL)"""
+    step_size: Decimal = DEFAULT_STEP
+    min_qty: Decimal = Decimal(0)
+    max_qty: Optional[Decimal] = None
+    min_notional: float = 0.0
+    base_asset: str = ""
+    quote_asset: str = ""
+
+    @classmethod
+    def from_symbol_info(cls, info: Dict) -> 'SymbolFilters':
+        filters = cls(base_asset=info.get('baseAsset', ''), quote_asset=info.get('quoteAsset', ''))
+        by_type = {f['filterType']: f for f in info.get('filters', [])}
+        # MARKET_LOT_SIZE prime sur LOT_SIZE pour les ordres au marché, s'il est renseigné
+        for name in ('LOT_SIZE', 'MARKET_LOT_SIZE'):
+            lot = by_type.get(name)
+            if lot is None:
+                continue
+            if Decimal(lot['stepSize']) > 0:
+                filters.step_size = Decimal(lot['stepSize']).normalize()
+            if Decimal(lot['minQty']) > 0:
+                filters.min_qty = Decimal(lot['minQty'])
+            if Decimal(lot['maxQty']) > 0:
+                filters.max_qty = Decimal(lot['maxQty'])
+        notional = by_type.get('NOTIONAL') or by_type.get('MIN_NOTIONAL')
+        if notional is not None:
+            filters.min_notional = float(notional.get('minNotional', 0))
+        return filters
+
+    def quantize(self, quantity: float) -> Decimal:
+        """Arrondit une quantité au pas inférieur (jamais au-dessus du solde)"""
+        steps = (Decimal(repr(quantity)) / self.step_size).to_integral_value(rounding=ROUND_DOWN)
+        quantized = steps * self.step_size
+        if self.max_qty is not None and quantized > self.max_qty:
+            quantized = (self.max_qty / self.step_size).to_integral_value(rounding=ROUND_DOWN) * self.step_size
+        return quantized
+
+    def check(self, quantity: Decimal, price: float) -> Optional[str]:
+        """Motif de refus pré-trade, ou None si l'ordre passe les filtres"""
+        if quantity <= 0 or quantity < self.min_qty:
+            return f"quantité {quantity} < minimum {self.min_qty}"
+        if price > 0 and float(quantity) * price < self.min_notional:
+            return f"notionnel {float(quantity) * price:.2f} < minimum {self.min_notional}"
+        return None
+
+
+@dataclass
+class Fill:
+    """Exécution réconciliée d'un ordre au marché"""
+    symbol: str
+    side: str
+    client_order_id: str
+    order_id: Optional[int]
+    status: str
+    executed_qty: float
+    quote_qty: float
+    commissions: Dict[str, float] = field(default_factory=dict)
+    attempts: int = 1
+    sent_at: float = 0.0  # perf_counter à l'envoi de la tentative retenue
+
+    @property
+    def avg_price(self) -> float:
+        return self.quote_qty / self.executed_qty if self.executed_qty else 0.0
+
+    @classmethod
+    def from_order(cls, order: Dict, side: str, client_order_id: str) -> 'Fill':
+        fills = order.get('fills') or []
+        commissions: Dict[str, float] = {}
+        if fills:
+            executed = sum(float(f['qty']) for f in fills)
+            quote = sum(float(f['qty']) * float(f['price']) for f in fills)
+            for f in fills:
+                asset = f.get('commissionAsset')
+                if asset:
+                    commissions[asset] = commissions.get(asset, 0.0) + float(f.get('commission', 0))
+        else:
+            # Réponse RESULT ou get_order: pas de détail des exécutions ni des frais
+            executed = float(order.get('executedQty', 0))
+            quote = float(order.get('cummulativeQuoteQty', 0))
+        return cls(symbol=order.get('symbol', ''), side=side,
+                   client_order_id=order.get('clientOrderId', client_order_id),
+                   order_id=order.get('orderId'), status=order.get('status', 'FILLED'),
+                   executed_qty=executed, quote_qty=quote, commissions=commissions)
+
+    def commission_in_quote(self, base_asset: str, quote_asset: str) -> float:
+        """Frais convertis en actif de cotation au prix moyen (hors BNB et autres actifs)"""
+        return (self.commissions.get(quote_asset, 0.0)
+                + self.commissions.get(base_asset, 0.0) * self.avg_price)
+
+    def net_base_qty(self, base_asset: str) -> float:
+        """Quantité réellement détenue après un achat (frais prélevés en actif de base)"""
+        return self.executed_qty - self.commissions.get(base_asset, 0.0)
+
+
+class ExecutionEngine:
+    """
+    Chemin d'ordre au marché : quantités pré-arrondies sur les filtres en
+    cache, horodatage aligné sur le serveur, ``newClientOrderId`` stable
+    pour des reprises sans doublon, et exécution réconciliée depuis la
+    réponse (prix moyen, quantité, frais).
+    """
+
+    def __init__(self, client=None, attempts: int = 3, timeout: float = 30.0, retry_delay: float = 0.5,
+                 prefix: str = "plnx"):
+        self.client = client
+        self.attempts = attempts
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+        self.prefix = prefix
+        self.filters: Dict[str, SymbolFilters] = {}
+        self.time_offset_ms = 0
+        self._ids = itertools.count(1)
+
+    # --- Préparation (hors chemin critique) ---
+
+    def load_filters(self, symbols: Iterable[str]):
+        """Charge les filtres des symboles tradés (un seul ``get_exchange_info``)"""
+        wanted = set(symbols)
+        info = self.client.get_exchange_info()
+        for symbol_info in info.get('symbols', []):
+            if symbol_info.get('symbol') in wanted:
+                self.filters[symbol_info['symbol']] = SymbolFilters.from_symbol_info(symbol_info)
+        missing = wanted - set(self.filters)
+        if missing:
+            logger.warning(f"Filtres inconnus pour {', '.join(sorted(missing))}: pas par défaut {DEFAULT_STEP}")
+
+    def filters_for(self, symbol: str) -> SymbolFilters:
+        filters = self.filters.get(symbol)
+        if filters is None:
+            from sim_exchange import split_symbol
+            try:
+                base, quote = split_symbol(symbol)
+            except ValueError:
+                base, quote = symbol, ""
+            filters = self.filters[symbol] = SymbolFilters(base_asset=base, quote_asset=quote)
+        return filters
+
+    def sync_time(self) -> int:
+        """Aligne l'horodatage des requêtes signées sur l'heure du serveur"""
+        started = time.time()
+        server_ms = self.client.get_server_time()['serverTime']
+        local_ms = (started + time.time()) / 2 * 1000
+        self.time_offset_ms = int(server_ms - local_ms)
+        # python-binance ajoute timestamp_offset à chaque horodatage signé
+        self.client.timestamp_offset = self.time_offset_ms
+        logger.debug(f"Décalage horloge des ordres: {self.time_offset_ms} ms")
+        return self.time_offset_ms
+
+    def new_client_order_id(self, symbol: str, side: str) -> str:
+        """Identifiant unique et stable sur toutes les tentatives d'un même ordre (36 car. max)"""
+        return f"{self.prefix}-{side[0]}{int(clock.now() * 1000):x}-{next(self._ids):x}"[:36]
+
+    def prepare(self, symbol: str, side: str, quantity: float, price: float) -> Tuple[str, str]:
+        """Contrôles pré-trade: quantité arrondie au pas (chaîne) et identifiant client"""
+        filters = self.filters_for(symbol)
+        quantized = filters.quantize(quantity)
+        reason = filters.check(quantized, price)
+        if reason:
+            raise OrderRejected(None, f"{symbol} {side}: {reason}")
+        return format(quantized.normalize(), 'f'), self.new_client_order_id(symbol, side)
+
+    # --- Envoi ---
+
+    def _send(self, symbol: str, side: str, quantity: str, client_order_id: str) -> Tuple[Dict, float]:
+        sent_at = time.perf_counter()
+        send = self.client.order_market_buy if side == 'BUY' else self.client.order_market_sell
+        order = send(symbol=symbol, quantity=quantity, newClientOrderId=client_order_id,
+                     newOrderRespType='FULL')
+        return order, sent_at
+
+    def _lookup(self, symbol: str, client_order_id: str) -> Optional[Dict]:
+        """Ordre connu de l'exchange sous cet identifiant, ou None"""
+        try:
+            return self.client.get_order(symbol=symbol, origClientOrderId=client_order_id)
+        except Exception as e:
+            if getattr(e, 'code', None) != ORDER_NOT_FOUND_CODE:
+                logger.warning(f"{symbol}: vérification de l'ordre {client_order_id} impossible: {e}")
+            return None
+
+    async def submit(self, symbol: str, side: str, quantity: float, price: float) -> Fill:
+        """
+        Passe un ordre au marché et renvoie son exécution réconciliée. En cas
+        de statut inconnu (délai, erreur réseau), l'ordre est recherché par
+        son identifiant client avant tout renvoi. Lève ``OrderRejected``.
+        """
+        qty, client_order_id = self.prepare(symbol, side, quantity, price)
+        last_error: Optional[BaseException] = None
+
+        for attempt in range(1, self.attempts + 1):
+            if attempt > 1:
+                await asyncio.sleep(self.retry_delay * (attempt - 1))
+                # L'envoi précédent a pu aboutir: ne jamais dupliquer l'ordre
+                order = await run_order(self._lookup, symbol, client_order_id)
+                if order is not None:
+                    logger.info(f"{symbol}: ordre {client_order_id} retrouvé après erreur ({order.get('status')})")
+                    fill = Fill.from_order(order, side, client_order_id)
+                    fill.attempts = attempt - 1
+                    return fill
+            try:
+                order, sent_at = await run_order(self._send, symbol, side, qty, client_order_id,
+                                                 timeout=self.timeout)
+            except asyncio.TimeoutError as e:
+                last_error = e
+                logger.warning(f"{symbol}: ordre {client_order_id} sans réponse (tentative {attempt})")
+                continue
+            except Exception as e:
+                code = getattr(e, 'code', None)
+                if code == TIMESTAMP_CODE:
+                    await run_blocking(self.sync_time)
+                elif code is not None and code not in UNKNOWN_STATUS_CODES:
+                    raise OrderRejected(code, getattr(e, 'message', str(e)))
+                last_error = e
+                logger.warning(f"{symbol}: erreur d'envoi de {client_order_id} (tentative {attempt}): {e}")
+                continue
+
+            metrics.observe('latency.order_to_fill', time.perf_counter() - sent_at)
+            fill = Fill.from_order(order, side, client_order_id)
+            fill.attempts = attempt
+            fill.sent_at = sent_at
+            return fill
+
+        # Dernière vérification avant d'abandonner
+        order = await run_order(self._lookup, symbol, client_order_id)
+        if order is not None:
+            return Fill.from_order(order, side, client_order_id)
+        raise OrderRejected(None, f"{symbol} {side}: échec après {self.attempts} tentative(s): {last_error}")
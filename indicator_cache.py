@@ -0,0 +1,60 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from candle_buffer import CandleView
+
+
+class IndicatorCache:
+    """
+    Mémoïsation LRU des valeurs d'indicateurs, par bougie.
+
+    La clé combine (symbol, interval, indicateur, paramètres) avec l'heure
+    d'ouverture de la dernière bougie et la révision du tampon : chaque
+    valeur n'est calculée qu'une fois par bougie, et une bougie en cours
+    révisée invalide naturellement l'entrée.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(candles: CandleView, name: str, params: Tuple[Hashable, ...]) -> Tuple:
+        last_open = int(candles.open_time[-1]) if len(candles) else None
+        return (candles.key, name, params, last_open, candles.revision, len(candles))
+
+    def get(self, candles: CandleView, name: str, params: Tuple[Hashable, ...],
+            compute: Callable[[], Any]) -> Any:
+        """Valeur en cache, ou ``compute()`` mémorisé en cas d'absence"""
+        key = self.key(candles, name, params)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+
+        value = compute()
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / total * 100 if total else 0,
+        }
@@ -1,6 +1,8 @@
+import math
+from collections import deque
 import pandas as pd
 import numpy as np
-from typing import Tuple
+from typing import Optional, Tuple
 
 class TechnicalIndicators:
     @staticmethod
@@ -8,12 +10,12 @@ class TechnicalIndicators:
         """
         Calcule le RSI-VWAP
         """
-        # Calcul du VWAP
-        df['typical_price'] = (df['high'] + df['low'] + df['close']) / 3
-        df['volume_price'] = df['typical_price'] * df['volume']
+        # Calcul du VWAP (sans ajouter de colonnes au DataFrame de l'appelant)
+        typical_price = (df['high'] + df['low'] + df['close']) / 3
+        volume_price = typical_price * df['volume']
         
         # VWAP sur période glissante
-        vwap = df['volume_price'].rolling(window=length).sum() / df['volume'].rolling(window=length).sum()
+        vwap = volume_price.rolling(window=length).sum() / df['volume'].rolling(window=length).sum()
         
         # RSI du VWAP
         delta = vwap.diff()
@@ -45,3 +47,333 @@ class TechnicalIndicators:
         current_ma = ma200.iloc[-1]
         
         return current_price > current_ma
+
+
+    # Les noyaux *_array acceptent une série (bougies) ou une matrice (symboles x bougies) :
+    # le calcul porte sur le dernier axe, en une seule passe pour tous les symboles.
+    # Les historiques plus courts sont complétés à gauche par des NaN (alignés sur la
+    # dernière bougie) ; chaque ligne donne alors le même résultat que sa série seule.
+
+    @staticmethod
+    def rolling_sum_array(values: np.ndarray, window: int) -> np.ndarray:
+        """
+        Somme glissante vectorisée en O(n) (NaN tant que la fenêtre n'est pas
+        pleine ou contient un NaN).
+
+        Chaque fenêtre est la somme d'un préfixe de bloc et d'un suffixe du
+        bloc précédent : les sommes cumulées repartent de zéro tous les
+        ``window`` éléments, l'erreur d'arrondi reste donc celle d'une somme
+        de ``window`` termes quelle que soit la longueur de la série. Écart à
+        ``Series.rolling(window).sum()`` de l'ordre de 1e-10 en relatif (pas
+        au bit près). Les blocs sont alignés sur la dernière valeur : une
+        ligne complétée à gauche donne le même résultat que sa série seule.
+        """
+        n = values.shape[-1]
+        out = np.full(values.shape, np.nan)
+        if n < window:
+            return out
+        missing = np.isnan(values)
+        blocks = -(-n // window)
+        padded = np.zeros(values.shape[:-1] + (blocks * window,))
+        padded[..., blocks * window - n:] = np.where(missing, 0.0, values)
+        chunks = padded.reshape(values.shape[:-1] + (blocks, window))
+        prefix = np.cumsum(chunks, axis=-1).reshape(padded.shape)[..., -n:]
+        suffix = np.cumsum(chunks[..., ::-1], axis=-1)[..., ::-1].reshape(padded.shape)[..., -n:]
+        # Fenêtre alignée sur un bloc entier : le préfixe suffit
+        suffix[..., n % window::window] = 0.0
+        # Préfixe du bloc de i + suffixe du bloc précédent à partir de i - window + 1
+        out[..., window - 1:] = prefix[..., window - 1:] + suffix[..., :n - window + 1]
+        counts = np.cumsum(missing, axis=-1)
+        nan_count = counts[..., window - 1:].copy()
+        nan_count[..., 1:] -= counts[..., :n - window]
+        out[..., window - 1:][nan_count > 0] = np.nan
+        return out
+
+    @staticmethod
+    def calculate_vwap_array(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                             volume: np.ndarray, length: int = 50) -> np.ndarray:
+        """VWAP glissant sur tableaux NumPy"""
+        volume_price = (high + low + close) / 3 * volume
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (TechnicalIndicators.rolling_sum_array(volume_price, length)
+                    / TechnicalIndicators.rolling_sum_array(volume, length))
+
+    @staticmethod
+    def calculate_rsi_array(values: np.ndarray, length: int = 50,
+                            valid: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        RSI (moyennes simples, comme calculate_rsi) sur tableau NumPy.
+        ``valid`` marque les bougies existantes : hors de ce masque (historique
+        absent), les fenêtres sont NaN ; un NaN dans ``values`` compte pour 0.
+        """
+        delta = np.empty(values.shape)
+        delta[..., :1] = np.nan
+        delta[..., 1:] = np.diff(values, axis=-1)
+        gain = np.where(delta > 0, delta, 0.0)
+        loss = np.where(delta < 0, -delta, 0.0)
+        if valid is not None:
+            gain[~valid] = np.nan
+            loss[~valid] = np.nan
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rs = (TechnicalIndicators.rolling_sum_array(gain, length)
+                  / TechnicalIndicators.rolling_sum_array(loss, length))
+            return 100 - (100 / (1 + rs))
+
+    @staticmethod
+    def calculate_rsi_vwap_array(high: np.ndarray, low: np.ndarray, close: np.ndarray,
+                                 volume: np.ndarray, length: int = 50) -> np.ndarray:
+        """RSI-VWAP vectorisé, équivalent de calculate_rsi_vwap sur tableaux NumPy"""
+        vwap = TechnicalIndicators.calculate_vwap_array(high, low, close, volume, length)
+        # Les NaN de préchauffage du VWAP comptent pour 0, pas les bougies absentes
+        return TechnicalIndicators.calculate_rsi_array(vwap, length, valid=~np.isnan(close))
+
+    @staticmethod
+    def bull_market_array(close: np.ndarray, ma_period: int = 200) -> np.ndarray:
+        """Filtre bull market (prix > MA200) pour chaque bougie"""
+        ma = TechnicalIndicators.rolling_sum_array(close, ma_period) / ma_period
+        with np.errstate(invalid='ignore'):
+            return close > ma
+
+class _RollingWindow:
+    """
+    Somme / moyenne glissante en O(1), calquée sur l'algorithme de pandas
+    (sommation de Kahan avec compensations distinctes pour l'ajout et le retrait) afin de
+    reproduire ``Series.rolling(window).sum()/.mean()`` au bit près.
+
+    Garde un point de restauration d'un niveau pour réviser la dernière valeur.
+    """
+
+    __slots__ = ('window', 'values', 'sum_x', 'compensation_add', 'compensation_remove',
+                 'nobs', 'neg_ct', 'same_ct', 'prev_value', '_checkpoint')
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.sum_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.nobs = 0
+        self.neg_ct = 0
+        self.same_ct = 0
+        self.prev_value = math.nan
+        self._checkpoint = None
+
+    def _add(self, val: float):
+        if val == val:
+            self.nobs += 1
+            y = val - self.compensation_add
+            t = self.sum_x + y
+            self.compensation_add = t - self.sum_x - y
+            self.sum_x = t
+            if math.copysign(1.0, val) < 0:
+                self.neg_ct += 1
+            if val == self.prev_value:
+                self.same_ct += 1
+            else:
+                self.same_ct = 1
+            self.prev_value = val
+
+    def _remove(self, val: float):
+        if val == val:
+            self.nobs -= 1
+            y = -val - self.compensation_remove
+            t = self.sum_x + y
+            self.compensation_remove = t - self.sum_x - y
+            self.sum_x = t
+            if math.copysign(1.0, val) < 0:
+                self.neg_ct -= 1
+
+    def _reset(self):
+        self.sum_x = 0.0
+        self.compensation_add = 0.0
+        self.compensation_remove = 0.0
+        self.nobs = 0
+        self.neg_ct = 0
+        self.same_ct = 0
+        self.prev_value = math.nan
+
+    def push(self, val: float):
+        """Ajoute une valeur en fin de fenêtre (et retire la plus ancienne si pleine)"""
+        evicted = None
+        self._checkpoint = (self.sum_x, self.compensation_add, self.compensation_remove,
+                            self.nobs, self.neg_ct, self.same_ct, self.prev_value)
+        if len(self.values) == self.window:
+            evicted = self.values.popleft()
+            if self.window == 1:
+                # pandas repart de zéro quand la fenêtre ne recouvre plus la précédente
+                self._reset()
+            else:
+                self._remove(evicted)
+        self.values.append(val)
+        self._add(val)
+        self._checkpoint += (evicted,)
+
+    def undo(self):
+        """Annule le dernier ``push``"""
+        if self._checkpoint is None:
+            return
+        (self.sum_x, self.compensation_add, self.compensation_remove,
+         self.nobs, self.neg_ct, self.same_ct, self.prev_value, evicted) = self._checkpoint
+        self.values.pop()
+        if evicted is not None:
+            self.values.appendleft(evicted)
+        self._checkpoint = None
+
+    def sum(self) -> float:
+        if self.nobs < self.window:
+            return math.nan
+        if self.same_ct >= self.nobs:
+            return self.prev_value * self.nobs
+        return self.sum_x
+
+    def mean(self) -> float:
+        if self.nobs < self.window or self.nobs == 0:
+            return math.nan
+        if self.same_ct >= self.nobs:
+            return self.prev_value
+        result = self.sum_x / self.nobs
+        if self.neg_ct == 0 and result < 0:
+            return 0.0
+        if self.neg_ct == self.nobs and result > 0:
+            return 0.0
+        return result
+
+
+def _same_row(a: Tuple[float, ...], b: Tuple[float, ...]) -> bool:
+    """Égalité de deux bougies, NaN compris"""
+    return all(x == y or (x != x and y != y) for x, y in zip(a, b))
+
+
+class StreamingRSIVWAP:
+    """
+    RSI-VWAP incrémental : chaque nouvelle bougie (ou révision de la bougie
+    en cours) est intégrée en temps constant, quelle que soit la période.
+
+    Alimenté avec la même séquence de bougies, il renvoie exactement les
+    mêmes valeurs que ``TechnicalIndicators.calculate_rsi_vwap``.
+    """
+
+    def __init__(self, length: int = 50):
+        if length < 1:
+            raise ValueError("length doit être >= 1")
+        self.length = length
+        self._volume_price = _RollingWindow(length)
+        self._volume = _RollingWindow(length)
+        self._gain = _RollingWindow(length)
+        self._loss = _RollingWindow(length)
+        self._vwap = math.nan
+        self._rsi_vwap = math.nan
+        self._last_open_time = None
+        self._last_row = None
+        self._checkpoint = None
+        self.count = 0
+
+    @property
+    def value(self) -> float:
+        """Dernière valeur du RSI-VWAP (NaN pendant la période de chauffe)"""
+        return self._rsi_vwap
+
+    @property
+    def vwap(self) -> float:
+        """Dernière valeur du VWAP glissant"""
+        return self._vwap
+
+    @property
+    def last_open_time(self) -> Optional[int]:
+        return self._last_open_time
+
+    def update(self, open_time: int, high: float, low: float, close: float, volume: float) -> float:
+        """
+        Intègre une bougie. Si ``open_time`` est celui de la dernière bougie
+        reçue, celle-ci est remplacée (bougie en cours de formation).
+        """
+        if self._last_open_time is not None:
+            if open_time == self._last_open_time:
+                self._undo()
+            elif open_time < self._last_open_time:
+                raise ValueError(f"Bougie hors séquence: {open_time} < {self._last_open_time}")
+
+        self._checkpoint = (self._vwap, self._rsi_vwap, self._last_open_time, self._last_row)
+
+        typical_price = (high + low + close) / 3
+        self._volume_price.push(typical_price * volume)
+        self._volume.push(volume)
+        vwap = self._div(self._volume_price.sum(), self._volume.sum())
+
+        # Équivalent de delta.where(delta > 0, 0) / -delta.where(delta < 0, 0)
+        delta = vwap - self._vwap
+        gain = delta if delta > 0 else 0.0
+        loss = -(delta if delta < 0 else 0.0)
+        self._gain.push(gain)
+        self._loss.push(loss)
+
+        self._vwap = vwap
+        self._rsi_vwap = self._rsi(self._gain.mean(), self._loss.mean())
+        self._last_open_time = open_time
+        self._last_row = (high, low, close, volume)
+        self.count += 1
+        return self._rsi_vwap
+
+    def sync(self, candles) -> float:
+        """
+        Rattrape une fenêtre de bougies (``CandleView``) : seules les bougies
+        postérieures à la dernière reçue, et celle-ci si elle a été révisée,
+        sont intégrées. Repart de la fenêtre entière si la séquence ne
+        prolonge plus celle déjà reçue (trou, bougie précédente modifiée).
+        """
+        open_time = candles.open_time
+        high, low, close, volume = candles.high, candles.low, candles.close, candles.volume
+        start = 0
+        if self._last_open_time is not None:
+            index = int(np.searchsorted(open_time, self._last_open_time))
+            previous = self._checkpoint[3] if self._checkpoint is not None else None
+            if (index < len(open_time) and open_time[index] == self._last_open_time
+                    and (index == 0 or previous is None or _same_row(
+                        previous, (high[index - 1], low[index - 1], close[index - 1], volume[index - 1])))):
+                start = index
+            else:
+                self.reset()
+        for i in range(start, len(open_time)):
+            self.update(int(open_time[i]), float(high[i]), float(low[i]), float(close[i]), float(volume[i]))
+        return self._rsi_vwap
+
+    def reset(self):
+        """Oublie toutes les bougies reçues"""
+        self.__init__(self.length)
+
+    def _undo(self):
+        self._volume_price.undo()
+        self._volume.undo()
+        self._gain.undo()
+        self._loss.undo()
+        self._vwap, self._rsi_vwap, self._last_open_time, self._last_row = self._checkpoint
+        self._checkpoint = None
+        self.count -= 1
+
+    @staticmethod
+    def _div(numerator: float, denominator: float) -> float:
+        """Division flottante avec la sémantique NumPy pour les divisions par zéro"""
+        if denominator == 0:
+            if numerator != numerator or numerator == 0:
+                return math.nan
+            return math.copysign(math.inf, numerator)
+        return numerator / denominator
+
+    @staticmethod
+    def _rsi(gain: float, loss: float) -> float:
+        if gain != gain or loss != loss:
+            return math.nan
+        rs = StreamingRSIVWAP._div(gain, loss)
+        return 100 - (100 / (1 + rs))
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, length: int = 50) -> 'StreamingRSIVWAP':
+        """Construit l'indicateur à partir d'un historique de bougies"""
+        stream = cls(length)
+        open_times = df.index.asi8 if isinstance(df.index, pd.DatetimeIndex) else np.arange(len(df))
+        for open_time, high, low, close, volume in zip(
+            open_times, df['high'].to_numpy(), df['low'].to_numpy(),
+            df['close'].to_numpy(), df['volume'].to_numpy()
+        ):
+            stream.update(int(open_time), float(high), float(low), float(close), float(volume))
+        return stream
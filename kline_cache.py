@@ -0,0 +1,214 @@
+import sqlite3
+import threading
+import logging
+from typing import Dict, List, Optional, Tuple
+
+import clock
+from candle_buffer import CandleBuffer, CandleView
+
+logger = logging.getLogger(__name__)
+
+# Colonnes renvoyées par l'API klines de Binance
+KLINE_COLUMNS = [
+    'timestamp', 'open', 'high', 'low', 'close', 'volume',
+    'close_time', 'quote_asset_volume', 'number_of_trades',
+    'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore'
+]
+
+_SECONDS_PER_UNIT = {'m': 60, 'h': 60 * 60, 'd': 24 * 60 * 60, 'w': 7 * 24 * 60 * 60}
+
+
+def interval_to_ms(interval: str) -> int:
+    """Convertit un intervalle Binance (ex: '15m', '1h') en millisecondes"""
+    try:
+        return int(interval[:-1]) * _SECONDS_PER_UNIT[interval[-1]] * 1000
+    except (ValueError, KeyError):
+        raise ValueError(f"Intervalle non supporté: {interval}")
+
+
+def now_ms() -> int:
+    return int(clock.now() * 1000)
+
+
+class KlineCache:
+    """
+    Stockage local et persistant des bougies par (symbol, interval).
+
+    Après le premier remplissage, seules les bougies postérieures à la
+    dernière bougie clôturée sont téléchargées ; la bougie encore ouverte
+    est remplacée sur place. Tant que le cache est frais (``ttl``), la
+    fenêtre est servie sans aller-retour réseau.
+
+    En mémoire, chaque clé est un ``CandleBuffer`` de ``max_candles`` bougies.
+    La base SQLite n'est créée qu'au premier accès ; avec ``persist=False``,
+    rien n'y est lu ni écrit.
+    """
+
+    def __init__(self, db_path: str = "klines.db", ttl: float = 30.0, max_candles: int = 5000,
+                 persist: bool = True):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_candles = max_candles
+        self.persist = persist
+        self._candles: Dict[Tuple[str, str], CandleBuffer] = {}
+        self._last_sync: Dict[Tuple[str, str], Tuple[float, int]] = {}
+        # _lock protège les tampons en mémoire et n'est jamais tenu pendant un accès SQLite
+        # (mises à jour intra-bougie du stream sur la boucle asyncio) ; _db_lock sérialise
+        # les écritures, dans l'ordre des mises à jour en mémoire
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self.recorder = None
+        self._database_ready = False
+
+    def init_database(self):
+        """Crée la table des bougies"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS klines (
+                symbol TEXT NOT NULL,
+                interval TEXT NOT NULL,
+                open_time INTEGER NOT NULL,
+                open REAL NOT NULL,
+                high REAL NOT NULL,
+                low REAL NOT NULL,
+                close REAL NOT NULL,
+                volume REAL NOT NULL,
+                close_time INTEGER NOT NULL,
+                quote_asset_volume REAL,
+                number_of_trades INTEGER,
+                taker_buy_base_asset_volume REAL,
+                taker_buy_quote_asset_volume REAL,
+                closed INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (symbol, interval, open_time)
+            ) WITHOUT ROWID
+        """)
+
+        conn.commit()
+        conn.close()
+        self._database_ready = True
+
+    @staticmethod
+    def _normalize(kline: list) -> tuple:
+        """Convertit une bougie brute (chaînes Binance) en tuple typé"""
+        return (
+            int(kline[0]), float(kline[1]), float(kline[2]), float(kline[3]),
+            float(kline[4]), float(kline[5]), int(kline[6]), float(kline[7]),
+            int(kline[8]), float(kline[9]), float(kline[10])
+        )
+
+    def _load(self, key: Tuple[str, str]) -> CandleBuffer:
+        """Tampon d'une clé, chargé depuis SQLite au premier accès (hors de ``_lock``)"""
+        candles = self._candles.get(key)
+        if candles is not None:
+            return candles
+        candles = CandleBuffer(self.max_candles, key)
+        if self.persist:
+            with self._db_lock:
+                if not self._database_ready:
+                    self.init_database()
+                conn = sqlite3.connect(self.db_path)
+                cursor = conn.cursor()
+                cursor.execute("""
+                    SELECT open_time, open, high, low, close, volume, close_time, quote_asset_volume,
+                           number_of_trades, taker_buy_base_asset_volume, taker_buy_quote_asset_volume, closed
+                    FROM klines WHERE symbol = ? AND interval = ?
+                    ORDER BY open_time DESC LIMIT ?
+                """, (key[0], key[1], self.max_candles))
+                rows = cursor.fetchall()
+                conn.close()
+            candles.extend(reversed(rows))
+        with self._lock:
+            return self._candles.setdefault(key, candles)
+
+    def upsert(self, symbol: str, interval: str, klines: List[list], closed: Optional[bool] = None,
+               persist: bool = True):
+        """
+        Insère ou remplace des bougies (ordre chronologique). ``closed`` force
+        l'état de clôture ; sinon une bougie n'est close que si l'exchange a
+        déjà renvoyé la suivante dans le lot (l'heure locale ne suffit pas :
+        la bougie peut ne pas être finalisée). Avec ``persist=False`` seule la
+        fenêtre en mémoire est mise à jour.
+        """
+        if not klines:
+            return
+        if self.recorder is not None:
+            self.recorder.record_klines(symbol, interval, klines)
+        key = (symbol, interval)
+        rows = []
+        for index, kline in enumerate(klines):
+            row = self._normalize(kline)
+            is_closed = closed if closed is not None else index < len(klines) - 1
+            rows.append(row + (1 if is_closed else 0,))
+
+        candles = self._load(key)
+        if not persist or not self.persist:
+            with self._lock:
+                candles.extend(rows)
+            return
+
+        with self._db_lock:
+            with self._lock:
+                candles.extend(rows)
+                window_start = int(candles.view().open_time[0])
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.executemany("""
+                INSERT OR REPLACE INTO klines (symbol, interval, open_time, open, high, low, close,
+                    volume, close_time, quote_asset_volume, number_of_trades,
+                    taker_buy_base_asset_volume, taker_buy_quote_asset_volume, closed)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [(symbol, interval) + row for row in rows])
+            cursor.execute("""
+                DELETE FROM klines WHERE symbol = ? AND interval = ? AND open_time < ?
+            """, (symbol, interval, window_start))
+            conn.commit()
+            conn.close()
+
+    def is_fresh(self, symbol: str, interval: str) -> bool:
+        """
+        Vrai si la clé a été synchronisée il y a moins de ``ttl`` secondes et
+        qu'aucune bougie n'a clôturé depuis la dernière synchronisation.
+        """
+        last_sync = self._last_sync.get((symbol, interval))
+        if last_sync is None or clock.monotonic() - last_sync[0] >= self.ttl:
+            return False
+        period = interval_to_ms(interval)
+        return last_sync[1] // period == now_ms() // period
+
+    def mark_synced(self, symbol: str, interval: str):
+        self._last_sync[(symbol, interval)] = (clock.monotonic(), now_ms())
+
+    def sync(self, client, symbol: str, interval: str, start_ms: int):
+        """Télécharge uniquement les bougies manquantes depuis la dernière bougie clôturée"""
+        candles = self._load((symbol, interval))
+        with self._lock:
+            last = candles.last()
+
+        if last is None or last[0] < start_ms - interval_to_ms(interval):
+            # Premier remplissage (ou trou plus ancien que la fenêtre demandée)
+            fetch_from = start_ms
+        elif last[11]:
+            fetch_from = last[6] + 1
+        else:
+            # Bougie encore ouverte : on la recharge pour la remplacer
+            fetch_from = last[0]
+
+        klines = client.get_historical_klines(symbol, interval, fetch_from)
+        self.upsert(symbol, interval, klines)
+        self.mark_synced(symbol, interval)
+        logger.debug(f"{symbol} {interval}: {len(klines)} bougie(s) synchronisée(s) depuis {fetch_from}")
+
+    def get_klines(self, client, symbol: str, interval: str, start_ms: int, force: bool = False) -> CandleView:
+        """
+        Renvoie les bougies dont l'ouverture est >= ``start_ms`` (vue sans
+        copie), en ne sollicitant l'API que si le cache n'est plus frais
+        (ou si ``force`` est vrai).
+        """
+        if force or not self.is_fresh(symbol, interval):
+            self.sync(client, symbol, interval, start_ms)
+
+        candles = self._load((symbol, interval))
+        with self._lock:
+            return candles.view(start_ms)
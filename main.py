@@ -1,15 +1,20 @@
+import time
+_IMPORT_STARTED = time.perf_counter()
+
 import asyncio
+import functools
+import importlib
 import logging
-from datetime import datetime
+import sys
+import threading
+from datetime import datetime, timedelta
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ContextTypes, MessageHandler, filters
-import matplotlib.pyplot as plt
-import io
-import base64
 
+from async_io import run_blocking
 from config import config, AUTHORIZED_USERS
-from trading_bot import trading_bot
 from database import db
+from metrics import MetricsServer, metrics
 
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
@@ -17,8 +22,51 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+class LazyInstance:
+    """
+    Objet global importé au premier accès : ``trading_bot`` (pandas,
+    python-binance, cache de bougies) n'est chargé qu'au premier usage.
+    """
+    
+    def __init__(self, module: str, name: str):
+        self._module = module
+        self._name = name
+        self._instance = None
+        self._lock = threading.Lock()
+    
+    @property
+    def loaded(self) -> bool:
+        return self._instance is not None
+    
+    def load(self):
+        """Importe l'objet (bloquant : à appeler via run_blocking)"""
+        return self._resolve()
+    
+    def _resolve(self):
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    started = time.perf_counter()
+                    self._instance = getattr(importlib.import_module(self._module), self._name)
+                    logger.info(f"{self._module} chargé en {(time.perf_counter() - started) * 1000:.0f} ms")
+        return self._instance
+    
+    def __getattr__(self, name: str):
+        return getattr(self._resolve(), name)
+
+trading_bot = LazyInstance("trading_bot", "trading_bot")
+
+async def load_trading_bot():
+    """Charge ``trading_bot`` hors de la boucle asyncio (import lourd) avant tout accès"""
+    if not trading_bot.loaded:
+        await run_blocking(trading_bot.load, timeout=120)
+
+# Durée d'import de ce module (telegram, config, async_io, database)
+IMPORT_TIME = time.perf_counter() - _IMPORT_STARTED
+
 def authorized_only(func):
     """Décorateur pour vérifier l'autorisation"""
+    @functools.wraps(func)
     async def wrapper(update: Update, context: ContextTypes.DEFAULT_TYPE):
         user_id = update.effective_user.id
         if AUTHORIZED_USERS and user_id not in AUTHORIZED_USERS:
@@ -103,8 +151,29 @@ Utilisez le menu ci-dessous pour naviguer.
 
 async def show_dashboard(query):
     """Affiche le dashboard"""
-    stats = db.get_trading_stats()
-    balance = trading_bot.get_account_balance() if trading_bot.client else {'total': 0}
+    await load_trading_bot()
+    stats = await run_blocking(db.get_trading_stats)
+    curve = await run_blocking(db.get_equity_curve, datetime.now() - timedelta(hours=24))
+    connected = trading_bot.client
+    balance = await run_blocking(trading_bot.get_account_balance) if connected else {'total': 0}
+    market = None
+    if connected:
+        try:
+            market = await run_blocking(trading_bot.market_snapshot)
+        except Exception as e:
+            logger.error(f"Erreur récupération marché: {e}")
+    
+    if market:
+        trend = "🐂 Bull" if market['bull_market'] else "🐻 Bear"
+        market_text = f"Prix: {market['price']:.2f}\nRSI-VWAP: {market['rsi_vwap']:.1f}\nTendance (MA200): {trend}"
+    else:
+        market_text = "Données indisponibles"
+    
+    if len(curve) >= 2 and curve[0]['equity']:
+        first, last = curve[0]['equity'], curve[-1]['equity']
+        equity_text = f"Equity 24h: ${first:.2f} → ${last:.2f} ({(last / first - 1) * 100:+.2f}%)"
+    else:
+        equity_text = "Equity 24h: historique insuffisant"
     
     status = "🟢 ACTIF" if config.is_active else "🔴 INACTIF"
     mode = "📈 DEMO" if config.is_demo else "💰 RÉEL"
@@ -114,10 +183,15 @@ async def show_dashboard(query):
 
 **Status:** {status}
 **Mode:** {mode}
-**Symbol:** {config.symbol}
+**Symboles:** {', '.join(config.trading_symbols())}
+**Positions:** {len(trading_bot.positions)}/{config.max_positions}
 
 **💰 CAPITAL**
 Balance: ${balance['total']:.2f}
+{equity_text}
+
+**📉 MARCHÉ**
+{market_text}
 
 **📈 STATISTIQUES**
 Trades totaux: {stats['total_trades']}
@@ -126,6 +200,9 @@ PnL Moyen: ${stats['avg_pnl']:.2f}
 Trades gagnants: {stats['winning_trades']}
 Trades perdants: {stats['losing_trades']}
 Taux de réussite: {stats['win_rate']:.1f}%
+Profit factor: {stats['profit_factor']:.2f}
+Drawdown max: ${stats['max_drawdown']:.2f}
+Durée moyenne: {stats['avg_hold_time'] / 3600:.1f} h
 
 **⚙️ PARAMÈTRES ACTUELS**
 RSI Longueur: {config.rsi_length}
@@ -154,7 +231,7 @@ Mode Demo: {demo_status}
 Bot Actif: {active_status}
 
 **Stratégie:**
-Symbol: {config.symbol}
+Symboles: {', '.join(config.trading_symbols())}
 Timeframe: {config.timeframe}
 RSI Longueur: {config.rsi_length}
 
@@ -210,17 +287,19 @@ Tapez la commande correspondante :
 
 async def start_trading(query):
     """Démarre le trading"""
-    if not config.binance_api_key or not config.binance_secret_key:
+    await load_trading_bot()
+    # L'exchange simulé n'envoie aucune requête signée: pas de clés requises
+    if not trading_bot.simulated and (not config.binance_api_key or not config.binance_secret_key):
         await query.edit_message_text("❌ Veuillez configurer vos clés API Binance d'abord")
         return
     
-    if trading_bot.start_trading():
+    if await run_blocking(trading_bot.start_trading):
         # Démarrer la boucle de trading en arrière-plan
         asyncio.create_task(trading_bot.trading_loop())
         
         message = "🚀 Trading démarré avec succès !\n\n"
         message += f"Mode: {'DEMO' if config.is_demo else 'RÉEL'}\n"
-        message += f"Symbol: {config.symbol}\n"
+        message += f"Symboles: {', '.join(config.trading_symbols())}\n"
         message += f"Timeframe: {config.timeframe}"
         
         keyboard = [[InlineKeyboardButton("📊 Dashboard", callback_data="dashboard")],
@@ -233,6 +312,7 @@ async def start_trading(query):
 
 async def stop_trading(query):
     """Arrête le trading"""
+    await load_trading_bot()
     trading_bot.stop_trading()
     
     message = "🛑 Trading arrêté.\n\n"
@@ -246,7 +326,8 @@ async def stop_trading(query):
     await query.edit_message_text(message, reply_markup=reply_markup)
 
 async def show_balance(query): 
-    balance = trading_bot.get_account_balance()
+    await load_trading_bot()
+    balance = await run_blocking(trading_bot.get_account_balance)
     
     if balance['total'] == 0 and not config.is_demo:
         text = "❌ Impossible de récupérer le solde réel. Vérifiez vos clés API."
@@ -269,7 +350,7 @@ Mode : {'DEMO (Testnet)' if config.is_demo else 'RÉEL'}
 
 async def show_positions(query):
     """Affiche les positions ouvertes"""
-    open_trades = db.get_open_trades()
+    open_trades = await run_blocking(db.get_open_trades)
     
     if not open_trades:
         message = "📈 **POSITIONS**\n\nAucune position ouverte actuellement."
@@ -380,12 +461,32 @@ async def set_stop_loss(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except ValueError:
         await update.message.reply_text("❌ Valeur invalide. Utilisez un nombre décimal.")
 
+@authorized_only
+async def rebuild_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Recalcule les statistiques et les compare aux agrégats tenus à jour"""
+    await run_blocking(db.flush)
+    mismatches = await run_blocking(db.rebuild_trading_stats, timeout=60)
+    
+    if not mismatches:
+        await update.message.reply_text("✅ Statistiques vérifiées: aucun écart avec le recalcul complet")
+    else:
+        lines = [f"{name}: {old:.4f} → {new:.4f}" for name, (old, new) in mismatches.items()]
+        await update.message.reply_text("⚠️ Écarts corrigés:\n" + "\n".join(lines))
+
 @authorized_only
 async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Affiche le status du bot"""
     status = "🟢 ACTIF" if config.is_active else "🔴 INACTIF"
     mode = "📈 DEMO" if config.is_demo else "💰 RÉEL"
+    await load_trading_bot()
     connected = "✅" if trading_bot.client else "❌"
+    usage = trading_bot.request_scheduler.usage()
+    stop_status = "off" if not config.stop_loss_monitor else "temps réel"
+    monitor = trading_bot.stop_monitor
+    latency = monitor.latency_stats() if monitor is not None else None
+    if latency:
+        stop_status += (f" | {latency['count']} sortie(s), déclenchement → exécution "
+                        f"p50 {latency['p50_ms']:.0f} ms, p99 {latency['p99_ms']:.0f} ms")
     
     message = f"""
 🤖 **STATUS DU BOT**
@@ -393,10 +494,14 @@ async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
 Status: {status}
 Mode: {mode}
 Connexion Binance: {connected}
-Position ouverte: {'Oui' if trading_bot.current_position else 'Non'}
+Positions ouvertes: {len(trading_bot.positions)}/{config.max_positions} {', '.join(trading_bot.positions)}
+Budget API: {usage['used_weight']}/{usage['weight_limit']} ({usage['weight_pct']:.0f}%)
+Ordres (10 s / jour): {usage['orders_10s']} / {usage['orders_1d']}
+Appels mutualisés: {usage['coalesced']} | Mises en attente: {usage['throttled']}
+Stop-loss: {stop_status}
 
 **Configuration actuelle:**
-Symbol: {config.symbol}
+Symboles: {', '.join(config.trading_symbols())}
 Timeframe: {config.timeframe}
 RSI Length: {config.rsi_length}
 Risque/Trade: {config.risk_per_trade}%
@@ -404,6 +509,38 @@ Risque/Trade: {config.risk_per_trade}%
     
     await update.message.reply_text(message, parse_mode='Markdown')
 
+@authorized_only
+async def show_metrics(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Latences des étapes du bot (histogrammes en mémoire)"""
+    snapshot = metrics.snapshot()
+    if not snapshot:
+        await update.message.reply_text("📏 Aucune mesure pour l'instant.")
+        return
+    lines = [f"{'étape':28} {'n':>6} {'p50':>8} {'p99':>8} {'max':>8}"]
+    for h in snapshot:
+        lines.append(f"{h['name']:28} {h['count']:>6} {h['p50'] * 1000:>6.1f}ms "
+                     f"{h['p99'] * 1000:>6.1f}ms {h['max'] * 1000:>6.1f}ms")
+    await update.message.reply_text("📏 **LATENCES**\n```\n" + "\n".join(lines) + "\n```", parse_mode='Markdown')
+
+@authorized_only
+async def scan_market(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """RSI-VWAP de la liste de surveillance, meilleurs candidats d'abord"""
+    await load_trading_bot()
+    if not trading_bot.client:
+        await update.message.reply_text("❌ Connexion Binance non établie")
+        return
+    results = await trading_bot.scan_market()
+    if not results:
+        await update.message.reply_text("🔎 Aucune donnée à scanner.")
+        return
+    lines = [f"{'symbole':12} {'prix':>12} {'RSI-VWAP':>9} {'bull':>5}"]
+    for r in results[:15]:
+        flag = " ◀" if r['entry_signal'] else ""
+        lines.append(f"{r['symbol']:12} {r['price']:>12.6g} {r['rsi_vwap']:>9.2f} {'oui' if r['bull_market'] else 'non':>5}{flag}")
+    signals = sum(r['entry_signal'] for r in results)
+    await update.message.reply_text(f"🔎 **SCAN** ({len(results)} paires, {signals} signal(s))\n```\n"
+                                    + "\n".join(lines) + "\n```", parse_mode='Markdown')
+
 async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Commande d'aide"""
     help_text = """
@@ -412,6 +549,8 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 **Commandes principales:**
 /start - Menu principal
 /status - Status du bot
+/metrics - Latences par étape
+/scan - RSI-VWAP de la liste de surveillance
 /help - Cette aide
 
 **Commandes de configuration:**
@@ -420,6 +559,7 @@ async def help_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 /set_rsi_exit <valeur> - Seuil RSI sortie
 /set_rsi_length <valeur> - Période RSI
 /set_stop_loss <valeur> - Stop loss (%)
+/rebuild_stats - Vérifier/recalculer les statistiques
 
 **Exemples:**
 /set_risk 2.5
@@ -432,35 +572,72 @@ Pour toute question, contactez l'administrateur.
     
     await update.message.reply_text(help_text, parse_mode='Markdown')
 
+async def connect_exchange(application: Application):
+    """Charge le moteur et se connecte à Binance en arrière-plan, après le démarrage de Telegram"""
+    await load_trading_bot()
+    if not await run_blocking(trading_bot.init_binance_client, timeout=120):
+        logger.error("❌ Impossible de se connecter à Binance avec ces clés.")
+
+async def post_init(application: Application):
+    application.create_task(connect_exchange(application))
+
+def check_startup_budget() -> bool:
+    """Compare la durée d'import au budget de démarrage"""
+    import_ms = IMPORT_TIME * 1000
+    within = import_ms <= config.startup_import_budget_ms
+    log = logger.info if within else logger.warning
+    log(f"Imports au démarrage: {import_ms:.0f} ms (budget {config.startup_import_budget_ms:.0f} ms)")
+    return within
+
 def main():
     """Fonction principale"""
+    within_budget = check_startup_budget()
+    if "--check-startup" in sys.argv:
+        sys.exit(0 if within_budget else 1)
+    
     if not config.telegram_bot_token:
         print("❌ ERREUR: Token Telegram manquant!")
         print("Définissez TELEGRAM_BOT_TOKEN dans config.py ou comme variable d'environnement")
         return
-    
-    if not trading_bot.init_binance_client():
-        print("❌ Impossible de se connecter à Binance avec ces clés.")
-        return
 
-    # Créer l'application
-    application = Application.builder().token(config.telegram_bot_token).build()
+    # Créer l'application (connexion Binance différée, /start répond immédiatement)
+    application = Application.builder().token(config.telegram_bot_token).post_init(post_init).build()
     
     # Ajouter les gestionnaires
     application.add_handler(CommandHandler("start", start))
     application.add_handler(CommandHandler("help", help_command))
     application.add_handler(CommandHandler("status", status))
+    application.add_handler(CommandHandler("metrics", show_metrics))
+    application.add_handler(CommandHandler("scan", scan_market))
     application.add_handler(CommandHandler("set_risk", set_risk))
     application.add_handler(CommandHandler("set_rsi_entry", set_rsi_entry))
     application.add_handler(CommandHandler("set_rsi_exit", set_rsi_exit))
     application.add_handler(CommandHandler("set_rsi_length", set_rsi_length))
     application.add_handler(CommandHandler("set_stop_loss", set_stop_loss))
+    application.add_handler(CommandHandler("rebuild_stats", rebuild_stats))
     
     application.add_handler(CallbackQueryHandler(button_handler))
     
+    # Chronométrer chaque gestionnaire Telegram
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            handler.callback = metrics.timed(f"telegram.{handler.callback.__name__}")(handler.callback)
+    
+    metrics_server = None
+    if config.metrics_port:
+        try:
+            metrics_server = MetricsServer(metrics, config.metrics_host, config.metrics_port).start()
+        except OSError as e:
+            logger.warning(f"Endpoint de métriques indisponible: {e}")
+    
     # Démarrer le bot
     print("🚀 Bot Telegram démarré...")
     application.run_polling(allowed_updates=Update.ALL_TYPES)
+    
+    # Vider la file d'écriture avant de quitter
+    db.close()
+    if metrics_server is not None:
+        metrics_server.stop()
 
 if __name__ == '__main__':
     main()
\ No newline at end of file
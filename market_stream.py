@@ -0,0 +1,170 @@
+import asyncio
+import json
+import logging
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+import websockets
+
+from async_io import run_blocking
+from kline_cache import KlineCache, now_ms
+
+logger = logging.getLogger(__name__)
+
+CandleCloseCallback = Callable[[str, str, int], Awaitable[None]]
+
+
+def kline_from_event(k: Dict) -> list:
+    """Convertit la charge utile ``k`` d'un événement kline websocket au format REST"""
+    return [k['t'], k['o'], k['h'], k['l'], k['c'], k['v'], k['T'],
+            k['q'], k['n'], k['V'], k['Q'], k.get('B', '0')]
+
+
+class KlineStream:
+    """
+    Ingestion des bougies via les streams websocket kline de Binance.
+
+    Les bougies clôturées et en cours alimentent le ``KlineCache`` du bot ;
+    à chaque reconnexion, le trou éventuel est comblé par REST avant de
+    reprendre le flux. ``on_candle_close`` est appelé dès qu'une bougie se clôture.
+    """
+
+    def __init__(self, kline_cache: KlineCache, client, symbols: List[str], interval: str,
+                 base_url: str, lookback_ms: int,
+                 on_candle_close: Optional[CandleCloseCallback] = None,
+                 max_reconnect_delay: float = 30.0):
+        self.kline_cache = kline_cache
+        self.client = client
+        self.symbols = symbols
+        self.interval = interval
+        self.base_url = base_url.rstrip("/")
+        self.lookback_ms = lookback_ms
+        self.on_candle_close = on_candle_close
+        self.max_reconnect_delay = max_reconnect_delay
+        self.is_running = False
+        self.connected = asyncio.Event()
+        self._ws = None
+
+    @property
+    def url(self) -> str:
+        streams = "/".join(f"{symbol.lower()}@kline_{self.interval}" for symbol in self.symbols)
+        return f"{self.base_url}/stream?streams={streams}"
+
+    async def backfill(self):
+        """Comble par REST les bougies manquées pendant une déconnexion"""
+        start_ms = now_ms() - self.lookback_ms
+        for symbol in self.symbols:
+            await run_blocking(self.kline_cache.sync, self.client, symbol, self.interval, start_ms)
+
+    async def handle_message(self, message: str):
+        """Traite un message du stream combiné"""
+        payload = json.loads(message)
+        event = payload.get('data', payload)
+        if event.get('e') != 'kline':
+            return
+
+        k = event['k']
+        symbol = event['s']
+        closed = bool(k['x'])
+        # Les mises à jour intra-bougie restent en mémoire (sans attendre les écritures SQLite
+        # en cours, cf. KlineCache._lock), seules les clôtures sont persistées
+        kline = kline_from_event(k)
+        if closed:
+            await run_blocking(self.kline_cache.upsert, symbol, self.interval, [kline], closed=True)
+        else:
+            self.kline_cache.upsert(symbol, self.interval, [kline], closed=False, persist=False)
+        self.kline_cache.mark_synced(symbol, self.interval)
+
+        if closed and self.on_candle_close:
+            await self.on_candle_close(symbol, self.interval, k['t'])
+
+    async def run(self):
+        """Boucle de connexion avec reconnexion exponentielle et backfill"""
+        self.is_running = True
+        delay = 1.0
+
+        while self.is_running:
+            try:
+                if self.client is not None:
+                    await self.backfill()
+                async with websockets.connect(self.url, ping_interval=20) as ws:
+                    self._ws = ws
+                    self.connected.set()
+                    delay = 1.0
+                    logger.info(f"Stream kline connecté: {self.url}")
+                    async for message in ws:
+                        await self.handle_message(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Stream kline interrompu: {e}")
+            finally:
+                self._ws = None
+                self.connected.clear()
+
+            if self.is_running:
+                logger.info(f"Reconnexion du stream kline dans {delay:.0f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def stop(self):
+        """Arrête le stream"""
+        self.is_running = False
+        if self._ws is not None:
+            await self._ws.close()
+
+
+class LocalKlineServer:
+    """
+    Serveur websocket local imitant le stream combiné de Binance, pour
+    tester l'ingestion hors ligne. Les bougies sont poussées avec ``push``.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.clients: Set = set()
+        self._server = None
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def _handler(self, websocket, path: str = ""):
+        self.clients.add(websocket)
+        try:
+            await websocket.wait_closed()
+        finally:
+            self.clients.discard(websocket)
+
+    async def start(self) -> 'LocalKlineServer':
+        self._server = await websockets.serve(self._handler, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def push(self, symbol: str, interval: str, kline: list, closed: bool):
+        """Diffuse une bougie (format REST) à tous les clients connectés"""
+        message = json.dumps({
+            'stream': f"{symbol.lower()}@kline_{interval}",
+            'data': {
+                'e': 'kline', 'E': now_ms(), 's': symbol,
+                'k': {
+                    't': int(kline[0]), 'T': int(kline[6]), 's': symbol, 'i': interval,
+                    'o': str(kline[1]), 'h': str(kline[2]), 'l': str(kline[3]),
+                    'c': str(kline[4]), 'v': str(kline[5]), 'n': int(kline[8]),
+                    'x': closed, 'q': str(kline[7]), 'V': str(kline[9]),
+                    'Q': str(kline[10]), 'B': '0'
+                }
+            }
+        })
+        for websocket in list(self.clients):
+            await websocket.send(message)
+
+    async def disconnect_all(self):
+        """Coupe toutes les connexions (simule une perte réseau)"""
+        for websocket in list(self.clients):
+            await websocket.close()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
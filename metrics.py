@@ -0,0 +1,202 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Histogramme log-linéaire (façon HDR): 32 sous-intervalles par puissance de 2,
+# soit ~3 % d'erreur relative, de 1 µs à ~12 jours
+_SUB_BUCKETS = 32
+_SUB_BITS = 6  # bit_length de 2 * _SUB_BUCKETS
+_MAX_MICROS = 1 << 40
+_BUCKET_COUNT = _SUB_BUCKETS * (_MAX_MICROS.bit_length() - _SUB_BITS + 1) + 2 * _SUB_BUCKETS
+
+QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+
+def _bucket_index(micros: int) -> int:
+    if micros < 2 * _SUB_BUCKETS:
+        return micros
+    shift = micros.bit_length() - _SUB_BITS
+    return _SUB_BUCKETS * shift + (micros >> shift)
+
+
+def _bucket_value(index: int) -> float:
+    """Milieu de l'intervalle couvert par un bucket (µs)"""
+    if index < 2 * _SUB_BUCKETS:
+        return float(index)
+    shift = (index - _SUB_BUCKETS) // _SUB_BUCKETS
+    low = (index - _SUB_BUCKETS * shift) << shift
+    return low + ((1 << shift) - 1) / 2
+
+
+class Histogram:
+    """Distribution de durées, enregistrement O(1) sans allocation"""
+
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._counts = [0] * _BUCKET_COUNT
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        micros = min(int(seconds * 1_000_000), _MAX_MICROS - 1) if seconds > 0 else 0
+        index = _bucket_index(micros)
+        with self._lock:
+            self._counts[index] += 1
+            self.count += 1
+            self.total += seconds
+            if seconds > self.max:
+                self.max = seconds
+
+    def quantile(self, q: float) -> float:
+        """Quantile en secondes (0 si vide)"""
+        with self._lock:
+            if not self.count:
+                return 0.0
+            target = max(1, int(q * self.count + 0.999999))
+            seen = 0
+            for index, count in enumerate(self._counts):
+                seen += count
+                if seen >= target:
+                    return min(_bucket_value(index) / 1_000_000, self.max)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        result = {'count': self.count, 'sum': self.total, 'max': self.max}
+        for q in QUANTILES:
+            result[f"p{q * 100:g}"] = self.quantile(q)
+        return result
+
+    def reset(self):
+        with self._lock:
+            self._counts = [0] * _BUCKET_COUNT
+            self.count = 0
+            self.total = 0.0
+            self.max = 0.0
+
+
+class Metrics:
+    """Registre des histogrammes de latence du bot"""
+
+    def __init__(self, prefix: str = "plnxbot"):
+        self.prefix = prefix
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def histogram(self, name: str, description: str = "") -> Histogram:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, Histogram(name, description))
+        return histogram
+
+    def observe(self, name: str, seconds: float):
+        self.histogram(name).record(seconds)
+
+    @contextmanager
+    def span(self, name: str):
+        """Chronomètre un bloc (utilisable aussi dans une coroutine)"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.histogram(name).record(time.perf_counter() - started)
+
+    def timed(self, name: str) -> Callable:
+        """Décorateur chronométrant une fonction ou une coroutine"""
+        def decorator(func):
+            histogram = self.histogram(name)
+            if asyncio.iscoroutinefunction(func):
+                @functools.wraps(func)
+                async def async_wrapper(*args, **kwargs):
+                    started = time.perf_counter()
+                    try:
+                        return await func(*args, **kwargs)
+                    finally:
+                        histogram.record(time.perf_counter() - started)
+                return async_wrapper
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    histogram.record(time.perf_counter() - started)
+            return wrapper
+        return decorator
+
+    def snapshot(self) -> List[Dict]:
+        """Résumé de chaque histogramme non vide, trié par nom"""
+        return [dict(name=name, **h.summary()) for name, h in sorted(self._histograms.items()) if h.count]
+
+    def reset(self):
+        for histogram in list(self._histograms.values()):
+            histogram.reset()
+
+    def prometheus_text(self) -> str:
+        """Exposition au format texte Prometheus (summaries en secondes)"""
+        lines = []
+        for name, histogram in sorted(self._histograms.items()):
+            metric = f"{self.prefix}_{name.replace('.', '_')}_seconds"
+            if histogram.description:
+                lines.append(f"# HELP {metric} {histogram.description}")
+            lines.append(f"# TYPE {metric} summary")
+            for q in QUANTILES:
+                lines.append(f'{metric}{{quantile="{q:g}"}} {histogram.quantile(q):.9f}')
+            lines.append(f"{metric}_sum {histogram.total:.9f}")
+            lines.append(f"{metric}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Endpoint HTTP local ``/metrics`` pour Prometheus (thread dédié)"""
+
+    def __init__(self, registry: Metrics, host: str = "127.0.0.1", port: int = 9108):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    def start(self) -> 'MetricsServer':
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="metrics", daemon=True).start()
+        logger.info(f"Métriques Prometheus sur http://{self.host}:{self.port}/metrics")
+        return self
+
+    def stop(self):
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+# Registre global
+metrics = Metrics()
@@ -0,0 +1,192 @@
+import argparse
+import itertools
+import os
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backtest import load_candles, simulate
+from config import config
+from indicators import TechnicalIndicators
+
+# Espace de recherche par défaut, aligné sur les bornes des commandes Telegram
+DEFAULT_SPACE = {
+    'rsi_length': list(range(10, 201, 10)),
+    'rsi_entry_threshold': [5.0, 10.0, 15.0, 20.0, 25.0, 30.0],
+    'rsi_exit_threshold': [70.0, 75.0, 80.0, 85.0, 90.0, 95.0],
+    'stop_loss_pct': [1.0, 2.0, 3.0, 5.0, 10.0],
+}
+
+# Lignes du bloc de mémoire partagée
+_OPEN_TIME, _HIGH, _LOW, _CLOSE, _VOLUME = range(5)
+
+# État des workers (attaché une fois par processus)
+_shm: Optional[shared_memory.SharedMemory] = None
+_candles: Optional[np.ndarray] = None
+_bull: Optional[np.ndarray] = None
+_rsi_cache: Dict[int, np.ndarray] = {}
+
+
+@dataclass(frozen=True)
+class Combination:
+    rsi_length: int
+    rsi_entry_threshold: float
+    rsi_exit_threshold: float
+    stop_loss_pct: float
+
+
+def grid_search_space(space: Dict[str, Sequence]) -> List[Combination]:
+    """Toutes les combinaisons valides (seuil d'entrée < seuil de sortie)"""
+    combos = [Combination(*values) for values in itertools.product(
+        space['rsi_length'], space['rsi_entry_threshold'],
+        space['rsi_exit_threshold'], space['stop_loss_pct']
+    )]
+    return [c for c in combos if c.rsi_entry_threshold < c.rsi_exit_threshold]
+
+
+def random_search_space(space: Dict[str, Sequence], samples: int, seed: Optional[int] = None) -> List[Combination]:
+    """Échantillon aléatoire (sans doublon) de la grille"""
+    combos = grid_search_space(space)
+    rng = random.Random(seed)
+    return rng.sample(combos, min(samples, len(combos)))
+
+
+def _init_worker(shm_name: str, shape: Tuple[int, int], ma_period: int):
+    """Attache les bougies partagées dans le processus worker (aucune copie)"""
+    global _shm, _candles, _bull
+    _shm = shared_memory.SharedMemory(name=shm_name)
+    _candles = np.ndarray(shape, dtype=np.float64, buffer=_shm.buf)
+    _bull = TechnicalIndicators.bull_market_array(_candles[_CLOSE], ma_period)
+    _rsi_cache.clear()
+
+
+def _rsi_vwap(length: int) -> np.ndarray:
+    """RSI-VWAP d'une période, calculé une seule fois par worker"""
+    rsi = _rsi_cache.get(length)
+    if rsi is None:
+        vwap = TechnicalIndicators.calculate_vwap_array(
+            _candles[_HIGH], _candles[_LOW], _candles[_CLOSE], _candles[_VOLUME], length
+        )
+        rsi = TechnicalIndicators.calculate_rsi_array(vwap, length)
+        _rsi_cache.clear()  # les tâches arrivent groupées par période
+        _rsi_cache[length] = rsi
+    return rsi
+
+
+def _evaluate(task: Tuple[int, List[Combination], float, float, float]) -> List[Dict]:
+    """Évalue toutes les variantes de seuils partageant la même période RSI"""
+    length, combos, risk_per_trade, initial_balance, fee_rate = task
+    rsi = _rsi_vwap(length)
+    open_times = _candles[_OPEN_TIME].astype(np.int64)
+    close = _candles[_CLOSE]
+    low = _candles[_LOW]
+
+    rows = []
+    for combo in combos:
+        result = simulate(open_times, close, rsi, _bull, combo.rsi_entry_threshold,
+                          combo.rsi_exit_threshold, risk_per_trade, combo.stop_loss_pct,
+                          initial_balance, fee_rate, with_trades=False, low=low)
+        row = dict(combo.__dict__)
+        row.update(result.stats)
+        rows.append(row)
+    return rows
+
+
+def _make_tasks(combos: Iterable[Combination], chunk_size: int, risk_per_trade: float,
+                initial_balance: float, fee_rate: float) -> List[Tuple]:
+    by_length = defaultdict(list)
+    for combo in combos:
+        by_length[combo.rsi_length].append(combo)
+
+    tasks = []
+    for length, group in sorted(by_length.items()):
+        for start in range(0, len(group), chunk_size):
+            tasks.append((length, group[start:start + chunk_size], risk_per_trade, initial_balance, fee_rate))
+    return tasks
+
+
+def optimize(candles: pd.DataFrame, combos: List[Combination], risk_per_trade: float = config.risk_per_trade,
+             initial_balance: float = 1000.0, fee_rate: float = 0.0, workers: Optional[int] = None,
+             chunk_size: int = 256, ma_period: int = 200) -> pd.DataFrame:
+    """
+    Lance le balayage de paramètres sur un pool de processus. Les bougies
+    sont placées une seule fois en mémoire partagée ; chaque tâche regroupe
+    les variantes d'une même période RSI pour réutiliser le VWAP calculé.
+    Renvoie un tableau classé par PnL, drawdown puis taux de réussite.
+    """
+    if 'timestamp' in candles.columns:
+        open_times = candles['timestamp'].to_numpy(dtype=np.float64)
+    else:
+        open_times = (candles.index.asi8 // 1_000_000).astype(np.float64)
+    columns = [open_times] + [candles[c].to_numpy(dtype=np.float64) for c in ('high', 'low', 'close', 'volume')]
+    shape = (len(columns), len(candles))
+
+    shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+    try:
+        shared = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        for row, values in enumerate(columns):
+            shared[row] = values
+        del shared
+
+        tasks = _make_tasks(combos, chunk_size, risk_per_trade, initial_balance, fee_rate)
+        rows: List[Dict] = []
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count(),
+                                 initializer=_init_worker, initargs=(shm.name, shape, ma_period)) as pool:
+            for chunk in pool.map(_evaluate, tasks):
+                rows.extend(chunk)
+    finally:
+        shm.close()
+        shm.unlink()
+
+    results = pd.DataFrame(rows)
+    if results.empty:
+        return results
+    results = results.sort_values(['total_pnl', 'max_drawdown', 'win_rate'],
+                                  ascending=[False, True, False]).reset_index(drop=True)
+    results.index.name = 'rank'
+    return results
+
+
+def main():
+    from binance.client import Client
+
+    parser = argparse.ArgumentParser(description="Optimisation des paramètres RSI-VWAP")
+    parser.add_argument('--symbol', default=config.symbol)
+    parser.add_argument('--interval', default=config.timeframe)
+    parser.add_argument('--days', type=int, default=365)
+    parser.add_argument('--mode', choices=['grid', 'random'], default='grid')
+    parser.add_argument('--samples', type=int, default=1000, help="combinaisons en mode random")
+    parser.add_argument('--seed', type=int, default=None)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--balance', type=float, default=1000.0)
+    parser.add_argument('--fee', type=float, default=0.0, help="frais par côté (ex: 0.001)")
+    parser.add_argument('--top', type=int, default=20)
+    args = parser.parse_args()
+
+    client = Client(config.binance_api_key, config.binance_secret_key)
+    candles = load_candles(client, args.symbol, args.interval, args.days)
+
+    if args.mode == 'grid':
+        combos = grid_search_space(DEFAULT_SPACE)
+    else:
+        combos = random_search_space(DEFAULT_SPACE, args.samples, args.seed)
+
+    started = time.perf_counter()
+    results = optimize(candles, combos, config.risk_per_trade, args.balance, args.fee, args.workers)
+    elapsed = time.perf_counter() - started
+
+    print(f"{len(combos)} combinaisons évaluées sur {len(candles)} bougies en {elapsed:.1f} s")
+    columns = ['rsi_length', 'rsi_entry_threshold', 'rsi_exit_threshold', 'stop_loss_pct',
+               'total_pnl', 'max_drawdown', 'win_rate', 'total_trades', 'profit_factor']
+    print(results[columns].head(args.top).to_string())
+
+
+if __name__ == '__main__':
+    main()
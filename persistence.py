@@ -0,0 +1,167 @@
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import Any, Callable, List, Optional, Tuple
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+WriteOp = Callable[[sqlite3.Cursor], Any]
+
+_FLUSH = object()
+_STOP = object()
+
+
+@contextmanager
+def _synchronous_full(conn: sqlite3.Connection, enabled: bool):
+    """Commit synchronisé sur disque (fsync du WAL) le temps du bloc, si ``enabled``"""
+    if not enabled:
+        yield
+        return
+    previous = conn.execute("PRAGMA synchronous").fetchone()[0]
+    conn.execute("PRAGMA synchronous=FULL")
+    try:
+        yield
+    finally:
+        # Le niveau ne peut pas changer en cours de transaction (lot en échec)
+        if conn.in_transaction:
+            conn.rollback()
+        conn.execute(f"PRAGMA synchronous={int(previous)}")
+
+
+class WriteBehindQueue:
+    """
+    File d'écriture différée: les opérations soumises par le bot sont
+    regroupées par un thread dédié en transactions groupées (un seul commit
+    par lot), au plus tard ``max_delay`` secondes après leur soumission.
+
+    Les opérations ``durable=True`` renvoient un ``Future`` résolu une fois
+    le commit effectué (accusé de durabilité). Les lots qui en contiennent
+    sont commités en ``synchronous=FULL`` : en WAL avec ``NORMAL``, un commit
+    n'est pas synchronisé sur disque et peut être perdu en cas de coupure.
+    """
+
+    def __init__(self, connection_factory: Callable[[], sqlite3.Connection],
+                 max_batch: int = 256, max_delay: float = 0.5):
+        self.connection_factory = connection_factory
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, op: WriteOp, durable: bool = False) -> Optional[Future]:
+        """Met une opération en file; renvoie un Future si ``durable``"""
+        if self._closed:
+            raise RuntimeError("File d'écriture fermée")
+        future = Future() if durable else None
+        self._queue.put((op, future))
+        return future
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Attend que tout ce qui a été soumis avant l'appel soit commité"""
+        if not self._thread.is_alive():
+            return True
+        marker = Future()
+        self._queue.put((_FLUSH, marker))
+        try:
+            marker.result(timeout)
+            return True
+        except Exception:
+            return False
+
+    def close(self, timeout: Optional[float] = 10.0):
+        """Vide la file puis arrête le thread d'écriture"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put((_STOP, None))
+        self._thread.join(timeout)
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _collect(self) -> Tuple[List[tuple], bool]:
+        """Récupère un lot: bloque sur le premier élément, puis au plus ``max_delay``"""
+        first = self._queue.get()
+        batch = [first]
+        if first[0] is _STOP:
+            return batch, True
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item[0] is _STOP or item[0] is _FLUSH:
+                break
+        return batch, batch[-1][0] is _STOP
+
+    def _run(self):
+        conn = self.connection_factory()
+        stopping = False
+        while not stopping:
+            batch, stopping = self._collect()
+            ops = [item for item in batch if item[0] is not _FLUSH and item[0] is not _STOP]
+            if stopping:
+                # Vider ce qui reste avant de s'arrêter
+                while True:
+                    try:
+                        item = self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item[0] is not _FLUSH and item[0] is not _STOP:
+                        ops.append(item)
+                    elif item[0] is _FLUSH:
+                        batch.append(item)
+            self._write(conn, ops)
+            for op, future in batch:
+                if op is _FLUSH:
+                    future.set_result(True)
+
+    def _write(self, conn: sqlite3.Connection, ops: List[tuple]):
+        """Exécute un lot dans une seule transaction, puis acquitte"""
+        if not ops:
+            return
+        results = []
+        durable = any(future is not None for _, future in ops)
+        try:
+            with metrics.span('db.commit'), _synchronous_full(conn, durable):
+                cursor = conn.cursor()
+                for op, _ in ops:
+                    results.append(op(cursor))
+                conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.warning(f"Échec du lot d'écriture ({len(ops)} opérations), reprise une par une: {e}")
+            self._write_one_by_one(conn, ops)
+            return
+
+        for (_, future), result in zip(ops, results):
+            if future is not None:
+                future.set_result(result)
+
+    def _write_one_by_one(self, conn: sqlite3.Connection, ops: List[tuple]):
+        for op, future in ops:
+            try:
+                with _synchronous_full(conn, future is not None):
+                    result = op(conn.cursor())
+                    conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Écriture différée échouée: {e}")
+                if future is not None:
+                    future.set_exception(e)
+                continue
+            if future is not None:
+                future.set_result(result)
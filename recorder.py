@@ -0,0 +1,172 @@
+import json
+import logging
+import os
+import struct
+import threading
+import zlib
+from typing import Any, BinaryIO, Dict, Iterator, List, NamedTuple, Optional
+
+import clock
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"PLNXREC\x01"
+
+# Types d'enregistrement
+KLINES = 1          # bougies entrées dans le cache (REST ou websocket)
+ACCOUNT = 2         # réponse get_account
+ACCOUNT_EVENT = 3   # événement du stream user-data
+ORDER = 4           # réponse (ou erreur) d'un ordre
+CALL = 5            # autre appel client (heure serveur, ping, ...)
+
+# En-tête: type, horodatage (ms), taille de la charge utile
+_HEADER = struct.Struct("<BqI")
+# Bougie: open_time, o, h, l, c, v, close_time, quote_volume, trades, taker_base, taker_quote
+_KLINE = struct.Struct("<qdddddqdqdd")
+
+
+class Record(NamedTuple):
+    kind: int
+    timestamp_ms: int
+    data: Any
+
+
+def _encode_json(data: Any) -> bytes:
+    return zlib.compress(json.dumps(data, separators=(',', ':'), default=str).encode())
+
+
+def _decode_json(payload: bytes) -> Any:
+    return json.loads(zlib.decompress(payload))
+
+
+def _encode_klines(symbol: str, interval: str, klines: List[list]) -> bytes:
+    symbol_b, interval_b = symbol.encode(), interval.encode()
+    parts = [struct.pack("<B", len(symbol_b)), symbol_b, struct.pack("<B", len(interval_b)), interval_b,
+             struct.pack("<I", len(klines))]
+    for k in klines:
+        parts.append(_KLINE.pack(int(k[0]), float(k[1]), float(k[2]), float(k[3]), float(k[4]), float(k[5]),
+                                 int(k[6]), float(k[7]), int(k[8]), float(k[9]), float(k[10])))
+    return b"".join(parts)
+
+
+def _decode_klines(payload: bytes) -> Dict:
+    offset = 0
+    size = payload[offset]
+    symbol = payload[offset + 1:offset + 1 + size].decode()
+    offset += 1 + size
+    size = payload[offset]
+    interval = payload[offset + 1:offset + 1 + size].decode()
+    offset += 1 + size
+    (count,) = struct.unpack_from("<I", payload, offset)
+    offset += 4
+    klines = [list(row) + ['0'] for row in _KLINE.iter_unpack(payload[offset:offset + count * _KLINE.size])]
+    return {'symbol': symbol, 'interval': interval, 'klines': klines}
+
+
+class Recorder:
+    """
+    Journal binaire en ajout seul de tout ce que le bot reçoit de l'exchange
+    (bougies, soldes, ordres), horodaté sur l'horloge du bot. Les bougies
+    sont packées en binaire, le reste en JSON compressé.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._file: BinaryIO = open(path, "ab")
+        self._lock = threading.Lock()
+        if new_file:
+            self._file.write(MAGIC)
+            self._file.flush()
+
+    def _write(self, kind: int, payload: bytes):
+        timestamp_ms = int(clock.now() * 1000)
+        with self._lock:
+            if self._file.closed:
+                return
+            self._file.write(_HEADER.pack(kind, timestamp_ms, len(payload)) + payload)
+            self._file.flush()
+
+    def record_klines(self, symbol: str, interval: str, klines: List[list]):
+        if klines:
+            self._write(KLINES, _encode_klines(symbol, interval, klines))
+
+    def record_account(self, account_info: Dict):
+        self._write(ACCOUNT, _encode_json(account_info))
+
+    def record_account_event(self, event: Dict):
+        self._write(ACCOUNT_EVENT, _encode_json(event))
+
+    def record_order(self, method: str, kwargs: Dict, result: Any = None, error: Optional[str] = None):
+        self._write(ORDER, _encode_json({'method': method, 'kwargs': kwargs, 'result': result, 'error': error}))
+
+    def record_call(self, method: str, args: tuple, kwargs: Dict, result: Any, error: Optional[str] = None):
+        self._write(CALL, _encode_json({'method': method, 'args': list(args), 'kwargs': kwargs,
+                                        'result': result, 'error': error}))
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+def read_log(path: str) -> Iterator[Record]:
+    """Relit un journal ; un dernier enregistrement tronqué (arrêt brutal) est ignoré"""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path}: journal d'enregistrement invalide")
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            kind, timestamp_ms, size = _HEADER.unpack(header)
+            payload = f.read(size)
+            if len(payload) < size:
+                logger.warning(f"{path}: dernier enregistrement tronqué ignoré")
+                return
+            data = _decode_klines(payload) if kind == KLINES else _decode_json(payload)
+            yield Record(kind, timestamp_ms, data)
+
+
+class RecordingClient:
+    """
+    Enveloppe d'un client Binance qui journalise les réponses de compte,
+    d'ordres et des autres appels (les bougies sont journalisées à leur
+    entrée dans le ``KlineCache``).
+    """
+
+    _SKIPPED = ('get_historical_klines', 'get_klines')
+
+    def __init__(self, client, recorder: Recorder):
+        object.__setattr__(self, '_client', client)
+        object.__setattr__(self, '_recorder', recorder)
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._client, name)
+        if name.startswith('_') or not callable(attr) or name in self._SKIPPED:
+            return attr
+        recorder = self._recorder
+
+        def recorded(*args, **kwargs):
+            if name.startswith(('order_', 'create_order')):
+                try:
+                    result = attr(*args, **kwargs)
+                except Exception as e:
+                    recorder.record_order(name, kwargs, error=str(e))
+                    raise
+                recorder.record_order(name, kwargs, result)
+                return result
+            try:
+                result = attr(*args, **kwargs)
+            except Exception as e:
+                # Les erreurs (ex: ordre introuvable) font partie de la séquence à rejouer
+                recorder.record_call(name, args, kwargs, None, error=str(e))
+                raise
+            if name == 'get_account':
+                recorder.record_account(result)
+            else:
+                recorder.record_call(name, args, kwargs, result)
+            return result
+        return recorded
+
+    def __setattr__(self, name: str, value):
+        setattr(self._client, name, value)
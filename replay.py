@@ -0,0 +1,309 @@
+import argparse
+import asyncio
+import bisect
+import json
+import os
+import re
+import tempfile
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import clock
+from account_state import AccountState
+from async_io import set_inline
+from clock import VirtualClock
+from config import config
+from recorder import ACCOUNT, ACCOUNT_EVENT, CALL, KLINES, ORDER, read_log
+from sim_exchange import SimulatedOrderError
+
+
+class ReplayMarket:
+    """Contenu d'un journal d'enregistrement, indexé pour le rejeu"""
+
+    def __init__(self):
+        self.klines: Dict[Tuple[str, str], List[Tuple[int, list]]] = defaultdict(list)
+        self.account: List[Tuple[int, int, Dict]] = []
+        self.orders: List[Dict] = []
+        self.calls: Dict[str, List[Dict]] = defaultdict(list)
+        self.start_ms: Optional[int] = None
+        self.end_ms: Optional[int] = None
+
+    @classmethod
+    def load(cls, path: str) -> 'ReplayMarket':
+        market = cls()
+        for record in read_log(path):
+            if market.start_ms is None:
+                market.start_ms = record.timestamp_ms
+            market.end_ms = record.timestamp_ms
+            if record.kind == KLINES:
+                key = (record.data['symbol'], record.data['interval'])
+                market.klines[key].extend((record.timestamp_ms, k) for k in record.data['klines'])
+            elif record.kind in (ACCOUNT, ACCOUNT_EVENT):
+                market.account.append((record.timestamp_ms, record.kind, record.data))
+            elif record.kind == ORDER:
+                market.orders.append(dict(record.data, time=record.timestamp_ms))
+            elif record.kind == CALL:
+                market.calls[record.data['method']].append(dict(record.data, time=record.timestamp_ms))
+        if market.start_ms is None:
+            raise ValueError(f"{path}: journal vide")
+        return market
+
+    def symbols(self, interval: str) -> List[str]:
+        return sorted(symbol for symbol, iv in self.klines if iv == interval)
+
+
+class ReplayClient:
+    """
+    Client Binance de rejeu : sert, à l'heure de l'horloge virtuelle, le
+    dernier état enregistré de chaque bougie et des soldes. Les ordres passés
+    par le bot sont collectés ; la réponse enregistrée est renvoyée quand
+    l'ordre correspond, sinon un remplissage au dernier cours est simulé.
+    """
+
+    def __init__(self, market: ReplayMarket):
+        self.market = market
+        self.placed: List[Dict] = []
+        self._cursors: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._candles: Dict[Tuple[str, str], Dict[int, list]] = defaultdict(dict)
+        self._open_times: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+        self._account = AccountState()
+        self._account_cursor = 0
+        self._last_update = 0
+        self._call_cursors: Dict[str, int] = defaultdict(int)
+
+    @staticmethod
+    def _now_ms() -> int:
+        return int(clock.now() * 1000)
+
+    def _advance(self, key: Tuple[str, str]):
+        entries = self.market.klines.get(key, [])
+        now = self._now_ms()
+        cursor = self._cursors[key]
+        candles, open_times = self._candles[key], self._open_times[key]
+        while cursor < len(entries) and entries[cursor][0] <= now:
+            kline = entries[cursor][1]
+            if kline[0] not in candles:
+                bisect.insort(open_times, kline[0])
+            candles[kline[0]] = kline
+            cursor += 1
+        self._cursors[key] = cursor
+
+    def get_historical_klines(self, symbol: str, interval: str, start_str=None, end_str=None,
+                              limit: int = 1000, **kwargs) -> List[list]:
+        key = (symbol, interval)
+        self._advance(key)
+        open_times = self._open_times[key]
+        begin = bisect.bisect_left(open_times, int(start_str or 0))
+        end = bisect.bisect_right(open_times, int(end_str)) if end_str is not None else len(open_times)
+        return [list(self._candles[key][t]) for t in open_times[begin:end]]
+
+    def get_klines(self, symbol: str, interval: str, limit: int = 500, startTime=None, endTime=None, **kwargs):
+        klines = self.get_historical_klines(symbol, interval, startTime, endTime)
+        return klines if startTime is not None else klines[-limit:]
+
+    def get_account(self, **params) -> Dict:
+        now = self._now_ms()
+        while self._account_cursor < len(self.market.account) and self.market.account[self._account_cursor][0] <= now:
+            _, kind, data = self.market.account[self._account_cursor]
+            if kind == ACCOUNT:
+                self._account.load_snapshot(data)
+            else:
+                self._account.apply_event(data)
+            self._account_cursor += 1
+        balances = [{'asset': asset, 'free': str(b['free']), 'locked': str(b['locked'])}
+                    for asset, b in sorted(self._account._balances.items())]
+        return {'balances': balances, 'updateTime': now}
+
+    def _last_price(self, symbol: str) -> float:
+        latest = None
+        for (sym, interval), open_times in self._open_times.items():
+            if sym == symbol and open_times:
+                kline = self._candles[(sym, interval)][open_times[-1]]
+                if latest is None or kline[6] > latest[6]:
+                    latest = kline
+        return float(latest[4]) if latest else 0.0
+
+    def _order(self, method: str, symbol: str, quantity: float, **kwargs) -> Dict:
+        order = {'time': self._now_ms(), 'method': method, 'symbol': symbol, 'quantity': float(quantity)}
+        index = len(self.placed)
+        self.placed.append(order)
+
+        if index < len(self.market.orders):
+            recorded = self.market.orders[index]
+            if (recorded['method'] == method and recorded['kwargs'].get('symbol') == symbol
+                    and float(recorded['kwargs'].get('quantity', 0)) == float(quantity)):
+                if recorded['error']:
+                    raise self._recorded_error(recorded['error'])
+                return recorded['result']
+
+        price = self._last_price(symbol)
+        return {
+            'symbol': symbol, 'side': 'BUY' if method == 'order_market_buy' else 'SELL',
+            'status': 'FILLED', 'executedQty': str(quantity), 'transactTime': order['time'],
+            'fills': [{'price': str(price), 'qty': str(quantity), 'commission': '0', 'commissionAsset': 'USDT'}],
+        }
+
+    @staticmethod
+    def _recorded_error(message: str) -> Exception:
+        """Erreur enregistrée, avec son code Binance pour que l'exécution réagisse à l'identique"""
+        code = re.search(r"code=(-?\d+)", message)
+        if code:
+            return SimulatedOrderError(int(code.group(1)), message)
+        return RuntimeError(message)
+
+    def _next_call(self, method: str) -> Optional[Dict]:
+        """Prochain appel ``method`` enregistré (même séquence que pendant l'enregistrement)"""
+        calls = self.market.calls.get(method, [])
+        cursor = self._call_cursors[method]
+        if cursor >= len(calls):
+            return None
+        self._call_cursors[method] = cursor + 1
+        return calls[cursor]
+
+    def get_exchange_info(self) -> Dict:
+        """Dernière réponse enregistrée à l'heure virtuelle (filtres identiques au live)"""
+        calls = [c for c in self.market.calls.get('get_exchange_info', []) if c['result'] is not None]
+        if not calls:
+            raise RuntimeError("Aucun get_exchange_info dans le journal")
+        now = self._now_ms()
+        past = [c for c in calls if c['time'] <= now]
+        return (past[-1] if past else calls[0])['result']
+
+    def get_order(self, symbol: str, **params) -> Dict:
+        """Recherche d'ordre (reprise après erreur): réponses enregistrées dans l'ordre"""
+        recorded = self._next_call('get_order')
+        if recorded is None:
+            raise SimulatedOrderError(-2013, "Order does not exist.")
+        if recorded.get('error'):
+            raise self._recorded_error(recorded['error'])
+        return recorded['result']
+
+    def order_market_buy(self, symbol: str, quantity: float, **kwargs) -> Dict:
+        return self._order('order_market_buy', symbol, quantity, **kwargs)
+
+    def order_market_sell(self, symbol: str, quantity: float, **kwargs) -> Dict:
+        return self._order('order_market_sell', symbol, quantity, **kwargs)
+
+    def ping(self) -> Dict:
+        return {}
+
+    def get_server_time(self) -> Dict:
+        return {'serverTime': self._now_ms()}
+
+
+def replay(log_path: str, symbols: Optional[List[str]] = None, speed: Optional[float] = None,
+           workdir: Optional[str] = None, simulate: bool = False) -> Dict:
+    """
+    Rejoue un journal à travers ``TradingBot.trading_loop`` (mode REST,
+    horloge virtuelle, E/S exécutées en ligne pour un ordre déterministe).
+    ``speed`` limite l'accélération (ex: 1000 = mille fois le temps réel).
+    Avec ``simulate``, les ordres sont exécutés par un ``SimulatedExchange``
+    (frais, slippage et soldes de ``config.sim_*``) sur les prix enregistrés.
+    """
+    import trading_bot as bot_module
+    from database import Database
+    from kline_cache import KlineCache
+    from sim_exchange import SimulatedExchange
+
+    market = ReplayMarket.load(log_path)
+    interval = config.resample_base or config.timeframe
+    symbols = symbols or market.symbols(interval)
+    if not symbols:
+        raise ValueError(f"Aucune bougie {interval} dans {log_path}")
+    workdir = workdir or tempfile.mkdtemp(prefix="replay-")
+
+    overrides = {'symbols': symbols, 'market_data_mode': 'rest', 'account_stream': False,
+                 'stop_loss_monitor': False, 'record_path': None, 'is_active': True}
+    saved = {name: getattr(config, name) for name in overrides}
+    previous_clock, previous_db = clock.get_clock(), bot_module.db
+    virtual_clock = VirtualClock(market.start_ms / 1000, speed)
+    replay_db = Database(os.path.join(workdir, "trading_bot.db"))
+
+    for name, value in overrides.items():
+        setattr(config, name, value)
+    clock.set_clock(virtual_clock)
+    set_inline(True)
+    bot_module.db = replay_db
+    started = time.perf_counter()
+    try:
+        bot = bot_module.TradingBot()
+        bot.kline_cache = KlineCache(os.path.join(workdir, "klines.db"), ttl=config.kline_cache_ttl,
+                                     max_candles=bot.kline_cache.max_candles)
+        replay_client = ReplayClient(market)
+        bot.client = replay_client
+        if simulate:
+            bot.client = SimulatedExchange(replay_client, {'USDT': config.sim_initial_balance},
+                                           fee_rate=config.sim_fee_rate, slippage=config.sim_slippage)
+        bot.account.client = bot.client
+        bot.execution.client = bot.client
+
+        async def run():
+            loop_task = asyncio.create_task(bot.trading_loop())
+            while not loop_task.done():
+                if virtual_clock.time() * 1000 >= market.end_ms:
+                    bot.stop_trading()
+                    break
+                await virtual_clock.sleep(60)
+            await loop_task
+
+        asyncio.run(run())
+    finally:
+        set_inline(False)
+        clock.set_clock(previous_clock)
+        bot_module.db = previous_db
+        replay_db.close()
+        for name, value in saved.items():
+            setattr(config, name, value)
+
+    elapsed = time.perf_counter() - started
+    virtual_seconds = (market.end_ms - market.start_ms) / 1000
+    if simulate:
+        placed = [{'time': o['transactTime'], 'method': 'order_market_' + o['side'].lower(),
+                   'symbol': o['symbol'], 'quantity': float(o['origQty'])} for o in bot.client.orders]
+    else:
+        placed = replay_client.placed
+    recorded = [{'method': o['method'], 'symbol': o['kwargs'].get('symbol'),
+                 'quantity': float(o['kwargs'].get('quantity', 0))} for o in market.orders]
+    return {
+        'symbols': symbols,
+        'orders': placed,
+        'recorded_orders': recorded,
+        'matches_recording': [(o['method'], o['symbol'], o['quantity']) for o in placed]
+                             == [(o['method'], o['symbol'], o['quantity']) for o in recorded],
+        'virtual_seconds': virtual_seconds,
+        'elapsed': elapsed,
+        'speedup': virtual_seconds / elapsed if elapsed else float('inf'),
+        'balances': bot.client.get_account()['balances'] if simulate else None,
+        'workdir': workdir,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rejeu d'un journal d'enregistrement à travers le bot")
+    parser.add_argument('log', help="journal produit avec RECORD_PATH")
+    parser.add_argument('--symbols', nargs='*', default=None)
+    parser.add_argument('--interval', default=config.timeframe)
+    parser.add_argument('--speed', type=float, default=None, help="facteur d'accélération max (défaut: illimité)")
+    parser.add_argument('--runs', type=int, default=1, help="rejeux successifs pour vérifier le déterminisme")
+    parser.add_argument('--simulate', action='store_true', help="exécuter les ordres sur l'exchange simulé")
+    args = parser.parse_args()
+
+    config.timeframe = args.interval
+    reports = [replay(args.log, args.symbols, args.speed, simulate=args.simulate) for _ in range(args.runs)]
+    report = reports[0]
+
+    print(f"{len(report['orders'])} ordre(s) rejoué(s) sur {report['virtual_seconds'] / 3600:.1f} h "
+          f"en {report['elapsed']:.2f} s (x{report['speedup']:.0f})")
+    print(f"Conforme à l'enregistrement: {'oui' if report['matches_recording'] else 'non'}")
+    if args.runs > 1:
+        same = all(r['orders'] == report['orders'] for r in reports[1:])
+        print(f"Déterministe sur {args.runs} rejeux: {'oui' if same else 'non'}")
+    for order in report['orders']:
+        print(json.dumps(order))
+    if report['balances'] is not None:
+        print("Soldes simulés: " + ", ".join(f"{b['asset']}={b['free']}" for b in report['balances']))
+
+
+if __name__ == '__main__':
+    main()
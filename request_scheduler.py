@@ -0,0 +1,296 @@
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from kline_cache import interval_to_ms
+
+logger = logging.getLogger(__name__)
+
+# Priorités (plus petit = plus prioritaire)
+PRIORITY_ORDER = 0
+PRIORITY_ACCOUNT = 1
+PRIORITY_MARKET_DATA = 2
+
+# Poids REST par défaut des méthodes du client (affinés par les en-têtes)
+DEFAULT_WEIGHTS = {
+    'ping': 1,
+    'get_server_time': 1,
+    'get_klines': 2,
+    'get_historical_klines': 2,
+    'get_symbol_ticker': 2,
+    'get_orderbook_ticker': 2,
+    'get_exchange_info': 20,
+    'get_symbol_info': 20,
+    'get_account': 20,
+    'get_asset_balance': 20,
+    'get_order': 4,
+    'get_open_orders': 6,
+    'get_my_trades': 20,
+    'stream_get_listen_key': 2,
+    'stream_keepalive': 2,
+    'stream_close': 2,
+}
+DEFAULT_WEIGHT = 1
+# Méthodes paginées par python-binance (un appel /klines de ``limit`` bougies par page)
+_PAGED_KLINES = ('get_historical_klines', 'get_historical_klines_generator')
+_KLINES_PAGE_LIMIT = 1000
+
+# Méthodes sans effet de bord, pouvant être mutualisées entre appelants simultanés
+_COALESCABLE_PREFIXES = ('get_', 'ping')
+
+
+def method_priority(name: str) -> int:
+    if name.startswith(('order_', 'create_order', 'cancel_')) or name == 'get_order':
+        return PRIORITY_ORDER
+    if name in ('get_account', 'get_asset_balance') or name.startswith('stream_'):
+        return PRIORITY_ACCOUNT
+    return PRIORITY_MARKET_DATA
+
+
+def is_order(name: str) -> bool:
+    return name.startswith(('order_', 'create_order'))
+
+
+class RequestScheduler:
+    """
+    Passage obligé de tous les appels REST Binance.
+
+    - budget de poids par minute (fenêtres fixes, comme Binance), recalé sur
+      l'en-tête ``X-MBX-USED-WEIGHT-1M`` de chaque réponse ;
+    - compteurs d'ordres 10 s / 1 jour recalés sur ``X-MBX-ORDER-COUNT-*`` ;
+    - les ordres passent avant les lectures de compte, puis les données de
+      marché, et disposent d'une réserve de budget dédiée ;
+    - les lectures identiques simultanées sont mutualisées en un seul appel ;
+    - en cas de 429/418, tous les appels sont suspendus jusqu'au ``Retry-After``.
+    """
+
+    def __init__(self, weight_limit: int = 5000, order_limit_10s: int = 50, order_limit_1d: int = 160000,
+                 order_reserve: float = 0.1, clock: Callable[[], float] = time.time):
+        self.weight_limit = weight_limit
+        self.order_limit_10s = order_limit_10s
+        self.order_limit_1d = order_limit_1d
+        self.order_reserve = order_reserve
+        self.clock = clock
+
+        self._cond = threading.Condition()
+        self._waiting = defaultdict(int)
+        self._minute = None
+        self._used_weight = 0
+        self._orders_10s: Tuple[Optional[int], int] = (None, 0)
+        self._orders_1d: Tuple[Optional[int], int] = (None, 0)
+        self._banned_until = 0.0
+
+        self._in_flight: Dict[Tuple, Future] = {}
+        self._active = 0
+        self._last_header: Tuple[Optional[int], int] = (None, 0)
+        self._local = threading.local()
+        self.learned_weights: Dict[str, int] = {}
+        self.calls: Dict[str, int] = defaultdict(int)
+        self.coalesced = 0
+        self.throttled = 0
+
+    # --- Budget ---
+
+    def _roll(self, now: float):
+        minute = int(now // 60)
+        if minute != self._minute:
+            self._minute, self._used_weight = minute, 0
+        if self._orders_10s[0] != int(now // 10):
+            self._orders_10s = (int(now // 10), 0)
+        if self._orders_1d[0] != int(now // 86400):
+            self._orders_1d = (int(now // 86400), 0)
+
+    def weight_of(self, name: str) -> int:
+        return self.learned_weights.get(name, DEFAULT_WEIGHTS.get(name, DEFAULT_WEIGHT))
+
+    def estimate_weight(self, name: str, args: tuple, kwargs: Dict) -> int:
+        """
+        Poids d'un appel d'après ses paramètres : l'historique de bougies est
+        découpé en pages de ``limit`` bougies, chacune au poids d'un /klines.
+        Plafonné au budget hors réserve des ordres (les en-têtes recalent l'usage réel).
+        """
+        weight = self.weight_of(name)
+        if name not in _PAGED_KLINES:
+            return weight
+        params = dict(zip(('symbol', 'interval', 'start_str', 'end_str', 'limit'), args), **kwargs)
+        try:
+            period = interval_to_ms(params['interval'])
+            start = int(params['start_str'])
+            end = int(params['end_str']) if params.get('end_str') is not None else int(self.clock() * 1000)
+        except (KeyError, TypeError, ValueError):
+            # Dates en texte libre (ex: "1 day ago UTC"): une page par défaut
+            return weight
+        limit = int(params.get('limit') or _KLINES_PAGE_LIMIT)
+        pages = max(1, math.ceil((end - start) / period / limit))
+        return min(weight * pages, self.weight_limit - int(self.weight_limit * self.order_reserve))
+
+    def _allowed(self, name: str, weight: int, priority: int, now: float) -> bool:
+        if now < self._banned_until:
+            return False
+        if any(self._waiting[p] for p in range(priority)):
+            return False
+        limit = self.weight_limit
+        if priority != PRIORITY_ORDER:
+            limit -= int(self.weight_limit * self.order_reserve)
+        if self._used_weight + weight > limit:
+            return False
+        if is_order(name) and (self._orders_10s[1] >= self.order_limit_10s
+                               or self._orders_1d[1] >= self.order_limit_1d):
+            return False
+        return True
+
+    def _wait_time(self, now: float) -> float:
+        if now < self._banned_until:
+            return self._banned_until - now
+        # Prochaine fenêtre (10 s suffit à couvrir les compteurs d'ordres)
+        return min(60 - now % 60, 10 - now % 10) + 0.001
+
+    def acquire(self, name: str, weight: Optional[int] = None, priority: Optional[int] = None):
+        """Bloque jusqu'à ce que l'appel tienne dans le budget, puis le réserve"""
+        weight = self.weight_of(name) if weight is None else weight
+        priority = method_priority(name) if priority is None else priority
+        with self._cond:
+            self._waiting[priority] += 1
+            try:
+                throttled = False
+                while True:
+                    now = self.clock()
+                    self._roll(now)
+                    if self._allowed(name, weight, priority, now):
+                        break
+                    if not throttled:
+                        throttled = True
+                        self.throttled += 1
+                        logger.warning(f"Budget Binance atteint, {name} en attente "
+                                       f"({self._used_weight}/{self.weight_limit})")
+                    self._cond.wait(self._wait_time(now))
+            finally:
+                self._waiting[priority] -= 1
+            self._used_weight += weight
+            if is_order(name):
+                self._orders_10s = (self._orders_10s[0], self._orders_10s[1] + 1)
+                self._orders_1d = (self._orders_1d[0], self._orders_1d[1] + 1)
+            self.calls[name] += 1
+            self._cond.notify_all()
+
+    def on_response(self, response, *args, **kwargs):
+        """Hook ``requests``: recale les compteurs sur les en-têtes Binance"""
+        headers = response.headers
+        now = self.clock()
+        with self._cond:
+            self._roll(now)
+            used = headers.get('X-MBX-USED-WEIGHT-1M')
+            if used is not None:
+                used = int(used)
+                # Poids réel de l'appel, mesurable quand il était seul en vol
+                name = getattr(self._local, 'name', None)
+                minute, previous = self._last_header
+                if name and self._active == 1 and minute == self._minute and used > previous:
+                    self.learned_weights[name] = used - previous
+                self._last_header = (self._minute, used)
+                self._used_weight = max(self._used_weight, used)
+            for header, attr in (('X-MBX-ORDER-COUNT-10S', '_orders_10s'), ('X-MBX-ORDER-COUNT-1D', '_orders_1d')):
+                count = headers.get(header)
+                if count is not None:
+                    window, local = getattr(self, attr)
+                    setattr(self, attr, (window, max(local, int(count))))
+            if response.status_code in (418, 429):
+                retry_after = float(headers.get('Retry-After', 60))
+                self._banned_until = max(self._banned_until, now + retry_after)
+                logger.error(f"Binance HTTP {response.status_code}: appels suspendus {retry_after:.0f} s")
+            self._cond.notify_all()
+        return response
+
+    # --- Appels ---
+
+    def call(self, name: str, func: Callable, *args, **kwargs) -> Any:
+        """Exécute ``func`` sous le budget, en mutualisant les lectures identiques"""
+        key = None
+        if name.startswith(_COALESCABLE_PREFIXES):
+            key = (name, args, tuple(sorted(kwargs.items())))
+            try:
+                hash(key)
+            except TypeError:
+                # Paramètre liste / dict: appel non mutualisé
+                key = None
+        if key is not None:
+            with self._cond:
+                pending = self._in_flight.get(key)
+                if pending is None:
+                    self._in_flight[key] = Future()
+            if pending is not None:
+                self.coalesced += 1
+                return pending.result()
+
+        future = self._in_flight.get(key) if key else None
+        try:
+            self.acquire(name, self.estimate_weight(name, args, kwargs))
+            with self._cond:
+                self._active += 1
+            self._local.name = name
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                self._local.name = None
+                with self._cond:
+                    self._active -= 1
+        except BaseException as e:
+            if future is not None:
+                future.set_exception(e)
+            raise
+        else:
+            if future is not None:
+                future.set_result(result)
+            return result
+        finally:
+            if key is not None:
+                with self._cond:
+                    self._in_flight.pop(key, None)
+
+    def usage(self) -> Dict:
+        """État courant du budget (pour l'affichage)"""
+        with self._cond:
+            now = self.clock()
+            self._roll(now)
+            return {
+                'used_weight': self._used_weight,
+                'weight_limit': self.weight_limit,
+                'weight_pct': self._used_weight / self.weight_limit * 100 if self.weight_limit else 0,
+                'orders_10s': self._orders_10s[1],
+                'orders_1d': self._orders_1d[1],
+                'banned_for': max(0.0, self._banned_until - now),
+                'calls': dict(self.calls),
+                'coalesced': self.coalesced,
+                'throttled': self.throttled,
+            }
+
+
+class ScheduledClient:
+    """
+    Enveloppe d'un ``binance.client.Client`` : chaque méthode publique passe
+    par le ``RequestScheduler``, et les réponses HTTP alimentent ses compteurs.
+    """
+
+    def __init__(self, client, scheduler: RequestScheduler):
+        object.__setattr__(self, '_client', client)
+        object.__setattr__(self, '_scheduler', scheduler)
+        session = getattr(client, 'session', None)
+        if session is not None and hasattr(session, 'hooks'):
+            session.hooks['response'].append(scheduler.on_response)
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._client, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+        scheduler = self._scheduler
+
+        def scheduled(*args, **kwargs):
+            return scheduler.call(name, attr, *args, **kwargs)
+        return scheduled
+
+    def __setattr__(self, name: str, value):
+        setattr(self._client, name, value)
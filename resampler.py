@@ -0,0 +1,172 @@
+import logging
+import threading
+from typing import Dict, Iterable, Optional, Tuple
+
+import numpy as np
+
+from candle_buffer import CandleBuffer, CandleView
+from kline_cache import interval_to_ms
+
+logger = logging.getLogger(__name__)
+
+# Index des champs dans le tuple d'une bougie (voir CANDLE_FIELDS)
+_OPEN_TIME, _OPEN, _HIGH, _LOW, _CLOSE, _VOLUME, _CLOSE_TIME = range(7)
+_CLOSED = 11
+
+
+def _merge(aggregate: Optional[tuple], row: tuple, bucket: int, period: int) -> tuple:
+    """Ajoute une bougie de base à la bougie agrégée de son intervalle"""
+    close_time = bucket + period - 1
+    # L'intervalle est clos quand sa dernière bougie de base l'est
+    closed = 1 if row[_CLOSED] and row[_CLOSE_TIME] >= close_time else 0
+    if aggregate is None:
+        return (bucket, row[_OPEN], row[_HIGH], row[_LOW], row[_CLOSE], row[_VOLUME], close_time,
+                row[7], row[8], row[9], row[10], closed)
+    return (bucket, aggregate[_OPEN], max(aggregate[_HIGH], row[_HIGH]), min(aggregate[_LOW], row[_LOW]),
+            row[_CLOSE], aggregate[_VOLUME] + row[_VOLUME], close_time, aggregate[7] + row[7],
+            aggregate[8] + row[8], aggregate[9] + row[9], aggregate[10] + row[10], closed)
+
+
+class Resampler:
+    """
+    Bougies multi-unités dérivées d'un seul flux de base (ex: 1m -> 5m,
+    15m, 1h, 4h), sans téléchargement supplémentaire.
+
+    Les bougies de base sont lues dans la vue du ``KlineCache`` : seules les
+    bougies postérieures à la dernière bougie de base clôturée déjà agrégée
+    sont traitées (reconstruction vectorisée au premier accès). Chaque
+    unité dérivée est un ``CandleBuffer`` ; ``view`` renvoie une
+    ``CandleView`` lisible par ``TechnicalIndicators`` et l'``IndicatorCache``.
+    """
+
+    def __init__(self, base_interval: str = "1m", intervals: Iterable[str] = ("5m", "15m", "1h", "4h"),
+                 capacity: int = 5000):
+        self.base_interval = base_interval
+        self.base_ms = interval_to_ms(base_interval)
+        self.capacity = capacity
+        self.periods: Dict[str, int] = {}
+        for interval in intervals:
+            self.add(interval)
+        self._buffers: Dict[Tuple[str, str], CandleBuffer] = {}
+        # Agrégat des bougies de base clôturées de l'intervalle en cours
+        self._partial: Dict[Tuple[str, str], Optional[tuple]] = {}
+        # Heure d'ouverture de la dernière bougie de base clôturée agrégée
+        self._last_base: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, interval: str):
+        """Ajoute une unité dérivée (multiple de l'unité de base, alignée sur l'epoch)"""
+        if interval == self.base_interval or interval in self.periods:
+            return
+        period = interval_to_ms(interval)
+        if interval.endswith('w') or period % self.base_ms:
+            raise ValueError(f"{interval} ne peut pas être dérivé de {self.base_interval}")
+        self.periods[interval] = period
+
+    def key(self, symbol: str, interval: str) -> Tuple[str, str]:
+        # Distinct de la clé du KlineCache pour ne pas mélanger les révisions dans l'IndicatorCache
+        return (symbol, f"{interval}@{self.base_interval}")
+
+    def base_window_ms(self, interval: str, bars: int) -> int:
+        """Historique de base (ms) nécessaire pour ``bars`` bougies de ``interval``"""
+        return (bars + 1) * self.periods.get(interval, self.base_ms)
+
+    def _buffer(self, symbol: str, interval: str) -> CandleBuffer:
+        key = (symbol, interval)
+        buffer = self._buffers.get(key)
+        if buffer is None:
+            buffer = self._buffers[key] = CandleBuffer(self.capacity, self.key(symbol, interval))
+        return buffer
+
+    def _rebuild(self, symbol: str, base: CandleView):
+        """Agrège d'un bloc toutes les bougies de base clôturées (premier accès)"""
+        closed = np.flatnonzero(base.closed)
+        count = int(closed[-1]) + 1 if len(closed) else 0
+        open_time = base.open_time[:count]
+
+        for interval, period in self.periods.items():
+            buffer = self._buffer(symbol, interval)
+            buffer.clear()
+            self._partial[(symbol, interval)] = None
+            buckets = open_time - open_time % period
+            # L'intervalle du début de fenêtre est incomplet: on l'ignore
+            first = int(np.searchsorted(buckets, buckets[0] + period)) if count and open_time[0] != buckets[0] else 0
+            if first >= count:
+                continue
+            buckets = buckets[first:]
+            starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+            ends = np.r_[starts[1:], len(buckets)] - 1
+
+            def column(name: str) -> np.ndarray:
+                return base.column(name)[first:count]
+
+            high = np.maximum.reduceat(column('high'), starts)
+            low = np.minimum.reduceat(column('low'), starts)
+            sums = [np.add.reduceat(column(name), starts) for name in
+                    ('volume', 'quote_asset_volume', 'number_of_trades',
+                     'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume')]
+            opens, closes = column('open')[starts], column('close')[ends]
+            close_times = buckets[starts] + period - 1
+            # Seul le dernier intervalle peut être inachevé
+            last_complete = int(column('close_time')[-1]) >= int(close_times[-1])
+
+            for i in range(len(starts)):
+                is_closed = 1 if i < len(starts) - 1 or last_complete else 0
+                buffer.append((int(buckets[starts[i]]), float(opens[i]), float(high[i]), float(low[i]),
+                               float(closes[i]), float(sums[0][i]), int(close_times[i]), float(sums[1][i]),
+                               int(sums[2][i]), float(sums[3][i]), float(sums[4][i]), is_closed))
+            self._partial[(symbol, interval)] = buffer.last()
+
+        if count:
+            self._last_base[symbol] = int(open_time[-1])
+        # La bougie de base en cours éventuelle est ajoutée par le chemin incrémental
+        for index in range(count, len(base)):
+            self._apply(symbol, base.row(index))
+
+    def _apply(self, symbol: str, row: tuple):
+        """Ajoute une bougie de base (clôturée ou en cours) à chaque unité dérivée"""
+        for interval, period in self.periods.items():
+            key = (symbol, interval)
+            buffer = self._buffer(symbol, interval)
+            bucket = row[_OPEN_TIME] - row[_OPEN_TIME] % period
+            partial = self._partial.get(key)
+            if partial is not None and partial[_OPEN_TIME] != bucket:
+                # Nouvel intervalle: le précédent est clos, même si sa dernière bougie manque
+                if not partial[_CLOSED]:
+                    buffer.upsert(partial[:_CLOSED] + (1,))
+                partial = None
+            aggregate = _merge(partial, row, bucket, period)
+            if row[_CLOSED]:
+                self._partial[key] = aggregate
+            elif partial is None:
+                self._partial[key] = None
+            buffer.upsert(aggregate)
+        if row[_CLOSED]:
+            self._last_base[symbol] = row[_OPEN_TIME]
+
+    def update(self, symbol: str, base: CandleView):
+        """Agrège les bougies de base nouvelles ou révisées depuis le dernier appel"""
+        if not len(base):
+            return
+        with self._lock:
+            last = self._last_base.get(symbol)
+            if last is None or last < int(base.open_time[0]):
+                # Premier accès, ou trou plus ancien que la fenêtre de base
+                self._rebuild(symbol, base)
+                return
+            start = int(np.searchsorted(base.open_time, last, side='right'))
+            for index in range(start, len(base)):
+                self._apply(symbol, base.row(index))
+
+    def view(self, symbol: str, interval: str, base: CandleView, start_ms: Optional[int] = None) -> CandleView:
+        """Bougies ``interval`` de ``symbol`` (ouverture >= ``start_ms``), mises à jour depuis ``base``"""
+        if interval == self.base_interval:
+            return base
+        if interval not in self.periods:
+            # Nouvelle unité: reconstruction complète au prochain accès de chaque symbole
+            with self._lock:
+                self.add(interval)
+                self._last_base.clear()
+        self.update(symbol, base)
+        with self._lock:
+            return self._buffer(symbol, interval).view(start_ms)
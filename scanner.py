@@ -0,0 +1,83 @@
+import logging
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+import strategy
+from candle_buffer import CandleView
+from indicators import TechnicalIndicators
+
+logger = logging.getLogger(__name__)
+
+SCAN_FIELDS = ('high', 'low', 'close', 'volume')
+# Bougies conservées au-delà de la fenêtre de calcul (bougie en cours, trous)
+SCAN_SLACK = 10
+
+
+def stack_candles(views: Sequence[CandleView], fields: Sequence[str] = SCAN_FIELDS,
+                  length: Optional[int] = None) -> Dict[str, np.ndarray]:
+    """
+    Empile les colonnes de plusieurs fenêtres en matrices (symboles x bougies)
+    alignées sur la dernière bougie ; les historiques plus courts sont
+    complétés à gauche par des NaN. ``length`` borne le nombre de bougies.
+    """
+    width = max((len(view) for view in views), default=0)
+    if length is not None:
+        width = min(width, length)
+    matrices = {name: np.full((len(views), width), np.nan) for name in fields}
+    for row, view in enumerate(views):
+        count = min(len(view), width)
+        if not count:
+            continue
+        for name in fields:
+            matrices[name][row, width - count:] = view.column(name)[-count:]
+    return matrices
+
+
+class MarketScanner:
+    """
+    Scan d'une liste de paires en une passe : RSI-VWAP et filtre bull market
+    de tous les symboles calculés sur des matrices (symboles x bougies).
+    """
+
+    def __init__(self, length: int = 50, ma_period: int = 200, entry_threshold: float = 10.0):
+        self.length = length
+        self.ma_period = ma_period
+        self.entry_threshold = entry_threshold
+        self.indicators = TechnicalIndicators()
+
+    @property
+    def history(self) -> int:
+        """Bougies à conserver par symbole et par unité pour un scan"""
+        return self.ma_period + self.length + SCAN_SLACK
+
+    def scan(self, views: Dict[str, CandleView], trends: Optional[Dict[str, CandleView]] = None) -> List[Dict]:
+        """
+        Indicateurs de la dernière bougie de chaque symbole, triés par RSI-VWAP
+        croissant (symboles sans historique suffisant en fin de liste).
+        ``trends`` fournit les bougies du filtre de tendance s'il a sa propre unité.
+        """
+        symbols = list(views)
+        if not symbols:
+            return []
+        candles = stack_candles([views[symbol] for symbol in symbols], length=self.ma_period + self.length)
+        rsi_vwap = self.indicators.calculate_rsi_vwap_array(
+            candles['high'], candles['low'], candles['close'], candles['volume'], self.length
+        )[:, -1]
+        if trends is not None:
+            closes = stack_candles([trends[symbol] for symbol in symbols], ('close',), self.ma_period)['close']
+        else:
+            closes = candles['close']
+        bull = self.indicators.bull_market_array(closes, self.ma_period)[:, -1]
+        with np.errstate(invalid='ignore'):
+            signals = strategy.entry_signal(rsi_vwap, bull, self.entry_threshold)
+
+        results = [{
+            'symbol': symbol,
+            'price': float(candles['close'][i, -1]),
+            'rsi_vwap': float(rsi_vwap[i]),
+            'bull_market': bool(bull[i]),
+            'entry_signal': bool(signals[i]),
+        } for i, symbol in enumerate(symbols)]
+        results.sort(key=lambda r: (np.isnan(r['rsi_vwap']), r['rsi_vwap']))
+        return results
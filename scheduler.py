@@ -0,0 +1,101 @@
+import asyncio
+import logging
+import math
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from kline_cache import interval_to_ms
+
+logger = logging.getLogger(__name__)
+
+# Types de réveil
+WAKE_CLOSE = 'close'
+WAKE_INTRA = 'intra'
+
+
+class CandleScheduler:
+    """
+    Planificateur aligné sur les clôtures de bougies (horloge du serveur
+    Binance) pour chaque paire (symbol, timeframe), avec un délai de
+    stabilisation après la clôture et un contrôle intra-bougie optionnel.
+    """
+
+    def __init__(self, settle_delay: float = 2.0, intra_candle_interval: Optional[float] = None,
+                 clock: Callable[[], float] = time.time,
+                 sleep: Callable[[float], Awaitable[None]] = asyncio.sleep):
+        self.settle_delay = settle_delay
+        self.intra_candle_interval = intra_candle_interval
+        self.clock = clock
+        self.sleep = sleep
+        self.clock_offset = 0.0
+        self.jobs: Dict[Tuple[str, str], float] = {}
+        self._fired: Dict[Tuple[str, str], float] = {}
+        self._next_intra: Optional[float] = None
+
+    def add(self, symbol: str, interval: str):
+        """Planifie une paire (symbol, timeframe)"""
+        self.jobs[(symbol, interval)] = interval_to_ms(interval) / 1000
+
+    def remove(self, symbol: str, interval: str):
+        self.jobs.pop((symbol, interval), None)
+        self._fired.pop((symbol, interval), None)
+
+    def sync_clock(self, client):
+        """Aligne l'horloge locale sur l'heure du serveur Binance"""
+        started = self.clock()
+        server_ms = client.get_server_time()['serverTime']
+        # On suppose la réponse émise à mi-parcours de l'aller-retour
+        local = (started + self.clock()) / 2
+        self.clock_offset = server_ms / 1000 - local
+        logger.debug(f"Décalage horloge serveur: {self.clock_offset * 1000:.0f} ms")
+
+    def now(self) -> float:
+        """Heure du serveur (secondes epoch)"""
+        return self.clock() + self.clock_offset
+
+    def _next_close(self, key: Tuple[str, str], now: float) -> float:
+        period = self.jobs[key]
+        boundary = (math.floor((now - self.settle_delay) / period) + 1) * period + self.settle_delay
+        if boundary <= self._fired.get(key, 0):
+            boundary += period
+        return boundary
+
+    def next_due(self) -> Tuple[float, List[Tuple[str, str, str]]]:
+        """Prochaine échéance et les réveils associés"""
+        now = self.now()
+        due_at = math.inf
+        events: List[Tuple[str, str, str]] = []
+
+        for key in self.jobs:
+            at = self._next_close(key, now)
+            if at < due_at - 1e-6:
+                due_at, events = at, [(key[0], key[1], WAKE_CLOSE)]
+            elif abs(at - due_at) <= 1e-6:
+                events.append((key[0], key[1], WAKE_CLOSE))
+
+        if self.intra_candle_interval:
+            if self._next_intra is None:
+                self._next_intra = now + self.intra_candle_interval
+            if self._next_intra < due_at:
+                due_at = self._next_intra
+                events = [(symbol, interval, WAKE_INTRA) for symbol, interval in self.jobs]
+
+        return due_at, events
+
+    async def wait(self) -> List[Tuple[str, str, str]]:
+        """
+        Dort jusqu'à la prochaine échéance et renvoie la liste des réveils
+        ``(symbol, interval, 'close' | 'intra')``.
+        """
+        due_at, events = self.next_due()
+        if not events:
+            return []
+        await self.sleep(max(0.0, due_at - self.now()))
+
+        for symbol, interval, kind in events:
+            if kind == WAKE_CLOSE:
+                self._fired[(symbol, interval)] = due_at
+        if self.intra_candle_interval:
+            # Un contrôle intra-bougie repart de zéro après chaque réveil
+            self._next_intra = self.now() + self.intra_candle_interval
+        return events
@@ -0,0 +1,170 @@
+import itertools
+import logging
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import clock
+
+logger = logging.getLogger(__name__)
+
+# Actifs de cotation reconnus pour découper un symbole (BTCUSDT -> BTC / USDT)
+QUOTE_ASSETS = ('USDT', 'FDUSD', 'USDC', 'BUSD', 'TUSD', 'BTC', 'ETH', 'BNB', 'EUR')
+
+
+class SimulatedOrderError(Exception):
+    """Rejet d'ordre par l'exchange simulé (mêmes codes que Binance)"""
+
+    def __init__(self, code: int, message: str):
+        super().__init__(f"APIError(code={code}): {message}")
+        self.code = code
+        self.message = message
+
+
+def split_symbol(symbol: str):
+    """Sépare un symbole en (base, quote)"""
+    for quote in QUOTE_ASSETS:
+        if symbol.endswith(quote) and len(symbol) > len(quote):
+            return symbol[:-len(quote)], quote
+    raise ValueError(f"Actif de cotation inconnu pour {symbol}")
+
+
+class SimulatedExchange:
+    """
+    Exchange simulé en mémoire pour le mode démo : implémente le sous-ensemble
+    de ``binance.client.Client`` utilisé par le bot (``ping``, ``get_account``,
+    ``get_historical_klines``, ``order_market_buy/sell``).
+
+    Les bougies sont relayées depuis ``market`` (client Binance public pour les
+    prix réels, ``ReplayClient`` pour des prix enregistrés). Les ordres au
+    marché sont remplis au dernier cours vu (rafraîchi s'il date de plus de
+    ``max_price_age`` secondes), dégradé de ``slippage`` ; les frais
+    (``fee_rate``) sont prélevés sur l'actif de cotation, comme avec la
+    réduction BNB. ``latency`` (secondes) retarde chaque ordre.
+    """
+
+    def __init__(self, market, balances: Optional[Dict[str, float]] = None, fee_rate: float = 0.001,
+                 slippage: float = 0.0005, latency: float = 0.0, max_price_age: float = 5.0):
+        self.market = market
+        self.fee_rate = fee_rate
+        self.slippage = slippage
+        self.latency = latency
+        self.max_price_age = max_price_age
+        self.orders: List[Dict] = []
+        # Laisse le RequestScheduler lire les en-têtes des appels de marché réels
+        self.session = getattr(market, 'session', None)
+        self._balances: Dict[str, Dict[str, float]] = {
+            asset: {'free': float(amount), 'locked': 0.0}
+            for asset, amount in (balances or {'USDT': 10000.0}).items()
+        }
+        self._prices: Dict[str, Tuple[float, float]] = {}
+        self._order_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _now_ms() -> int:
+        return int(clock.now() * 1000)
+
+    def _observe(self, symbol: str, klines: List[list]) -> List[list]:
+        if klines:
+            self._prices[symbol] = (float(klines[-1][4]), clock.monotonic())
+        return klines
+
+    # --- Données de marché (relayées) ---
+
+    def get_historical_klines(self, symbol: str, interval: str, start_str=None, end_str=None,
+                              limit: int = 1000, **kwargs) -> List[list]:
+        return self._observe(symbol, self.market.get_historical_klines(symbol, interval, start_str, end_str,
+                                                                       limit=limit, **kwargs))
+
+    def get_klines(self, **params) -> List[list]:
+        return self._observe(params['symbol'], self.market.get_klines(**params))
+
+    def last_price(self, symbol: str) -> float:
+        """Dernier cours vu, ou clôture de la dernière bougie 1m s'il est trop ancien"""
+        seen = self._prices.get(symbol)
+        if seen is None or clock.monotonic() - seen[1] > self.max_price_age:
+            self.get_klines(symbol=symbol, interval='1m', limit=1)
+            seen = self._prices.get(symbol)
+        price = seen[0] if seen else 0.0
+        if not price:
+            raise SimulatedOrderError(-1121, f"Invalid symbol: {symbol}")
+        return price
+
+    def ping(self) -> Dict:
+        return {}
+
+    def get_server_time(self) -> Dict:
+        return {'serverTime': self._now_ms()}
+
+    # --- Compte ---
+
+    def get_account(self, **params) -> Dict:
+        with self._lock:
+            balances = [{'asset': asset, 'free': f"{b['free']:.8f}", 'locked': f"{b['locked']:.8f}"}
+                        for asset, b in sorted(self._balances.items())]
+        return {'canTrade': True, 'accountType': 'SPOT', 'balances': balances, 'updateTime': self._now_ms()}
+
+    def get_asset_balance(self, asset: str, **params) -> Optional[Dict]:
+        with self._lock:
+            balance = self._balances.get(asset)
+            if balance is None:
+                return None
+            return {'asset': asset, 'free': f"{balance['free']:.8f}", 'locked': f"{balance['locked']:.8f}"}
+
+    # --- Ordres ---
+
+    def get_exchange_info(self) -> Dict:
+        return self.market.get_exchange_info()
+
+    def _fill(self, symbol: str, side: str, quantity: float, client_order_id: Optional[str] = None) -> Dict:
+        if quantity <= 0:
+            raise SimulatedOrderError(-1013, "Filter failure: LOT_SIZE")
+        if self.latency:
+            time.sleep(self.latency)
+        base, quote = split_symbol(symbol)
+        price = self.last_price(symbol) * (1 + self.slippage if side == 'BUY' else 1 - self.slippage)
+        notional = price * quantity
+        fee = notional * self.fee_rate
+
+        with self._lock:
+            base_balance = self._balances.setdefault(base, {'free': 0.0, 'locked': 0.0})
+            quote_balance = self._balances.setdefault(quote, {'free': 0.0, 'locked': 0.0})
+            if side == 'BUY':
+                if quote_balance['free'] < notional + fee:
+                    raise SimulatedOrderError(-2010, "Account has insufficient balance for requested action.")
+                quote_balance['free'] -= notional + fee
+                base_balance['free'] += quantity
+            else:
+                if base_balance['free'] < quantity:
+                    raise SimulatedOrderError(-2010, "Account has insufficient balance for requested action.")
+                base_balance['free'] -= quantity
+                quote_balance['free'] += notional - fee
+            order_id = next(self._order_ids)
+
+        order = {
+            'symbol': symbol, 'orderId': order_id, 'clientOrderId': client_order_id or f"sim-{order_id}",
+            'transactTime': self._now_ms(), 'price': '0.00000000',
+            'origQty': f"{quantity:.8f}", 'executedQty': f"{quantity:.8f}",
+            'cummulativeQuoteQty': f"{notional:.8f}", 'status': 'FILLED', 'timeInForce': 'GTC',
+            'type': 'MARKET', 'side': side,
+            'fills': [{'price': f"{price:.8f}", 'qty': f"{quantity:.8f}",
+                       'commission': f"{fee:.8f}", 'commissionAsset': quote}],
+        }
+        self.orders.append(order)
+        logger.debug(f"[SIM] {side} {quantity} {symbol} @ {price:.8f} (frais {fee:.8f} {quote})")
+        return order
+
+    def order_market_buy(self, symbol: str, quantity: float, **params) -> Dict:
+        return self._fill(symbol, 'BUY', float(quantity), params.get('newClientOrderId'))
+
+    def order_market_sell(self, symbol: str, quantity: float, **params) -> Dict:
+        return self._fill(symbol, 'SELL', float(quantity), params.get('newClientOrderId'))
+
+    def get_order(self, symbol: str, origClientOrderId: Optional[str] = None, orderId: Optional[int] = None,
+                  **params) -> Dict:
+        for order in reversed(self.orders):
+            if order['symbol'] == symbol and (order['clientOrderId'] == origClientOrderId
+                                              or order['orderId'] == orderId):
+                return {key: value for key, value in order.items() if key != 'fills'}
+        raise SimulatedOrderError(-2013, "Order does not exist.")
@@ -0,0 +1,199 @@
+import asyncio
+import json
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+import websockets
+
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+StopCallback = Callable[[str, float], Awaitable[bool]]
+
+
+class StopLossMonitor:
+    """
+    Surveillance temps réel des stops via le stream ``bookTicker`` de Binance.
+
+    Chaque message est comparé au stop de la position (meilleur bid <= stop) ;
+    le déclenchement appelle directement ``on_trigger`` sans attendre la
+    boucle de stratégie. La latence déclenchement -> exécution est mesurée.
+    """
+
+    def __init__(self, symbols: List[str], base_url: str, on_trigger: StopCallback,
+                 max_reconnect_delay: float = 30.0, retry_delay: float = 1.0, history: int = 1000):
+        self.symbols = symbols
+        self.base_url = base_url.rstrip("/")
+        self.on_trigger = on_trigger
+        self.max_reconnect_delay = max_reconnect_delay
+        self.retry_delay = retry_delay
+        self.stops: Dict[str, float] = {}
+        self.best_bids: Dict[str, float] = {}
+        self.latencies: Deque[float] = deque(maxlen=history)
+        self.is_running = False
+        self.connected = asyncio.Event()
+        self._triggered: Set[str] = set()
+        self._retry_at: Dict[str, float] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self._ws = None
+
+    @property
+    def url(self) -> str:
+        streams = "/".join(f"{symbol.lower()}@bookTicker" for symbol in self.symbols)
+        return f"{self.base_url}/stream?streams={streams}"
+
+    def arm(self, symbol: str, stop_price: float):
+        """Active (ou déplace) le stop d'une position"""
+        self.stops[symbol] = stop_price
+        self._triggered.discard(symbol)
+        self._retry_at.pop(symbol, None)
+        logger.info(f"{symbol}: stop-loss armé à {stop_price:.8f}")
+
+    def disarm(self, symbol: str):
+        self.stops.pop(symbol, None)
+        self._triggered.discard(symbol)
+        self._retry_at.pop(symbol, None)
+
+    def check(self, symbol: str, price: float) -> bool:
+        """
+        Compare un prix au stop ; lance la sortie si le stop est franchi.
+        Utilisé par le stream et, en secours, par la boucle de stratégie.
+        """
+        stop = self.stops.get(symbol)
+        if stop is None or price > stop or symbol in self._triggered:
+            return False
+        now = time.perf_counter()
+        if now < self._retry_at.get(symbol, 0.0):
+            return False
+        self._triggered.add(symbol)
+        task = asyncio.get_running_loop().create_task(self._execute(symbol, price, now))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return True
+
+    async def _execute(self, symbol: str, price: float, triggered_at: float):
+        logger.warning(f"{symbol}: stop-loss déclenché (bid {price:.8f} <= stop {self.stops.get(symbol, 0):.8f})")
+        try:
+            filled = await self.on_trigger(symbol, price)
+        except Exception as e:
+            filled = False
+            logger.error(f"{symbol}: erreur de sortie sur stop-loss: {e}")
+        latency = time.perf_counter() - triggered_at
+        if filled:
+            self.latencies.append(latency)
+            metrics.observe('latency.stop_trigger_to_fill', latency)
+            self.disarm(symbol)
+            logger.info(f"{symbol}: sortie sur stop-loss exécutée en {latency * 1000:.1f} ms")
+        else:
+            # Nouvelle tentative au premier prix sous le stop après ``retry_delay``
+            self._retry_at[symbol] = time.perf_counter() + self.retry_delay
+            self._triggered.discard(symbol)
+
+    def latency_stats(self) -> Optional[Dict[str, float]]:
+        """Latences déclenchement -> exécution (ms) des dernières sorties sur stop"""
+        if not self.latencies:
+            return None
+        values = sorted(self.latencies)
+        return {
+            'count': len(values),
+            'p50_ms': values[len(values) // 2] * 1000,
+            'p99_ms': values[min(len(values) - 1, int(len(values) * 0.99))] * 1000,
+            'max_ms': values[-1] * 1000,
+        }
+
+    async def handle_message(self, message: str):
+        """Compare le meilleur bid au stop (rien à décoder si aucun stop n'est armé)"""
+        if not self.stops:
+            return
+        payload = json.loads(message)
+        event = payload.get('data', payload)
+        symbol = event.get('s')
+        if symbol is None or 'b' not in event:
+            return
+        bid = float(event['b'])
+        self.best_bids[symbol] = bid
+        self.check(symbol, bid)
+
+    async def run(self):
+        """Boucle de connexion avec reconnexion exponentielle"""
+        self.is_running = True
+        delay = 1.0
+
+        while self.is_running:
+            try:
+                async with websockets.connect(self.url, ping_interval=20) as ws:
+                    self._ws = ws
+                    self.connected.set()
+                    delay = 1.0
+                    logger.info(f"Stream bookTicker connecté: {self.url}")
+                    async for message in ws:
+                        await self.handle_message(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Stream bookTicker interrompu: {e}")
+            finally:
+                self._ws = None
+                self.connected.clear()
+
+            if self.is_running:
+                logger.info(f"Reconnexion du stream bookTicker dans {delay:.0f}s")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def stop(self):
+        """Arrête le stream (les sorties en cours vont à leur terme)"""
+        self.is_running = False
+        if self._ws is not None:
+            await self._ws.close()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+class LocalBookTickerServer:
+    """
+    Serveur websocket local imitant le stream ``bookTicker`` combiné de
+    Binance, pour tester les stops hors ligne.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self.clients: Set = set()
+        self._server = None
+        self._update_id = 0
+
+    @property
+    def url(self) -> str:
+        return f"ws://{self.host}:{self.port}"
+
+    async def _handler(self, websocket, path: str = ""):
+        self.clients.add(websocket)
+        try:
+            await websocket.wait_closed()
+        finally:
+            self.clients.discard(websocket)
+
+    async def start(self) -> 'LocalBookTickerServer':
+        self._server = await websockets.serve(self._handler, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def push(self, symbol: str, bid: float, ask: float, bid_qty: float = 1.0, ask_qty: float = 1.0):
+        """Diffuse un meilleur bid/ask à tous les clients connectés"""
+        self._update_id += 1
+        message = json.dumps({
+            'stream': f"{symbol.lower()}@bookTicker",
+            'data': {'u': self._update_id, 's': symbol, 'b': str(bid), 'B': str(bid_qty),
+                     'a': str(ask), 'A': str(ask_qty)}
+        })
+        for websocket in list(self.clients):
+            await websocket.send(message)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
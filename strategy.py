@@ -0,0 +1,32 @@
+# Règles de la stratégie RSI-VWAP, partagées entre le bot live et le backtest.
+# Les fonctions de signal acceptent des scalaires comme des tableaux NumPy.
+
+# Solde minimum (USDT) pour ouvrir une position
+MIN_BALANCE = 10
+
+
+def entry_signal(rsi_vwap, bull, entry_threshold: float):
+    """Entrée: bull market (prix > MA200) et RSI-VWAP < seuil d'entrée"""
+    return bull & (rsi_vwap < entry_threshold)
+
+
+def exit_signal(rsi_vwap, exit_threshold: float):
+    """Sortie: RSI-VWAP > seuil de sortie"""
+    return rsi_vwap > exit_threshold
+
+
+def stop_loss_price(entry_price: float, stop_loss_pct: float) -> float:
+    """Prix du stop-loss d'une position longue"""
+    return entry_price * (1 - stop_loss_pct / 100)
+
+
+def position_size(entry_price: float, balance: float, risk_per_trade: float, stop_loss_pct: float) -> float:
+    """Calcule la taille de position basée sur le risk management"""
+    risk_amount = balance * (risk_per_trade / 100)
+    risk_per_unit = entry_price - stop_loss_price(entry_price, stop_loss_pct)
+
+    if risk_per_unit > 0:
+        position_size = risk_amount / risk_per_unit
+        return round(position_size, 6)
+
+    return 0
@@ -0,0 +1,38 @@
+import numpy as np
+
+from backtest import simulate
+
+
+def scenario():
+    """Entrée sur la bougie 1, plus bas à -3 % sur la bougie 3, signal de sortie sur la bougie 5"""
+    close = np.array([100.0, 100.0, 99.0, 98.0, 99.0, 104.0, 104.0])
+    low = close - 0.5
+    low[3] = 97.0
+    rsi = np.array([50.0, 5.0, 40.0, 40.0, 40.0, 96.0, 50.0])
+    bull = np.ones(len(close), dtype=bool)
+    open_times = np.arange(len(close), dtype=np.int64) * 60_000
+    return open_times, close, rsi, bull, low
+
+
+def test_stop_exits_at_stop_price_before_signal_exit():
+    open_times, close, rsi, bull, low = scenario()
+    result = simulate(open_times, close, rsi, bull, 10.0, 95.0, 2.0, 2.0, low=low)
+    trade = result.trades[0]
+    assert trade['exit_price'] == 98.0
+    assert trade['exit_time'] == result.trades[0]['entry_time'].replace(minute=3)
+    assert result.stats['losing_trades'] == 1
+
+
+def test_stop_not_reached_keeps_signal_exit():
+    open_times, close, rsi, bull, low = scenario()
+    result = simulate(open_times, close, rsi, bull, 10.0, 95.0, 2.0, 5.0, low=low)
+    assert result.trades[0]['exit_price'] == 104.0
+
+
+def test_stop_pct_changes_results_even_at_the_spot_cap():
+    open_times, close, rsi, bull, low = scenario()
+    tight = simulate(open_times, close, rsi, bull, 10.0, 95.0, 2.0, 1.0, low=low)
+    wide = simulate(open_times, close, rsi, bull, 10.0, 95.0, 2.0, 2.0, low=low)
+    # Les deux tailles sont plafonnées au solde : seul le prix de sortie diffère
+    assert tight.trades[0]['quantity'] == wide.trades[0]['quantity']
+    assert tight.stats['final_equity'] > wide.stats['final_equity']
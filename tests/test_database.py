@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from database import Database
+
+
+@pytest.fixture
+def database(tmp_path):
+    db = Database(str(tmp_path / "trading_bot.db"))
+    yield db
+    db.close()
+
+
+def add_snapshots(db: Database, now: datetime, minutes: int, step: timedelta = timedelta(minutes=1)):
+    conn = db._connection()
+    for i in range(minutes):
+        equity = 1000.0 + i
+        db._insert_capital_snapshot(conn.cursor(), now - step * (minutes - i), equity, equity, 0.0)
+    conn.commit()
+
+
+def test_equity_curve_returns_most_recent_raw_points(database):
+    now = datetime.now()
+    add_snapshots(database, now, 100, timedelta(seconds=10))
+    curve = database.get_equity_curve(now - timedelta(minutes=5), max_points=6)
+    assert [p['equity'] for p in curve] == [1094.0, 1095.0, 1096.0, 1097.0, 1098.0, 1099.0]
+
+
+def test_equity_curve_includes_snapshots_not_yet_compacted(database):
+    now = datetime.now()
+    add_snapshots(database, now, 180)
+    before = database.get_equity_curve(now - timedelta(hours=24))
+    assert before and before[-1]['equity'] == 1179.0
+
+    database.compact_capital_history(now - timedelta(minutes=60))
+    after = database.get_equity_curve(now - timedelta(hours=24))
+    assert [(p['timestamp'], p['open'], p['equity']) for p in after] == \
+        [(p['timestamp'], p['open'], p['equity']) for p in before]
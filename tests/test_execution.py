@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+import async_io
+from execution import ExecutionEngine, OrderRejected
+from sim_exchange import SimulatedExchange, SimulatedOrderError
+
+LOT_SIZE_INFO = {
+    'symbol': 'BTCUSDT', 'baseAsset': 'BTC', 'quoteAsset': 'USDT',
+    'filters': [
+        {'filterType': 'LOT_SIZE', 'minQty': '0.00100000', 'maxQty': '5.00000000', 'stepSize': '0.00100000'},
+        {'filterType': 'NOTIONAL', 'minNotional': '5.00000000'},
+    ],
+}
+
+
+@pytest.fixture(autouse=True)
+def inline_io():
+    # Appels exécutés dans la boucle: pas de pool de threads entre le test et l'exchange
+    async_io.set_inline(True)
+    yield
+    async_io.set_inline(False)
+
+
+class FakeMarket:
+    def get_klines(self, **params):
+        return [[0, '100', '100', '100', '100', '1', 59_999, '100', 1, '0', '0', '0']]
+
+
+class FlakyExchange(SimulatedExchange):
+    """Premiers envois en erreur -1007 (statut inconnu), exécutés ou non selon ``filled``"""
+
+    def __init__(self, failures: int = 1, filled: bool = True):
+        super().__init__(FakeMarket(), balances={'USDT': 10000.0}, fee_rate=0.0, slippage=0.0)
+        self.failures = failures
+        self.filled = filled
+        self.sent = []
+        self.lookups = []
+
+    def get_exchange_info(self):
+        return {'symbols': [LOT_SIZE_INFO]}
+
+    def order_market_buy(self, symbol, quantity, **params):
+        self.sent.append((quantity, params['newClientOrderId']))
+        failing = len(self.sent) <= self.failures
+        if failing and not self.filled:
+            raise SimulatedOrderError(-1007, "Timeout waiting for response from backend server.")
+        order = super().order_market_buy(symbol, quantity, **params)
+        if failing:
+            raise SimulatedOrderError(-1007, "Timeout waiting for response from backend server.")
+        return order
+
+    def get_order(self, symbol, origClientOrderId=None, orderId=None, **params):
+        self.lookups.append(origClientOrderId)
+        return super().get_order(symbol, origClientOrderId, orderId, **params)
+
+
+def make_engine(exchange) -> ExecutionEngine:
+    engine = ExecutionEngine(exchange, retry_delay=0.0)
+    engine.load_filters(['BTCUSDT'])
+    return engine
+
+
+def test_unknown_status_order_is_found_by_client_id_instead_of_resent():
+    exchange = FlakyExchange()
+    fill = asyncio.run(make_engine(exchange).submit('BTCUSDT', 'BUY', 0.5, 100.0))
+
+    client_order_id = exchange.sent[0][1]
+    assert len(exchange.sent) == 1
+    assert exchange.lookups == [client_order_id]
+    assert len(exchange.orders) == 1
+    assert fill.client_order_id == client_order_id
+    assert fill.executed_qty == 0.5
+    assert fill.avg_price == 100.0
+
+
+def test_order_missing_after_error_is_resent_with_same_client_id():
+    exchange = FlakyExchange(filled=False)
+    fill = asyncio.run(make_engine(exchange).submit('BTCUSDT', 'BUY', 0.5, 100.0))
+
+    assert len(exchange.sent) == 2
+    assert exchange.sent[0][1] == exchange.sent[1][1] == exchange.lookups[0]
+    assert len(exchange.orders) == 1
+    assert fill.attempts == 2
+
+
+def test_quantity_is_rounded_down_to_lot_size_step():
+    exchange = FlakyExchange(failures=0)
+    engine = make_engine(exchange)
+    fill = asyncio.run(engine.submit('BTCUSDT', 'BUY', 0.123456789, 100.0))
+
+    assert exchange.sent[-1][0] == '0.123'
+    assert fill.executed_qty == 0.123
+    # Pas de 0.299999… pour une quantité décimale exacte, plafond au maxQty
+    assert engine.prepare('BTCUSDT', 'BUY', 0.3, 100.0)[0] == '0.3'
+    assert engine.prepare('BTCUSDT', 'BUY', 7.0, 100.0)[0] == '5'
+
+
+def test_quantity_below_lot_size_minimum_is_rejected_before_sending():
+    exchange = FlakyExchange()
+    engine = make_engine(exchange)
+    with pytest.raises(OrderRejected):
+        asyncio.run(engine.submit('BTCUSDT', 'BUY', 0.0009, 100.0))
+    with pytest.raises(OrderRejected):
+        asyncio.run(engine.submit('BTCUSDT', 'BUY', 0.01, 100.0))  # notionnel 1 < 5
+    assert exchange.sent == []
@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+
+from candle_buffer import CandleBuffer
+from indicators import StreamingRSIVWAP, TechnicalIndicators
+
+LENGTH = 14
+
+
+def make_candles(count: int, seed: int = 0, nan_closes=()) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, count))
+    close[list(nan_closes)] = np.nan
+    return pd.DataFrame({
+        'high': close + rng.uniform(0, 1, count),
+        'low': close - rng.uniform(0, 1, count),
+        'close': close,
+        'volume': rng.uniform(1, 100, count),
+    })
+
+
+def row(open_time: int, candle) -> tuple:
+    return (open_time, candle.close, candle.high, candle.low, candle.close, candle.volume,
+            open_time + 59_999, 0.0, 0, 0.0, 0.0, 1)
+
+
+def expected(df: pd.DataFrame) -> np.ndarray:
+    return TechnicalIndicators.calculate_rsi_vwap(df, LENGTH).to_numpy()
+
+
+def test_streaming_matches_dataframe_with_nan_closes():
+    df = make_candles(300, nan_closes=(40, 41, 150))
+    stream = StreamingRSIVWAP(LENGTH)
+    values = [stream.update(i, c.high, c.low, c.close, c.volume) for i, c in enumerate(df.itertuples())]
+    np.testing.assert_array_equal(values, expected(df))
+
+
+def test_streaming_revisions_match_final_candles():
+    df = make_candles(200, seed=1)
+    revisions = make_candles(200, seed=2)
+    stream = StreamingRSIVWAP(LENGTH)
+    values = []
+    for i, (draft, final) in enumerate(zip(revisions.itertuples(), df.itertuples())):
+        # Bougie en cours révisée avant sa valeur finale
+        stream.update(i, draft.high, draft.low, draft.close, draft.volume)
+        values.append(stream.update(i, final.high, final.low, final.close, final.volume))
+    np.testing.assert_array_equal(values, expected(df))
+
+
+def test_sync_follows_buffer_updates():
+    df = make_candles(400, seed=3, nan_closes=(120,))
+    drafts = make_candles(400, seed=4)
+    buffer = CandleBuffer(100, ('TEST', '1m'))
+    stream = StreamingRSIVWAP(LENGTH)
+    for i, (draft, final) in enumerate(zip(drafts.itertuples(), df.itertuples())):
+        buffer.upsert(row(i * 60_000, draft))
+        stream.sync(buffer.view())
+        buffer.upsert(row(i * 60_000, final))
+        value = stream.sync(buffer.view())
+        np.testing.assert_array_equal(value, expected(df.iloc[:i + 1])[-1])
+
+
+def test_sync_resets_when_previous_candle_is_revised():
+    df = make_candles(120, seed=5)
+    buffer = CandleBuffer(200, ('TEST', '1m'))
+    buffer.extend(row(i * 60_000, c) for i, c in enumerate(df.itertuples()))
+    stream = StreamingRSIVWAP(LENGTH)
+    stream.sync(buffer.view())
+
+    # Bougie déjà clôturée corrigée, puis nouvelle bougie
+    df.loc[118, 'close'] += 5
+    rows = buffer.rows()
+    rows[118] = row(118 * 60_000, df.iloc[118])
+    buffer.clear()
+    buffer.extend(rows)
+    extra = make_candles(1, seed=6)
+    df = pd.concat([df, extra], ignore_index=True)
+    buffer.upsert(row(120 * 60_000, extra.iloc[0]))
+    np.testing.assert_array_equal(stream.sync(buffer.view()), expected(df)[-1])
@@ -0,0 +1,87 @@
+import threading
+
+import pytest
+
+import clock
+from kline_cache import KlineCache
+
+MINUTE = 60_000
+
+
+@pytest.fixture(autouse=True)
+def virtual_clock():
+    # 10 min 1 s après l'epoch : la bougie 9 est échue à l'heure locale
+    previous = clock.get_clock()
+    clock.set_clock(clock.VirtualClock(10 * 60 + 1))
+    yield
+    clock.set_clock(previous)
+
+
+class FakeClient:
+    """Bougies 1m publiées jusqu'à ``published`` (exclue) : la dernière peut ne pas être finalisée"""
+
+    def __init__(self):
+        self.published = 0
+        self.calls = 0
+
+    def kline(self, open_time: int) -> list:
+        return [open_time, '1', '2', '0.5', '1.5', '10', open_time + MINUTE - 1, '15', 3, '5', '7.5', '0']
+
+    def get_historical_klines(self, symbol, interval, start_str=None, end_str=None, **kwargs):
+        self.calls += 1
+        start = int(start_str or 0)
+        return [self.kline(t) for t in range(start - start % MINUTE, self.published, MINUTE)]
+
+
+def make_cache(tmp_path) -> KlineCache:
+    return KlineCache(str(tmp_path / "klines.db"), ttl=30.0)
+
+
+def test_last_candle_stays_open_until_next_one_is_returned(tmp_path):
+    cache = make_cache(tmp_path)
+    client = FakeClient()
+    # Bougie 9 échue à l'heure locale mais la bougie 10 n'est pas encore publiée
+    client.published = 10 * MINUTE
+    view = cache.get_klines(client, "BTCUSDT", "1m", 0)
+    assert view.last_closed_open_time() == 8 * MINUTE
+
+    client.published = 11 * MINUTE
+    view = cache.get_klines(client, "BTCUSDT", "1m", 0, force=True)
+    assert view.last_closed_open_time() == 9 * MINUTE
+    assert not view.closed[-1]
+
+
+def test_force_bypasses_fresh_cache(tmp_path):
+    cache = make_cache(tmp_path)
+    client = FakeClient()
+    client.published = 11 * MINUTE
+    cache.get_klines(client, "BTCUSDT", "1m", 0)
+    cache.get_klines(client, "BTCUSDT", "1m", 0)
+    assert client.calls == 1
+    cache.get_klines(client, "BTCUSDT", "1m", 0, force=True)
+    assert client.calls == 2
+
+
+def test_memory_only_cache_creates_no_database(tmp_path):
+    cache = KlineCache(str(tmp_path / "klines.db"), persist=False)
+    client = FakeClient()
+    client.published = 3 * MINUTE
+    assert len(cache.get_klines(client, "BTCUSDT", "1m", 0)) == 3
+    assert not (tmp_path / "klines.db").exists()
+
+
+def test_in_memory_update_does_not_wait_for_sqlite_writes(tmp_path):
+    cache = make_cache(tmp_path)
+    client = FakeClient()
+    client.published = 3 * MINUTE
+    cache.get_klines(client, "BTCUSDT", "1m", 0)
+
+    done = threading.Event()
+    # Une écriture SQLite en cours (thread d'E/S) tient _db_lock
+    with cache._db_lock:
+        worker = threading.Thread(target=lambda: (
+            cache.upsert("BTCUSDT", "1m", [client.kline(3 * MINUTE)], closed=False, persist=False), done.set()))
+        worker.start()
+        assert done.wait(1.0)
+    worker.join()
+    assert cache.get_klines(client, "BTCUSDT", "1m", 0).open_time[-1] == 3 * MINUTE
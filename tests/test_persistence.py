@@ -0,0 +1,85 @@
+import sqlite3
+
+import pytest
+
+from persistence import WriteBehindQueue
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "bot.db")
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("CREATE TABLE trades (id INTEGER PRIMARY KEY, pnl REAL NOT NULL)")
+    conn.commit()
+    conn.close()
+    return path
+
+
+def count(path: str) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def insert(pnl):
+    return lambda cursor: cursor.execute("INSERT INTO trades (pnl) VALUES (?)", (pnl,)).lastrowid
+
+
+def make_queue(path: str, statements=None, **kwargs) -> WriteBehindQueue:
+    def connect():
+        conn = sqlite3.connect(path, check_same_thread=False)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if statements is not None:
+            conn.set_trace_callback(statements.append)
+        return conn
+    return WriteBehindQueue(connect, **kwargs)
+
+
+def test_close_flushes_pending_writes(db_path):
+    queue = make_queue(db_path, max_delay=60.0)
+    for pnl in range(10):
+        queue.submit(insert(pnl))
+    assert count(db_path) == 0
+    queue.close()
+    assert count(db_path) == 10
+    with pytest.raises(RuntimeError):
+        queue.submit(insert(0))
+
+
+def test_durable_ack_is_sent_after_commit(db_path):
+    queue = make_queue(db_path)
+    visible = []
+    queue.submit(insert(1.0))
+    future = queue.submit(insert(2.0), durable=True)
+    # Le callback s'exécute dès l'acquittement: le lot doit déjà être lisible ailleurs
+    future.add_done_callback(lambda _: visible.append(count(db_path)))
+    assert future.result(timeout=5) == 2
+    queue.close()
+    assert visible == [2]
+
+
+def test_only_durable_batches_are_committed_with_full_sync(db_path):
+    statements = []
+    queue = make_queue(db_path, statements)
+    queue.submit(insert(1.0))
+    assert queue.flush(timeout=5)
+    assert "PRAGMA synchronous=FULL" not in statements
+
+    queue.submit(insert(2.0), durable=True).result(timeout=5)
+    queue.close()
+    full = statements.index("PRAGMA synchronous=FULL")
+    assert statements.index("COMMIT", full) < statements.index("PRAGMA synchronous=1", full)
+
+
+def test_failed_operation_does_not_drop_the_rest_of_the_batch(db_path):
+    queue = make_queue(db_path, max_delay=60.0)
+    ok = queue.submit(insert(1.0), durable=True)
+    failed = queue.submit(insert(None), durable=True)
+    queue.close()
+    assert ok.result(timeout=5) == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        failed.result(timeout=5)
+    assert count(db_path) == 1
@@ -0,0 +1,90 @@
+import threading
+import time
+
+from request_scheduler import RequestScheduler
+
+NOW = 1_700_000_000.0
+MINUTE_MS = 60_000
+
+
+def make_scheduler(**kwargs) -> RequestScheduler:
+    return RequestScheduler(clock=lambda: NOW, **kwargs)
+
+
+def test_historical_klines_weight_counts_pages():
+    scheduler = make_scheduler()
+    start = int(NOW * 1000) - 5000 * MINUTE_MS
+    scheduler.call('get_historical_klines', lambda *args: [], 'BTCUSDT', '1m', start)
+    assert scheduler.usage()['used_weight'] == 5 * 2
+
+
+def test_historical_klines_weight_is_capped_to_budget():
+    scheduler = make_scheduler(weight_limit=100)
+    start = int(NOW * 1000) - 365 * 1440 * MINUTE_MS
+    assert scheduler.estimate_weight('get_historical_klines', ('BTCUSDT', '1m', start), {}) == 90
+
+
+def test_unhashable_kwargs_are_not_coalesced():
+    scheduler = make_scheduler()
+    assert scheduler.call('get_tickers', lambda symbols: len(symbols), symbols=['BTCUSDT', 'ETHUSDT']) == 2
+    assert scheduler.coalesced == 0
+
+
+def wait_until(predicate, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "délai dépassé"
+        time.sleep(0.001)
+
+
+def test_identical_reads_in_flight_are_coalesced():
+    scheduler = make_scheduler()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def fetch(symbol):
+        calls.append(symbol)
+        started.set()
+        release.wait(5)
+        return {'symbol': symbol, 'price': '100'}
+
+    results = []
+    first = threading.Thread(target=lambda: results.append(scheduler.call('get_symbol_ticker', fetch, 'BTCUSDT')))
+    second = threading.Thread(target=lambda: results.append(scheduler.call('get_symbol_ticker', fetch, 'BTCUSDT')))
+    first.start()
+    started.wait(5)
+    second.start()
+    wait_until(lambda: scheduler.coalesced == 1)
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert calls == ['BTCUSDT']
+    assert results[0] is results[1]
+    assert scheduler.usage()['used_weight'] == 2
+    # Terminé: l'appel suivant repart vers l'exchange
+    scheduler.call('get_symbol_ticker', fetch, 'BTCUSDT')
+    assert len(calls) == 2
+
+
+def test_reads_wait_for_next_minute_and_orders_use_the_reserve():
+    # Fin de minute: l'attente réelle entre deux vérifications est courte
+    now = [NOW - NOW % 60 + 59.95]
+    scheduler = RequestScheduler(weight_limit=10, order_reserve=0.1, clock=lambda: now[0])
+    for _ in range(4):
+        scheduler.acquire('get_klines')
+    assert scheduler.usage()['used_weight'] == 8
+
+    waiting = threading.Thread(target=scheduler.acquire, args=('get_klines',))
+    waiting.start()
+    wait_until(lambda: scheduler.throttled == 1)
+    # 8 + 1 <= 10: l'ordre passe dans la réserve pendant que la lecture attend
+    scheduler.acquire('order_market_buy')
+    assert waiting.is_alive()
+
+    now[0] += 1
+    waiting.join(5)
+    assert not waiting.is_alive()
+    usage = scheduler.usage()
+    assert usage['used_weight'] == 2
+    assert usage['calls'] == {'get_klines': 5, 'order_market_buy': 1}
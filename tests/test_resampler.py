@@ -0,0 +1,79 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from candle_buffer import CandleBuffer
+from kline_cache import interval_to_ms
+from resampler import Resampler
+
+MINUTE = 60_000
+# Fenêtre commençant au milieu d'une heure: le premier intervalle, incomplet, est ignoré
+START = 1_700_000_000_000 - 1_700_000_000_000 % (60 * MINUTE) + 17 * MINUTE
+
+
+def make_rows(count: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(0, 1, count))
+    open_ = np.r_[100.0, close[:-1]]
+    high = np.maximum(open_, close) + rng.uniform(0, 1, count)
+    low = np.minimum(open_, close) - rng.uniform(0, 1, count)
+    # Volumes entiers: les sommes sont exactes quel que soit l'ordre d'addition
+    volume = rng.integers(1, 1000, count).astype(float)
+    return [(START + i * MINUTE, open_[i], high[i], low[i], close[i], volume[i], START + (i + 1) * MINUTE - 1,
+             volume[i] * close[i].round(), int(volume[i]) // 10, volume[i] // 2, 0.0, 1)
+            for i in range(count)]
+
+
+def expected(rows: list, interval: str) -> pd.DataFrame:
+    frame = pd.DataFrame([row[:6] for row in rows], columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    frame.index = pd.to_datetime(frame['timestamp'], unit='ms')
+    period = interval_to_ms(interval)
+    resampled = frame.resample(pd.Timedelta(milliseconds=period)).agg(
+        {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'})
+    return resampled.iloc[1:] if START % period else resampled
+
+
+def assert_matches_pandas(view, rows: list, interval: str):
+    reference = expected(rows, interval)
+    np.testing.assert_array_equal(view.open_time, (reference.index - pd.Timestamp(0)) // pd.Timedelta(milliseconds=1))
+    for name in ('open', 'high', 'low', 'close', 'volume'):
+        np.testing.assert_array_equal(view.column(name), reference[name].to_numpy(), err_msg=name)
+
+
+@pytest.mark.parametrize('interval', ['5m', '15m', '1h'])
+def test_rebuild_matches_pandas_resample(interval):
+    rows = make_rows(1000)
+    base = CandleBuffer(2000, ('BTCUSDT', '1m'))
+    base.extend(rows)
+    resampler = Resampler(intervals=('5m', '15m', '1h'))
+    assert_matches_pandas(resampler.view('BTCUSDT', interval, base.view()), rows, interval)
+
+
+def test_incremental_updates_match_pandas_resample():
+    rows = make_rows(1000, seed=1)
+    drafts = make_rows(1000, seed=2)
+    base = CandleBuffer(2000, ('BTCUSDT', '1m'))
+    base.extend(rows[:300])
+    resampler = Resampler(intervals=('5m', '1h'))
+    resampler.update('BTCUSDT', base.view())
+    for draft, row in zip(drafts[300:], rows[300:]):
+        # Bougie en cours révisée puis clôturée
+        base.upsert((row[0],) + draft[1:11] + (0,))
+        resampler.update('BTCUSDT', base.view())
+        base.upsert(row)
+        resampler.update('BTCUSDT', base.view())
+
+    for interval in ('5m', '1h'):
+        view = resampler.view('BTCUSDT', interval, base.view())
+        assert_matches_pandas(view, rows, interval)
+        # Seul le dernier intervalle peut rester ouvert
+        assert view.closed[:-1].all()
+
+
+def test_last_interval_stays_open_until_its_last_base_candle_closes():
+    rows = make_rows(60 - 17 + 30)
+    base = CandleBuffer(200, ('BTCUSDT', '1m'))
+    base.extend(rows)
+    resampler = Resampler(intervals=('1h',))
+    view = resampler.view('BTCUSDT', '1h', base.view())
+    assert len(view) == 1 and not view.closed[-1]
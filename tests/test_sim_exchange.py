@@ -0,0 +1,74 @@
+import pytest
+
+from sim_exchange import SimulatedExchange, SimulatedOrderError
+
+
+class FakeMarket:
+    """Bougie 1m unique au cours ``price``"""
+
+    def __init__(self, price: float):
+        self.price = price
+
+    def get_klines(self, **params):
+        price = str(self.price)
+        return [[0, price, price, price, price, '1', 59_999, price, 1, '0', '0', '0']]
+
+
+def make_exchange(**kwargs) -> SimulatedExchange:
+    return SimulatedExchange(FakeMarket(100.0), balances={'USDT': 1000.0}, **kwargs)
+
+
+def balance(exchange: SimulatedExchange, asset: str) -> float:
+    return float(exchange.get_asset_balance(asset)['free'])
+
+
+def test_market_buy_fills_at_slipped_price_with_quote_fee():
+    exchange = make_exchange(fee_rate=0.001, slippage=0.01)
+    order = exchange.order_market_buy(symbol='BTCUSDT', quantity=2, newClientOrderId='abc')
+
+    fill = order['fills'][0]
+    assert order['status'] == 'FILLED'
+    assert order['clientOrderId'] == 'abc'
+    assert float(fill['price']) == pytest.approx(101.0)
+    assert float(fill['commission']) == pytest.approx(0.202)
+    assert fill['commissionAsset'] == 'USDT'
+    assert balance(exchange, 'BTC') == pytest.approx(2.0)
+    assert balance(exchange, 'USDT') == pytest.approx(1000 - 202 - 0.202)
+
+
+def test_market_sell_credits_quote_net_of_fee():
+    exchange = make_exchange(fee_rate=0.001, slippage=0.01)
+    exchange.order_market_buy(symbol='BTCUSDT', quantity=2)
+    exchange.order_market_sell(symbol='BTCUSDT', quantity=2)
+
+    assert balance(exchange, 'BTC') == pytest.approx(0.0)
+    assert balance(exchange, 'USDT') == pytest.approx(1000 - 202.202 + 198 - 0.198)
+
+
+def test_rejects_like_binance():
+    exchange = make_exchange()
+    with pytest.raises(SimulatedOrderError) as error:
+        exchange.order_market_buy(symbol='BTCUSDT', quantity=100)
+    assert error.value.code == -2010
+    with pytest.raises(SimulatedOrderError) as error:
+        exchange.order_market_sell(symbol='BTCUSDT', quantity=1)
+    assert error.value.code == -2010
+    with pytest.raises(SimulatedOrderError) as error:
+        exchange.order_market_buy(symbol='BTCUSDT', quantity=0)
+    assert error.value.code == -1013
+    # Aucun ordre rejeté n'a modifié le solde
+    assert balance(exchange, 'USDT') == 1000.0
+    assert exchange.orders == []
+
+
+def test_get_order_finds_order_by_client_id():
+    exchange = make_exchange()
+    order = exchange.order_market_buy(symbol='BTCUSDT', quantity=1, newClientOrderId='abc')
+
+    found = exchange.get_order(symbol='BTCUSDT', origClientOrderId='abc')
+    assert found['orderId'] == order['orderId']
+    assert found['executedQty'] == order['executedQty']
+    assert 'fills' not in found
+    with pytest.raises(SimulatedOrderError) as error:
+        exchange.get_order(symbol='BTCUSDT', origClientOrderId='unknown')
+    assert error.value.code == -2013
@@ -0,0 +1,66 @@
+import asyncio
+
+from stop_loss import LocalBookTickerServer, StopLossMonitor
+
+
+async def wait_for(predicate, timeout: float = 5.0):
+    async def poll():
+        while not predicate():
+            await asyncio.sleep(0.001)
+    await asyncio.wait_for(poll(), timeout)
+
+
+async def run_monitor(scenario, results, retry_delay: float = 1.0):
+    """Monitor connecté à un serveur bookTicker local, arrêté après ``scenario``"""
+    server = await LocalBookTickerServer().start()
+    exits = []
+
+    async def on_trigger(symbol, price):
+        exits.append((symbol, price))
+        return results[len(exits) - 1]
+
+    monitor = StopLossMonitor(['BTCUSDT'], server.url, on_trigger, retry_delay=retry_delay)
+    task = asyncio.create_task(monitor.run())
+    try:
+        await asyncio.wait_for(monitor.connected.wait(), 5)
+        await wait_for(lambda: server.clients)
+        await scenario(server, monitor, exits)
+    finally:
+        await monitor.stop()
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        await server.stop()
+    return monitor, exits
+
+
+def test_bid_at_or_below_stop_triggers_exit():
+    async def scenario(server, monitor, exits):
+        monitor.arm('BTCUSDT', 95.0)
+        await server.push('BTCUSDT', bid=96.0, ask=96.1)
+        await wait_for(lambda: monitor.best_bids.get('BTCUSDT') == 96.0)
+        assert exits == []
+        await server.push('BTCUSDT', bid=94.5, ask=94.6)
+        await wait_for(lambda: 'BTCUSDT' not in monitor.stops)
+
+    monitor, exits = asyncio.run(run_monitor(scenario, [True]))
+    assert exits == [('BTCUSDT', 94.5)]
+    assert monitor.latency_stats()['count'] == 1
+
+
+def test_failed_exit_is_retried_on_next_price_below_stop():
+    async def scenario(server, monitor, exits):
+        monitor.arm('BTCUSDT', 95.0)
+        await server.push('BTCUSDT', bid=94.0, ask=94.1)
+        await wait_for(lambda: len(exits) == 1)
+        assert monitor.stops == {'BTCUSDT': 95.0}
+        # Prix sous le stop répétés jusqu'à la nouvelle tentative
+        async def push_until_retried():
+            while len(exits) < 2:
+                await server.push('BTCUSDT', bid=93.0, ask=93.1)
+                await asyncio.sleep(0.01)
+        await asyncio.wait_for(push_until_retried(), 5)
+        await wait_for(lambda: 'BTCUSDT' not in monitor.stops)
+
+    monitor, exits = asyncio.run(run_monitor(scenario, [False, True], retry_delay=0.0))
+    assert exits == [('BTCUSDT', 94.0), ('BTCUSDT', 93.0)]
+    assert monitor.latency_stats()['count'] == 1
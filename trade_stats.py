@@ -0,0 +1,85 @@
+import math
+from dataclasses import dataclass, fields, asdict
+from datetime import datetime
+from typing import Dict, Optional, Union
+
+
+def to_datetime(value: Union[str, datetime, None]) -> Optional[datetime]:
+    """Convertit un horodatage SQLite (texte ISO) en datetime"""
+    if value is None or isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
+def hold_seconds(entry_time, exit_time) -> float:
+    """Durée de détention d'un trade en secondes (0 si inconnue)"""
+    entry, exit_ = to_datetime(entry_time), to_datetime(exit_time)
+    if entry is None or exit_ is None:
+        return 0.0
+    return (exit_ - entry).total_seconds()
+
+
+@dataclass
+class TradeStats:
+    """
+    Agrégats de trading tenus à jour à chaque clôture de trade, pour que le
+    dashboard lise une seule ligne quel que soit l'historique.
+    """
+    total_trades: int = 0
+    total_pnl: float = 0.0
+    winning_trades: int = 0
+    losing_trades: int = 0
+    gross_profit: float = 0.0
+    gross_loss: float = 0.0
+    total_hold_seconds: float = 0.0
+    peak_pnl: float = 0.0
+    max_drawdown: float = 0.0
+
+    @classmethod
+    def columns(cls):
+        return [f.name for f in fields(cls)]
+
+    def record(self, pnl: Optional[float], hold: float):
+        """Intègre un trade clôturé (dans l'ordre des clôtures)"""
+        pnl = pnl or 0.0
+        self.total_trades += 1
+        self.total_pnl += pnl
+        if pnl > 0:
+            self.winning_trades += 1
+            self.gross_profit += pnl
+        elif pnl < 0:
+            self.losing_trades += 1
+            self.gross_loss -= pnl
+        self.total_hold_seconds += hold
+
+        # Drawdown maximal du PnL réalisé cumulé
+        self.peak_pnl = max(self.peak_pnl, self.total_pnl)
+        self.max_drawdown = max(self.max_drawdown, self.peak_pnl - self.total_pnl)
+
+    def summary(self) -> Dict:
+        """Statistiques au format du dashboard"""
+        total = self.total_trades
+        if self.gross_loss:
+            profit_factor = self.gross_profit / self.gross_loss
+        else:
+            profit_factor = math.inf if self.gross_profit else 0
+        return {
+            'total_trades': total,
+            'total_pnl': self.total_pnl,
+            'avg_pnl': self.total_pnl / total if total else 0,
+            'winning_trades': self.winning_trades,
+            'losing_trades': self.losing_trades,
+            'win_rate': self.winning_trades / total * 100 if total else 0,
+            'max_drawdown': self.max_drawdown,
+            'profit_factor': profit_factor,
+            'avg_hold_time': self.total_hold_seconds / total if total else 0,
+        }
+
+    def diff(self, other: 'TradeStats', rel_tol: float = 1e-9, abs_tol: float = 1e-6) -> Dict:
+        """Écarts champ par champ avec d'autres agrégats (tolérance flottante)"""
+        mismatches = {}
+        mine, theirs = asdict(self), asdict(other)
+        for name in self.columns():
+            if not math.isclose(mine[name], theirs[name], rel_tol=rel_tol, abs_tol=abs_tol):
+                mismatches[name] = (mine[name], theirs[name])
+        return mismatches
@@ -1,14 +1,32 @@
 import asyncio
+import threading
+import time
 import pandas as pd
-from datetime import datetime
 from binance.client import Client
 from binance.exceptions import BinanceAPIException
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 import logging
 
+import clock
+from async_io import run_blocking
 from config import config
 from database import db
-from indicators import TechnicalIndicators
+from execution import ExecutionEngine, Fill, OrderRejected
+from indicators import StreamingRSIVWAP, TechnicalIndicators
+from candle_buffer import CandleView
+from indicator_cache import IndicatorCache
+from kline_cache import KlineCache, interval_to_ms, now_ms
+from market_stream import KlineStream
+from metrics import metrics
+from recorder import Recorder, RecordingClient
+from request_scheduler import RequestScheduler, ScheduledClient
+from resampler import Resampler
+from scanner import MarketScanner
+from sim_exchange import SimulatedExchange
+from stop_loss import StopLossMonitor
+from account_state import AccountState, UserDataStream
+from scheduler import CandleScheduler, WAKE_CLOSE, WAKE_INTRA
+import strategy
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -17,34 +35,128 @@ class TradingBot:
     def __init__(self):
         self.client = None
         self.indicators = TechnicalIndicators()
+        self.indicator_cache = IndicatorCache(config.indicator_cache_size)
+        # RSI-VWAP incrémental par (symbol, interval, longueur)
+        self._rsi_streams: Dict[Tuple, StreamingRSIVWAP] = {}
+        self._rsi_lock = threading.Lock()
         self.is_running = False
-        self.current_position = None
+        self.symbols: List[str] = config.trading_symbols()
+        self.positions: Dict[str, Dict] = {}
+        self.request_scheduler = RequestScheduler(config.rest_weight_limit, config.order_limit_10s,
+                                                  config.order_limit_1d)
+        self._entry_lock = asyncio.Lock()
+        self._exiting = set()
+        self._signal_at: Dict[str, float] = {}
+        self.stop_monitor = None
+        self._stop_monitor_task = None
+        self._closed_symbols = set()
+        # Unités de stratégie dérivées d'un seul flux de base (aucun téléchargement par unité)
+        self.resampler = None
+        max_candles = 5000
+        if config.resample_base:
+            self.resampler = Resampler(config.resample_base, self.timeframes, capacity=max_candles)
+            max_candles = max(max_candles, self.base_history_ms() // self.resampler.base_ms)
+        self.kline_cache = KlineCache(config.kline_cache_path, ttl=config.kline_cache_ttl,
+                                      max_candles=max_candles)
+        # Bougies des symboles scannés mais non tradés (en mémoire, bornées au scan)
+        self.scan_cache = None
+        self.kline_stream = None
+        self._stream_task = None
+        self._candle_closed = asyncio.Event()
+        # Clôtures par (symbol, interval) du stream, pour les reprises de fetch_new_candle
+        self._symbol_closed: Dict[Tuple[str, str], asyncio.Event] = {}
+        self._stopped = asyncio.Event()
+        self._last_compaction = 0.0
+        self.scheduler = None
+        self._last_clock_sync = 0.0
+        self._last_evaluated: Dict[str, Optional[int]] = {}
+        self.account = AccountState(ttl=config.account_state_ttl)
+        self.user_stream = None
+        self._user_stream_task = None
+        self.recorder = None
+        self.execution = ExecutionEngine(attempts=config.order_retry_attempts, timeout=config.order_timeout)
+        self._last_time_sync = 0.0
         
+    @property
+    def simulated(self) -> bool:
+        """Mode démo sur l'exchange simulé en mémoire"""
+        return config.is_demo and config.demo_exchange == "simulated"
+    
+    @property
+    def timeframes(self) -> List[str]:
+        """Unités lues par la stratégie (signaux, puis filtre de tendance)"""
+        if config.trend_timeframe and config.trend_timeframe != config.timeframe:
+            return [config.timeframe, config.trend_timeframe]
+        return [config.timeframe]
+    
+    @property
+    def stream_interval(self) -> str:
+        """Unité téléchargée / streamée (base du rééchantillonnage s'il est actif)"""
+        return self.resampler.base_interval if self.resampler is not None else config.timeframe
+    
+    def base_history_ms(self, limit: int = 200) -> int:
+        """Profondeur de bougies de base couvrant ``limit`` bougies de chaque unité"""
+        if self.resampler is None:
+            return limit * 3_600_000
+        return max(self.resampler.base_window_ms(interval, limit) for interval in self.timeframes)
+    
+    @property
+    def ws_base_url(self) -> str:
+        """Streams du testnet en démo testnet, du mainnet sinon (prix réels)"""
+        return config.testnet_ws_url if config.is_demo and not self.simulated else config.ws_base_url
+    
     def init_binance_client(self):
         """Initialise le client Binance, en mode réel ou testnet."""
         try:
-            if config.is_demo:
+            if self.simulated:
+                # Mode démo: exchange simulé, prix publics du mainnet
+                client = SimulatedExchange(
+                    Client(requests_params={'timeout': config.io_timeout}),
+                    balances={'USDT': config.sim_initial_balance},
+                    fee_rate=config.sim_fee_rate,
+                    slippage=config.sim_slippage,
+                    latency=config.sim_latency
+                )
+                client.market.API_URL = "https://api.binance.com/api"
+                logger.debug("[DEBUG] Exchange simulé sur les prix du mainnet")
+            elif config.is_demo:
                 # Mode testnet
-                self.client = Client(
+                client = Client(
                     config.binance_api_key,
                     config.binance_secret_key,
+                    requests_params={'timeout': config.io_timeout},
                     testnet=True
                 )
                 # 👉 Endpoint testnet
-                self.client.API_URL = config.testnet_base_url.rstrip("/") + "/api"
-                logger.debug(f"[DEBUG] Testnet API_URL défini sur {self.client.API_URL}")
+                client.API_URL = config.testnet_base_url.rstrip("/") + "/api"
+                logger.debug(f"[DEBUG] Testnet API_URL défini sur {client.API_URL}")
             else:
                 # Mode réel
-                self.client = Client(
+                client = Client(
                     config.binance_api_key,
-                    config.binance_secret_key
+                    config.binance_secret_key,
+                    requests_params={'timeout': config.io_timeout}
                 )
                 # 👉 Endpoint mainnet
-                self.client.API_URL = "https://api.binance.com/api"
-                logger.debug(f"[DEBUG] Mainnet API_URL défini sur {self.client.API_URL}")
+                client.API_URL = "https://api.binance.com/api"
+                logger.debug(f"[DEBUG] Mainnet API_URL défini sur {client.API_URL}")
             logger.debug(f"[DEBUG] Clés utilisées : {config.binance_api_key[:6]}… / {config.binance_secret_key[:6]}…")
-            logger.debug(f"[DEBUG] API_URL après init : {self.client.API_URL}")
+            logger.debug(f"[DEBUG] API_URL après init : {getattr(client, 'API_URL', None)}")
 
+            # Journal des réponses de l'exchange (rejeu d'incident)
+            if config.record_path and self.recorder is None:
+                self.recorder = Recorder(config.record_path)
+                self.kline_cache.recorder = self.recorder
+                self.account.recorder = self.recorder
+                logger.info(f"Enregistrement des données de marché dans {config.record_path}")
+            if self.recorder is not None:
+                client = RecordingClient(client, self.recorder)
+            self.client = ScheduledClient(client, self.request_scheduler)
+            
+            self.account.client = self.client
+            self.account.invalidate()
+            self.execution.client = self.client
+            
             # Test de connexion
             self.client.ping()
             logger.debug("[DEBUG] Ping OK, délai de réponse reçu")
@@ -58,126 +170,148 @@ class TradingBot:
             logger.error(f"Erreur lors de l'initialisation du client Binance : {str(e)}")
             return False
     
+    def get_candles(self, symbol: str, interval: str, limit: int = 100, force: bool = False) -> CandleView:
+        """
+        Bougies des ``limit`` dernières heures (colonnes NumPy, sans copie).
+        ``force`` resynchronise avec l'exchange même si le cache est frais.
+        """
+        if self.resampler is not None and interval != self.resampler.base_interval:
+            # Unité dérivée des bougies de base, sur la fenêtre commune à toutes les unités
+            base_ms = max(self.base_history_ms(), self.resampler.base_window_ms(interval, limit))
+            base = self.kline_cache.get_klines(self.client, symbol, self.resampler.base_interval,
+                                               now_ms() - base_ms, force)
+            return self.resampler.view(symbol, interval, base, now_ms() - limit * interval_to_ms(interval))
+        # Fenêtre servie par le cache local (fetch incrémental), au moins ``limit`` bougies au-delà de 1h
+        start_ms = now_ms() - limit * max(3_600_000, interval_to_ms(interval))
+        return self.kline_cache.get_klines(self.client, symbol, interval, start_ms, force)
+    
     def get_historical_data(self, symbol: str, interval: str, limit: int = 100) -> pd.DataFrame:
-        """Récupère les données historiques"""
+        """Récupère les données historiques (DataFrame construit à la demande)"""
         try:
-            klines = self.client.get_historical_klines(symbol, interval, f"{limit} hours ago UTC")
-            
-            df = pd.DataFrame(klines, columns=[
-                'timestamp', 'open', 'high', 'low', 'close', 'volume',
-                'close_time', 'quote_asset_volume', 'number_of_trades',
-                'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore'
-            ])
-            
-            # Conversion des types
-            numeric_columns = ['open', 'high', 'low', 'close', 'volume']
-            for col in numeric_columns:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
-            
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            df.set_index('timestamp', inplace=True)
-            
-            return df
-            
+            return self.get_candles(symbol, interval, limit).to_dataframe()
         except Exception as e:
             logger.error(f"Erreur récupération données: {e}")
             return pd.DataFrame()
     
+    @metrics.timed('account.get_balance')
     def get_account_balance(self) -> Dict:
-        """Récupère le solde du compte"""
-        try:
-            account_info = self.client.get_account()
-            # DEBUG : log brut pour vérifier qu'on est bien sur le « réel » et que l'API renvoie quelque chose
-            logger.info(f"[DEBUG] account_info keys: {list(account_info.keys())}")
-            if 'balances' not in account_info:
-                logger.error(f"[DEBUG] réponse inattendue: {account_info}")
-
-            for balance in account_info['balances']:
-                if balance['asset'] == 'USDT':
-                    return {
-                        'free': float(balance['free']),
-                        'locked': float(balance['locked']),
-                        'total': float(balance['free']) + float(balance['locked'])
-                    }
-            
-            return {'free': 0, 'locked': 0, 'total': 0}     
-        except Exception as e:
-            logger.error(f"Erreur récupération solde: {e}")
-            return {'free': 0, 'locked': 0, 'total': 0}
+        """Solde USDT, servi par le cache de compte (stream user-data ou REST à TTL)"""
+        return self.account.get_balance('USDT')
     
     def calculate_position_size(self, entry_price: float, balance: float) -> float:
         """Calcule la taille de position basée sur le risk management"""
-        risk_amount = balance * (config.risk_per_trade / 100)
-        stop_loss_price = entry_price * (1 - config.stop_loss_pct / 100)
-        risk_per_unit = entry_price - stop_loss_price
-        
-        if risk_per_unit > 0:
-            position_size = risk_amount / risk_per_unit
-            return round(position_size, 6)
-        
-        return 0
+        return strategy.position_size(entry_price, balance, config.risk_per_trade, config.stop_loss_pct)
     
-    def place_market_order(self, symbol: str, side: str, quantity: float) -> Optional[Dict]:
-        """Place un ordre au marché"""
+    async def place_market_order(self, symbol: str, side: str, quantity: float, price: float) -> Optional[Fill]:
+        """Place un ordre au marché et renvoie son exécution réconciliée"""
+        signal_at = self._signal_at.pop(symbol, None)
         try:
-            order = self.client.order_market_buy(
-                symbol=symbol,
-                quantity=quantity
-            ) if side == 'BUY' else self.client.order_market_sell(
-                symbol=symbol,
-                quantity=quantity
-            )
-            
-            logger.info(f"Ordre placé: {order}")
-            return order
-            
-        except BinanceAPIException as e:
+            fill = await self.execution.submit(symbol, side, quantity, price)
+        except OrderRejected as e:
             logger.error(f"Erreur placement ordre: {e}")
             return None
+        finally:
+            # Le stream user-data enverra les nouveaux soldes; sans lui, relire par REST
+            self.account.invalidate()
+        if signal_at is not None and fill.sent_at:
+            metrics.observe('latency.signal_to_order', fill.sent_at - signal_at)
+        logger.info(f"Ordre exécuté: {fill.side} {fill.executed_qty} {symbol} à {fill.avg_price:.8f} "
+                    f"(id {fill.client_order_id}, {fill.attempts} tentative(s))")
+        return fill
+    
+    def current_rsi_vwap(self, candles: CandleView) -> float:
+        """RSI-VWAP de la dernière bougie (calculé une fois par bougie)"""
+        length = config.rsi_length
+        return self.indicator_cache.get(candles, 'rsi_vwap', (length,),
+                                        lambda: self._stream_rsi_vwap(candles, length))
+    
+    def _stream_rsi_vwap(self, candles: CandleView, length: int) -> float:
+        """Intègre à l'indicateur incrémental les bougies nouvelles ou révisées de la fenêtre"""
+        if candles.key is None:
+            return float(self.indicators.calculate_rsi_vwap_array(
+                candles.high, candles.low, candles.close, candles.volume, length
+            )[-1])
+        with self._rsi_lock:
+            stream = self._rsi_streams.get((candles.key, length))
+            if stream is None:
+                stream = self._rsi_streams[(candles.key, length)] = StreamingRSIVWAP(length)
+            return float(stream.sync(candles))
+    
+    def is_bull_market(self, candles: CandleView, ma_period: int = 200) -> bool:
+        """Prix > MA200 sur la dernière bougie (calculé une fois par bougie)"""
+        return self.indicator_cache.get(candles, 'bull_market', (ma_period,), lambda: bool(
+            self.indicators.bull_market_array(candles.close, ma_period)[-1]
+        ))
+    
+    def market_snapshot(self, symbol: Optional[str] = None) -> Optional[Dict]:
+        """RSI-VWAP et filtre bull market courants (pour l'affichage Telegram)"""
+        symbol = symbol or self.symbols[0]
+        candles = self.get_candles(symbol, config.timeframe, 200)
+        if len(candles) < config.rsi_length + 1:
+            return None
+        trend = self.get_candles(symbol, self.timeframes[-1], 200)
+        return {
+            'price': float(candles.close[-1]),
+            'rsi_vwap': self.current_rsi_vwap(candles),
+            'bull_market': self.is_bull_market(trend),
+        }
     
-    def check_entry_conditions(self, df: pd.DataFrame) -> bool:
-        """Vérifie les conditions d'entrée"""
-        if len(df) < config.rsi_length + 1:
+    @metrics.timed('signal.entry')
+    def check_entry_conditions(self, candles: CandleView, trend: Optional[CandleView] = None) -> bool:
+        """Vérifie les conditions d'entrée (tendance sur ``trend`` s'il est donné)"""
+        if len(candles) < config.rsi_length + 1:
             return False
         
         # Vérifier si on est en bull market
-        if not self.indicators.is_bull_market(df):
+        if not self.is_bull_market(trend if trend is not None else candles):
             return False
         
         # Calculer RSI-VWAP
-        rsi_vwap = self.indicators.calculate_rsi_vwap(df, config.rsi_length)
-        current_rsi = rsi_vwap.iloc[-1]
+        current_rsi = self.current_rsi_vwap(candles)
         
         # Condition d'entrée: RSI-VWAP < 10
-        if current_rsi < config.rsi_entry_threshold:
+        if strategy.entry_signal(current_rsi, True, config.rsi_entry_threshold):
             logger.info(f"Signal d'entrée détecté - RSI-VWAP: {current_rsi:.2f}")
             return True
         
         return False
     
-    def check_exit_conditions(self, df: pd.DataFrame) -> bool:
+    @metrics.timed('signal.exit')
+    def check_exit_conditions(self, candles: CandleView) -> bool:
         """Vérifie les conditions de sortie"""
-        if len(df) < config.rsi_length + 1:
+        if len(candles) < config.rsi_length + 1:
             return False
         
         # Calculer RSI-VWAP
-        rsi_vwap = self.indicators.calculate_rsi_vwap(df, config.rsi_length)
-        current_rsi = rsi_vwap.iloc[-1]
+        current_rsi = self.current_rsi_vwap(candles)
         
         # Condition de sortie: RSI-VWAP > 95
-        if current_rsi > config.rsi_exit_threshold:
+        if strategy.exit_signal(current_rsi, config.rsi_exit_threshold):
             logger.info(f"Signal de sortie détecté - RSI-VWAP: {current_rsi:.2f}")
             return True
         
         return False
     
-    def open_position(self, symbol: str, df: pd.DataFrame) -> bool:
+    @staticmethod
+    def _on_trade_persisted(ack):
+        """Accusé de durabilité d'une ouverture/fermeture de trade"""
+        if ack.exception() is not None:
+            logger.error(f"Trade non persisté: {ack.exception()}")
+        else:
+            logger.debug(f"Trade #{ack.result()} persisté")
+    
+    @metrics.timed('position.open')
+    async def open_position(self, symbol: str, candles: CandleView) -> bool:
         """Ouvre une position"""
         try:
-            balance = self.get_account_balance()
-            current_price = float(df['close'].iloc[-1])
+            # Solde en mémoire si le cache est à jour (stream user-data), sinon REST hors boucle
+            if self.account.is_fresh():
+                balance = self.get_account_balance()
+            else:
+                balance = await run_blocking(self.get_account_balance)
+            current_price = float(candles.close[-1])
             
-            if balance['free'] < 10:  # Minimum 10 USDT
+            if balance['free'] < strategy.MIN_BALANCE:  # Minimum 10 USDT
                 logger.warning("Solde insuffisant pour ouvrir une position")
                 return False
             
@@ -188,12 +322,16 @@ class TradingBot:
                 return False
             
             # Placer l'ordre
-            order = self.place_market_order(symbol, 'BUY', quantity)
+            fill = await self.place_market_order(symbol, 'BUY', quantity, current_price)
             
-            if order:
+            if fill and fill.executed_qty > 0:
+                # Quantité réellement détenue (frais éventuels en actif de base), au pas du symbole
+                filters = self.execution.filters_for(symbol)
+                quantity = float(filters.quantize(fill.net_base_qty(filters.base_asset)))
+                current_price = fill.avg_price
+                
                 # Calculer RSI pour enregistrement
-                rsi_vwap = self.indicators.calculate_rsi_vwap(df, config.rsi_length)
-                current_rsi = rsi_vwap.iloc[-1]
+                current_rsi = self.current_rsi_vwap(candles)
                 
                 # Enregistrer le trade
                 trade_data = {
@@ -202,12 +340,17 @@ class TradingBot:
                     'quantity': quantity,
                     'entry_price': current_price,
                     'status': 'OPEN',
-                    'entry_time': datetime.now(),
+                    'entry_time': clock.datetime_now(),
                     'rsi_entry': current_rsi
                 }
                 
-                trade_id = db.add_trade(trade_data)
-                self.current_position = {'trade_id': trade_id, 'quantity': quantity, 'entry_price': current_price}
+                # Écriture différée: l'ordre n'attend pas le commit disque
+                trade_id, ack = db.queue_add_trade(trade_data)
+                ack.add_done_callback(self._on_trade_persisted)
+                self.positions[symbol] = {
+                    'trade_id': trade_id, 'quantity': quantity, 'entry_price': current_price,
+                    'entry_fee': fill.commission_in_quote(filters.base_asset, filters.quote_asset)
+                }
                 
                 logger.info(f"Position ouverte: {quantity} {symbol} à {current_price}")
                 return True
@@ -218,40 +361,45 @@ class TradingBot:
             logger.error(f"Erreur ouverture position: {e}")
             return False
     
-    def close_position(self, symbol: str, df: pd.DataFrame) -> bool:
-        """Ferme la position actuelle"""
+    @metrics.timed('position.close')
+    async def close_position(self, symbol: str, candles: Optional[CandleView], price: Optional[float] = None) -> bool:
+        """Ferme la position ouverte sur ``symbol`` (au prix ``price`` s'il est donné)"""
         try:
-            if not self.current_position:
+            position = self.positions.get(symbol)
+            if not position:
                 return False
             
-            current_price = float(df['close'].iloc[-1])
-            quantity = self.current_position['quantity']
+            current_price = price if price is not None else float(candles.close[-1])
+            quantity = position['quantity']
             
             # Placer l'ordre de vente
-            order = self.place_market_order(symbol, 'SELL', quantity)
+            fill = await self.place_market_order(symbol, 'SELL', quantity, current_price)
             
-            if order:
-                # Calculer PnL
-                entry_price = self.current_position['entry_price']
-                pnl = (current_price - entry_price) * quantity
+            if fill and fill.executed_qty > 0:
+                # PnL sur les prix d'exécution, frais d'entrée et de sortie déduits
+                filters = self.execution.filters_for(symbol)
+                current_price = fill.avg_price
+                entry_price = position['entry_price']
+                pnl = ((current_price - entry_price) * fill.executed_qty - position.get('entry_fee', 0.0)
+                       - fill.commission_in_quote(filters.base_asset, filters.quote_asset))
                 
                 # Calculer RSI pour enregistrement
-                rsi_vwap = self.indicators.calculate_rsi_vwap(df, config.rsi_length)
-                current_rsi = rsi_vwap.iloc[-1]
+                current_rsi = self.current_rsi_vwap(candles) if candles is not None else None
                 
                 # Mettre à jour le trade
                 update_data = {
                     'exit_price': current_price,
                     'pnl': pnl,
                     'status': 'CLOSED',
-                    'exit_time': datetime.now(),
+                    'exit_time': clock.datetime_now(),
                     'rsi_exit': current_rsi
                 }
                 
-                db.update_trade(self.current_position['trade_id'], update_data)
+                ack = db.queue_update_trade(position['trade_id'], update_data)
+                ack.add_done_callback(self._on_trade_persisted)
                 
                 logger.info(f"Position fermée: {quantity} {symbol} à {current_price}, PnL: {pnl:.2f}")
-                self.current_position = None
+                del self.positions[symbol]
                 return True
             
             return False
@@ -260,53 +408,329 @@ class TradingBot:
             logger.error(f"Erreur fermeture position: {e}")
             return False
     
+    def arm_stop(self, symbol: str):
+        """Calcule le stop de la position et l'active sur le moniteur temps réel"""
+        position = self.positions[symbol]
+        position['stop_price'] = strategy.stop_loss_price(position['entry_price'], config.stop_loss_pct)
+        if self.stop_monitor is not None:
+            self.stop_monitor.arm(symbol, position['stop_price'])
+    
+    async def exit_position(self, symbol: str, candles: Optional[CandleView] = None,
+                            price: Optional[float] = None) -> bool:
+        """Ferme une position une seule fois, même si stop et signal se croisent"""
+        if symbol in self._exiting or symbol not in self.positions:
+            return False
+        self._exiting.add(symbol)
+        try:
+            closed = await self.close_position(symbol, candles, price)
+        finally:
+            self._exiting.discard(symbol)
+        if closed and self.stop_monitor is not None:
+            self.stop_monitor.disarm(symbol)
+        return closed
+    
+    async def on_stop_triggered(self, symbol: str, price: float) -> bool:
+        """Sortie immédiate sur stop-loss, hors de la boucle de stratégie"""
+        self._signal_at[symbol] = time.perf_counter()
+        return await self.exit_position(symbol, price=price)
+    
+    def start_stop_monitor(self):
+        """Démarre la surveillance temps réel des stops"""
+        self.stop_monitor = StopLossMonitor(self.symbols, self.ws_base_url, self.on_stop_triggered)
+        self._stop_monitor_task = asyncio.create_task(self.stop_monitor.run())
+    
+    async def on_candle_close(self, symbol: str, interval: str, open_time: int):
+        """Réveille la boucle de trading dès la clôture d'une bougie (mode websocket)"""
+        # En rééchantillonnage, seule la bougie de base qui clôt une bougie de stratégie réveille la boucle
+        closes_timeframe = (open_time + interval_to_ms(interval)) % interval_to_ms(config.timeframe) == 0
+        if symbol in self.symbols and interval == self.stream_interval and closes_timeframe:
+            self._closed_symbols.add(symbol)
+            self._closed_event(symbol, interval).set()
+            self._candle_closed.set()
+    
+    def _closed_event(self, symbol: str, interval: str) -> asyncio.Event:
+        event = self._symbol_closed.get((symbol, interval))
+        if event is None:
+            event = self._symbol_closed[(symbol, interval)] = asyncio.Event()
+        return event
+    
+    async def _sleep(self, delay: float, wake: Optional[asyncio.Event] = None):
+        """Sommeil (horloge du bot) interrompu par stop_trading ou par l'événement ``wake``"""
+        waiters = [asyncio.ensure_future(clock.sleep(delay)), asyncio.ensure_future(self._stopped.wait())]
+        if wake is not None:
+            waiters.append(asyncio.ensure_future(wake.wait()))
+        try:
+            await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for waiter in waiters:
+                waiter.cancel()
+    
+    async def wait_next_tick(self) -> List[Tuple[str, str]]:
+        """
+        Attend la prochaine évaluation: clôture de bougie (websocket, ou
+        planificateur aligné sur l'horloge du serveur en polling) ou contrôle
+        intra-bougie. Renvoie les (symbol, type de réveil) à évaluer.
+        """
+        if self.kline_stream is None:
+            events = await self.scheduler.wait()
+            return [(symbol, kind) for symbol, _, kind in events]
+        closed = asyncio.ensure_future(self._candle_closed.wait())
+        stopped = asyncio.ensure_future(self._stopped.wait())
+        try:
+            await asyncio.wait({closed, stopped}, timeout=config.intra_candle_check_interval,
+                               return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            closed.cancel()
+            stopped.cancel()
+        if self._stopped.is_set():
+            return []
+        if not self._candle_closed.is_set():
+            return [(symbol, WAKE_INTRA) for symbol in self.symbols]
+        self._candle_closed.clear()
+        closed, self._closed_symbols = self._closed_symbols, set()
+        return [(symbol, WAKE_CLOSE) for symbol in self.symbols if symbol in closed]
+    
+    async def fetch_new_candle(self, symbol: str, wake: str) -> Optional[CandleView]:
+        """
+        Récupère les bougies; après un réveil de clôture, réessaie (délai de
+        stabilisation) tant que la nouvelle bougie clôturée n'est pas publiée.
+        Renvoie None s'il n'y a rien de nouveau à évaluer.
+        """
+        attempts = config.candle_retry_attempts if wake == WAKE_CLOSE else 1
+        # En websocket, une reprise n'est avancée que par la clôture de ce symbole
+        closed = self._closed_event(symbol, self.stream_interval) if self.kline_stream is not None else None
+        for attempt in range(attempts):
+            if attempt:
+                await self._sleep(config.candle_settle_delay, closed)
+                if not self.is_running:
+                    return None
+            if closed is not None:
+                closed.clear()
+            # Après une clôture, relire l'exchange : le cache frais (ttl) servirait la même fenêtre
+            # (en websocket, la première lecture suffit: la clôture vient de l'événement x=true)
+            force = wake == WAKE_CLOSE and (attempt > 0 or self.kline_stream is None)
+            try:
+                with metrics.span('loop.fetch_candles'):
+                    candles = await run_blocking(self.get_candles, symbol, config.timeframe, 200, force)
+            except asyncio.TimeoutError:
+                raise
+            except Exception as e:
+                logger.error(f"{symbol}: erreur récupération données: {e}")
+                continue
+            if not len(candles):
+                continue
+            if wake == WAKE_INTRA or candles.last_closed_open_time() != self._last_evaluated.get(symbol):
+                return candles
+        if wake == WAKE_CLOSE:
+            logger.info(f"{symbol}: aucune nouvelle bougie clôturée, évaluation ignorée")
+        return None
+    
+    async def scan_market(self, symbols: Optional[List[str]] = None) -> List[Dict]:
+        """RSI-VWAP et signal d'entrée de toute la liste de surveillance, calculés en une passe"""
+        symbols = symbols or config.scan_symbols or self.symbols
+        trend_interval = self.timeframes[-1] if len(self.timeframes) > 1 else None
+        scanner = MarketScanner(config.rsi_length, entry_threshold=config.rsi_entry_threshold)
+        if self.scan_cache is None or self.scan_cache.max_candles != scanner.history:
+            self.scan_cache = KlineCache(ttl=config.kline_cache_ttl, max_candles=scanner.history, persist=False)
+        
+        def get_scan_candles(symbol: str, interval: str) -> CandleView:
+            if symbol in self.symbols:
+                # Symbole tradé: bougies déjà tenues à jour par la boucle
+                return self.get_candles(symbol, interval, 200)
+            # Unité téléchargée directement, sans la profondeur du rééchantillonnage
+            start_ms = now_ms() - scanner.history * interval_to_ms(interval)
+            return self.scan_cache.get_klines(self.client, symbol, interval, start_ms)
+        
+        async def fetch(symbol: str):
+            candles = await run_blocking(get_scan_candles, symbol, config.timeframe)
+            trend = await run_blocking(get_scan_candles, symbol, trend_interval) if trend_interval else None
+            return candles, trend
+        
+        with metrics.span('scan.fetch'):
+            fetched = await asyncio.gather(*(fetch(symbol) for symbol in symbols), return_exceptions=True)
+        views, trends = {}, {}
+        for symbol, result in zip(symbols, fetched):
+            if isinstance(result, BaseException):
+                logger.warning(f"{symbol}: bougies indisponibles pour le scan: {result!r}")
+                continue
+            views[symbol], trends[symbol] = result
+        
+        with metrics.span('scan.compute'):
+            return scanner.scan(views, trends if trend_interval else None)
+    
+    async def trend_candles(self, symbol: str) -> Optional[CandleView]:
+        """Bougies du filtre de tendance, si son unité diffère de celle des signaux"""
+        if len(self.timeframes) == 1:
+            return None
+        return await run_blocking(self.get_candles, symbol, self.timeframes[-1], 200)
+    
+    async def evaluate_symbol(self, symbol: str, wake: str) -> bool:
+        """Évalue les signaux d'un symbole; renvoie True si une évaluation a eu lieu"""
+        candles = await self.fetch_new_candle(symbol, wake)
+        if candles is None:
+            return False
+        self._last_evaluated[symbol] = candles.last_closed_open_time()
+        
+        if symbol not in self.positions:
+            # Pas de position, chercher signal d'entrée
+            if self.check_entry_conditions(candles, await self.trend_candles(symbol)):
+                self._signal_at[symbol] = time.perf_counter()
+                # Les entrées sont sérialisées pour respecter le plafond du portefeuille
+                async with self._entry_lock:
+                    if len(self.positions) >= config.max_positions:
+                        logger.info(f"{symbol}: signal ignoré, {len(self.positions)}/{config.max_positions} positions ouvertes")
+                        self._signal_at.pop(symbol, None)
+                        return True
+                    if await self.open_position(symbol, candles):
+                        self.arm_stop(symbol)
+        else:
+            # Position ouverte: stop franchi (secours du stream bookTicker) ou signal de sortie
+            stop_price = self.positions[symbol].get('stop_price')
+            price = float(candles.close[-1])
+            if stop_price is not None and price <= stop_price:
+                self._signal_at[symbol] = time.perf_counter()
+                logger.warning(f"{symbol}: stop-loss franchi à la clôture ({price} <= {stop_price})")
+                await self.exit_position(symbol, candles, price)
+            elif self.check_exit_conditions(candles):
+                self._signal_at[symbol] = time.perf_counter()
+                await self.exit_position(symbol, candles)
+        return True
+    
+    async def sync_scheduler_clock(self):
+        """Recale périodiquement le planificateur sur l'heure du serveur"""
+        if self.scheduler is None or clock.monotonic() - self._last_clock_sync < config.clock_sync_interval:
+            return
+        self._last_clock_sync = clock.monotonic()
+        try:
+            await run_blocking(self.scheduler.sync_clock, self.client)
+        except Exception as e:
+            logger.warning(f"Synchronisation de l'horloge serveur impossible: {e}")
+    
+    async def sync_order_clock(self):
+        """Recale périodiquement l'horodatage des ordres signés sur le serveur"""
+        if clock.monotonic() - self._last_time_sync < config.time_sync_interval:
+            return
+        self._last_time_sync = clock.monotonic()
+        try:
+            await run_blocking(self.execution.sync_time)
+        except Exception as e:
+            logger.warning(f"Recalage de l'horodatage des ordres impossible: {e}")
+    
+    def start_market_stream(self):
+        """Démarre l'ingestion websocket des bougies"""
+        base_url = self.ws_base_url
+        self.kline_stream = KlineStream(
+            self.kline_cache, self.client, self.symbols, self.stream_interval,
+            base_url=base_url, lookback_ms=self.base_history_ms(),
+            on_candle_close=self.on_candle_close
+        )
+        self._stream_task = asyncio.create_task(self.kline_stream.run())
+    
+    def start_user_stream(self):
+        """Démarre le stream user-data (soldes poussés par Binance)"""
+        base_url = self.ws_base_url
+        self.user_stream = UserDataStream(self.account, self.client, base_url)
+        self._user_stream_task = asyncio.create_task(self.user_stream.run())
+    
     async def trading_loop(self):
         """Boucle principale de trading"""
         self.is_running = True
-        logger.info("Bot de trading démarré")
+        self._stopped.clear()
+        self._candle_closed.clear()
+        logger.info(f"Bot de trading démarré sur {len(self.symbols)} symbole(s): {', '.join(self.symbols)}")
+        
+        if config.market_data_mode == "websocket":
+            self.start_market_stream()
+        else:
+            self.scheduler = CandleScheduler(config.candle_settle_delay, config.intra_candle_check_interval,
+                                             clock=clock.now, sleep=self._sleep)
+            for symbol in self.symbols:
+                self.scheduler.add(symbol, config.timeframe)
+            self._last_clock_sync = 0.0
+        if config.account_stream and not self.simulated:
+            self.start_user_stream()
+        if config.stop_loss_monitor:
+            self.start_stop_monitor()
+        for symbol in list(self.positions):
+            self.arm_stop(symbol)
         
+        # Filtres des symboles en cache: aucun appel préalable sur le chemin d'un ordre
+        try:
+            await run_blocking(self.execution.load_filters, self.symbols)
+        except Exception as e:
+            logger.warning(f"Filtres des symboles indisponibles, pas par défaut: {e}")
+        self._last_time_sync = 0.0
+        
+        wake = [(symbol, WAKE_CLOSE) for symbol in self.symbols]
         while self.is_running and config.is_active:
             try:
-                # Récupérer les données
-                df = self.get_historical_data(config.symbol, config.timeframe, 200)
+                await self.sync_scheduler_clock()
+                await self.sync_order_clock()
                 
-                if df.empty:
-                    await asyncio.sleep(60)
-                    continue
-                
-                # Vérifier les positions ouvertes
-                if self.current_position is None:
-                    # Pas de position, chercher signal d'entrée
-                    if self.check_entry_conditions(df):
-                        self.open_position(config.symbol, df)
-                else:
-                    # Position ouverte, chercher signal de sortie
-                    if self.check_exit_conditions(df):
-                        self.close_position(config.symbol, df)
+                # Évaluer les symboles réveillés en parallèle (rien à faire sans nouvelle bougie)
+                with metrics.span('loop.evaluate'):
+                    results = await asyncio.gather(
+                        *(self.evaluate_symbol(symbol, kind) for symbol, kind in wake),
+                        return_exceptions=True
+                    )
+                evaluated = False
+                for (symbol, _), result in zip(wake, results):
+                    if isinstance(result, BaseException):
+                        logger.error(f"{symbol}: erreur d'évaluation: {result!r}")
+                    else:
+                        evaluated = evaluated or result
                 
                 # Sauvegarder snapshot du capital
-                balance = self.get_account_balance()
-                db.save_capital_snapshot(balance['total'], balance['total'], 0)
+                if evaluated:
+                    with metrics.span('loop.capital_snapshot'):
+                        balance = await run_blocking(self.get_account_balance)
+                    db.queue_capital_snapshot(balance['total'], balance['total'], 0)
+                
+                # Agrégation / rétention périodique de l'historique du capital
+                if clock.monotonic() - self._last_compaction >= config.capital_compaction_interval:
+                    self._last_compaction = clock.monotonic()
+                    await run_blocking(db.compact_capital_history, timeout=120)
                 
                 # Attendre avant la prochaine vérification
-                await asyncio.sleep(60)  # Vérification chaque minute
+                wake = await self.wait_next_tick()
                 
+            except asyncio.TimeoutError:
+                logger.error("Délai dépassé pour un appel Binance/DB dans la boucle de trading")
+                await asyncio.sleep(60)
             except Exception as e:
                 logger.error(f"Erreur dans la boucle de trading: {e}")
                 await asyncio.sleep(60)
+        
+        await run_blocking(db.flush)
+        
+        if self.kline_stream is not None:
+            await self.kline_stream.stop()
+            self.kline_stream = None
+            self._stream_task = None
+        if self.user_stream is not None:
+            await self.user_stream.stop()
+            self.user_stream = None
+            self._user_stream_task = None
+        if self.stop_monitor is not None:
+            await self.stop_monitor.stop()
+            self.stop_monitor = None
+            self._stop_monitor_task = None
+        self.scheduler = None
     
     def start_trading(self):
         """Démarre le trading"""
         if self.init_binance_client():
             config.is_active = True
+            self.symbols = config.trading_symbols()
             # Récupérer les positions ouvertes de la DB
-            open_trades = db.get_open_trades()
-            if open_trades:
-                self.current_position = {
-                    'trade_id': open_trades[0]['id'],
-                    'quantity': open_trades[0]['quantity'],
-                    'entry_price': open_trades[0]['entry_price']
+            self.positions = {
+                trade['symbol']: {
+                    'trade_id': trade['id'],
+                    'quantity': trade['quantity'],
+                    'entry_price': trade['entry_price']
                 }
+                for trade in reversed(db.get_open_trades())
+            }
             return True
         return False
     
@@ -314,6 +738,7 @@ class TradingBot:
         """Arrête le trading"""
         self.is_running = False
         config.is_active = False
+        self._stopped.set()
 
 # Instance globale
 trading_bot = TradingBot()